@@ -1,6 +1,8 @@
 # sweep_hide_fixed5_tank.py
-import RPi.GPIO as GPIO
-import time
+import asyncio
+from hal import Robot, make_turner
+from sweep_hide_async import AsyncSweepHide
+from sweep_planner import FixedSweep, AdaptiveSweep
 
 # ---- PINS (BCM) ----
 SERVO = 17
@@ -15,6 +17,7 @@ SWEEP_MAX = 80
 STEP_DEG  = 2
 STEP_DELAY = 0.03
 SETTLE_S   = 0.10
+ADAPTIVE_SWEEP = True  # coarse steps over empty arc, fine + repeated pings near things
 
 # ---- ULTRASONIC / LOGIC ----
 NEAR_CM      = 35
@@ -24,133 +27,29 @@ HIDE_BACK_S  = 0.0   # not used now, but kept if you want a little reverse
 FIXED_HIDE_S = 5.0   # stay in HIDING exactly 5s
 
 # ---- TANK TURN (approx 180°) ----
-TURN_180_S = 1.0     # <-- tune this for your robot (try 0.8–1.5s)
-
-def angle_to_duty(deg: float) -> float:
-    return 2.5 + (deg/180.0)*10.0
-
-def motors_stop():
-    GPIO.output(LEFT_IN1, 0); GPIO.output(LEFT_IN2, 0)
-    GPIO.output(RIGHT_IN3,0); GPIO.output(RIGHT_IN4,0)
-
-def left_forward(on=True):
-    GPIO.output(LEFT_IN1, 1 if on else 0)
-    GPIO.output(LEFT_IN2, 0 if on else 0)
-
-def left_backward(on=True):
-    GPIO.output(LEFT_IN1, 0 if on else 0)
-    GPIO.output(LEFT_IN2, 1 if on else 0)
-
-def right_forward(on=True):
-    GPIO.output(RIGHT_IN3, 1 if on else 0)
-    GPIO.output(RIGHT_IN4, 0 if on else 0)
-
-def right_backward(on=True):
-    GPIO.output(RIGHT_IN3, 0 if on else 0)
-    GPIO.output(RIGHT_IN4, 1 if on else 0)
-
-def motors_backward(t=0):
-    left_backward(True); right_backward(True)
-    if t>0:
-        time.sleep(t); motors_stop()
-
-def tank_turn_180_ccw():
-    # Left forward, Right backward -> spin in place (CCW viewed from above)
-    left_forward(True); right_backward(True)
-    time.sleep(TURN_180_S)
-    motors_stop()
-
-def distance_cm():
-    GPIO.output(TRIG, GPIO.LOW); time.sleep(0.00001)
-    GPIO.output(TRIG, GPIO.HIGH); time.sleep(0.00001)
-    GPIO.output(TRIG, GPIO.LOW)
-
-    t0 = time.time()
-    while GPIO.input(ECHO) == 0:
-        if time.time() - t0 > TIMEOUT_S: return None
-    start = time.time()
-    while GPIO.input(ECHO) == 1:
-        if time.time() - start > TIMEOUT_S: return None
-    end = time.time()
-
-    dur = end - start
-    return (dur * 34300.0) / 2.0
+TURN_180_S = 1.0     # first guess for the turn model; measured with VANIS_IMU / VANIS_ENCODERS (hal/turn.py)
 
 def main():
-    GPIO.setmode(GPIO.BCM)
-
-    for p in (LEFT_IN1, LEFT_IN2, RIGHT_IN3, RIGHT_IN4):
-        GPIO.setup(p, GPIO.OUT); GPIO.output(p, 0)
-
-    GPIO.setup(TRIG, GPIO.OUT); GPIO.output(TRIG, GPIO.LOW)
-    GPIO.setup(ECHO, GPIO.IN)
-
-    GPIO.setup(SERVO, GPIO.OUT)
-    servo = GPIO.PWM(SERVO, 50)
-    servo.start(angle_to_duty(60))
-    time.sleep(0.3)
-
-    direction = +1
-    angle = SWEEP_MIN
-    state = "SWEEP"
-    near_ct = 0
-    hide_start = None
+    bot = Robot("rpi", servo=SERVO, trig=TRIG, echo=ECHO,
+                left=(LEFT_IN1, LEFT_IN2), right=(RIGHT_IN3, RIGHT_IN4), timeout_s=TIMEOUT_S)
+    turner = make_turner(bot, TURN_180_S)     # turns by angle, not by time
+    planner = (AdaptiveSweep((SWEEP_MIN, SWEEP_MAX)) if ADAPTIVE_SWEEP
+               else FixedSweep((SWEEP_MIN, SWEEP_MAX), STEP_DEG, STEP_DELAY))
+    sh = AsyncSweepHide(bot, hide="turn", sweep=(SWEEP_MIN, SWEEP_MAX), step_deg=STEP_DEG,
+                   step_delay=STEP_DELAY, settle_s=SETTLE_S, near_cm=NEAR_CM, near_hits=NEAR_HITS,
+                   fixed_hide_s=FIXED_HIDE_S, turn_s=TURN_180_S, turner=turner, back_s=HIDE_BACK_S,
+                   planner=planner)
 
     print("Sweep 40↔80 on GPIO17; on detect: tank-turn 180°, hide 5s. Ctrl+C to quit.")
     try:
-        while True:
-            d = distance_cm()
-
-            if state == "SWEEP":
-                if d is not None and d <= NEAR_CM:
-                    near_ct += 1
-                else:
-                    near_ct = 0
-
-                if near_ct >= NEAR_HITS:
-                    print(f"[DETECTED] {d:.1f} cm -> TANK TURN + HIDE ({FIXED_HIDE_S}s)")
-                    # Face away and tank turn
-                    servo.ChangeDutyCycle(angle_to_duty(180))
-                    time.sleep(SETTLE_S)
-
-                    # Optional tiny reverse before spin:
-                    if HIDE_BACK_S > 0: motors_backward(HIDE_BACK_S)
-
-                    tank_turn_180_ccw()   # spin in place
-                    motors_stop()
-
-                    state = "HIDING"
-                    hide_start = time.time()
-                    continue
-
-                # normal sweep
-                servo.ChangeDutyCycle(angle_to_duty(angle))
-                time.sleep(STEP_DELAY)
-                angle += direction * STEP_DEG
-                if angle >= SWEEP_MAX:
-                    angle = SWEEP_MAX; direction = -1
-                elif angle <= SWEEP_MIN:
-                    angle = SWEEP_MIN; direction = +1
-
-            else:  # HIDING
-                if time.time() - hide_start >= FIXED_HIDE_S:
-                    print("[DONE HIDING] Returning to sweep")
-                    servo.ChangeDutyCycle(angle_to_duty(60))
-                    time.sleep(SETTLE_S)
-                    state = "SWEEP"
-                    near_ct = 0
-                    angle = SWEEP_MIN
-                    direction = +1
-                else:
-                    time.sleep(0.05)
-
+        asyncio.run(sh.run())
     except KeyboardInterrupt:
         pass
     finally:
-        motors_stop()
-        servo.stop()
-        GPIO.cleanup()
+        deg_s, pings_s = planner.rates()
+        print(f"sweep: {deg_s:.0f} deg/s, {pings_s:.1f} pings/s")
+        turner.close()
+        bot.close()
 
 if __name__ == "__main__":
     main()
-
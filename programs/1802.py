@@ -1,6 +1,6 @@
 # sweep_hide_tank_full.py
-import RPi.GPIO as GPIO
-import time
+from hal import Robot, make_turner
+from sweep_hide import SweepHide
 
 # ---- PINS (BCM) ----
 SERVO = 17
@@ -23,25 +23,25 @@ TIMEOUT_S    = 0.025
 FIXED_HIDE_S = 5.0     # stay hiding exactly 5s
 
 # ---- TANK TURN ----
-TURN_180_S = 1.0       # tune: ~0.8–1.5s for ~180° spin
-
-# ===== Helpers =====
-def angle_to_duty(deg: float) -> float:
-    return 2.5 + (deg/180.0)*10.0   # 50Hz PWM, 0.5–2.5ms
-
-def motors_stop():
-    GPIO.output(LEFT_IN1, 0); GPIO.output(LEFT_IN2, 0)
-    GPIO.output(RIGHT_IN3,0); GPIO.output(RIGHT_IN4,0)
-
-def left_forward(on=True):
-    GPIO.output(LEFT_IN1, 1 if on else 0)
-    GPIO.output(LEFT_IN2, 0)
-
-def right_backward(on=True):
-    GPIO.output(RIGHT_IN3, 0)
-    GPIO.output(RIGHT_IN4, 1 if on else 0)
-
-def tank_turn_ccw(duration_s: float):
-    # LEFT forward + RIGHT backward -> spin in place (CCW)
-    left
-
+TURN_180_S = 1.0       # first guess for the turn model; measured with VANIS_IMU / VANIS_ENCODERS (hal/turn.py)
+
+# ===== Main =====
+def main():
+    bot = Robot("rpi", servo=SERVO, trig=TRIG, echo=ECHO,
+                left=(LEFT_IN1, LEFT_IN2), right=(RIGHT_IN3, RIGHT_IN4), timeout_s=TIMEOUT_S)
+    turner = make_turner(bot, TURN_180_S)     # turns by angle, not by time
+    sh = SweepHide(bot, hide="turn", sweep=(SWEEP_MIN, SWEEP_MAX), step_deg=STEP_DEG,
+                   step_delay=STEP_DELAY, settle_s=SETTLE_S, near_cm=NEAR_CM, near_hits=NEAR_HITS,
+                   fixed_hide_s=FIXED_HIDE_S, turn_s=TURN_180_S, turner=turner)
+
+    print("Sweep 40↔80 on GPIO17; on detect: LEFT fwd + RIGHT back (tank turn), hide 5s.")
+    try:
+        sh.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        turner.close()
+        bot.close()
+
+if __name__ == "__main__":
+    main()
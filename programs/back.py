@@ -1,15 +1,18 @@
 # sweep_hide_tank_full.py
-# Pi 5 friendly (uses python3-rpi-lgpio as RPi.GPIO)
+# Pi 5 friendly (uses python3-rpi-lgpio as RPi.GPIO; VANIS_GPIO=sim to run off-robot)
 # Behavior:
 # - Sweep servo (GPIO17) 40↔80 degrees.
 # - If ultrasonic detects object (<= NEAR_CM for NEAR_HITS reads):
-#     * Turn CCW in place (left fwd + right back) for TURN_180_S.
+#     * Turn CCW in place (left fwd + right back) by 180° (hal/turn.py: by heading when there is an IMU/encoders).
 #     * Stay "hiding" for FIXED_HIDE_S.
-#     * Turn CW in place (left back + right fwd) for TURN_180_S to face original direction.
+#     * Turn CW in place (left back + right fwd) back to the original heading.
 # - Resume sweep.
+# Ranging keeps running during the turns; a new obstacle mid-turn stops the turn.
 
-import RPi.GPIO as GPIO
-import time
+import asyncio
+from hal import Robot, make_turner
+from sweep_hide_async import AsyncSweepHide
+from sweep_planner import FixedSweep, AdaptiveSweep
 
 # ---- PINS (BCM) ----
 SERVO = 17
@@ -24,6 +27,7 @@ SWEEP_MAX = 80
 STEP_DEG  = 2
 STEP_DELAY = 0.03
 SETTLE_S   = 0.10
+ADAPTIVE_SWEEP = True  # coarse steps over empty arc, fine + repeated pings near things
 
 # ---- LOGIC / ULTRASONIC ----
 NEAR_CM      = 35
@@ -32,141 +36,30 @@ TIMEOUT_S    = 0.025
 FIXED_HIDE_S = 5.0     # stay hiding exactly 5s
 
 # ---- TANK TURN ----
-TURN_180_S = 0.7   # ~180° spin time (tune 0.6–1.0 as needed)
-
-# ===== Helpers =====
-def angle_to_duty(deg: float) -> float:
-    # 50Hz PWM, 0.5–2.5ms pulse => ~2.5–12.5% duty
-    return 2.5 + (deg/180.0)*10.0
-
-def motors_stop():
-    GPIO.output(LEFT_IN1, 0); GPIO.output(LEFT_IN2, 0)
-    GPIO.output(RIGHT_IN3,0); GPIO.output(RIGHT_IN4,0)
-
-def left_forward(on=True):
-    GPIO.output(LEFT_IN1, 1 if on else 0)
-    GPIO.output(LEFT_IN2, 0)
-
-def right_backward(on=True):
-    GPIO.output(RIGHT_IN3, 0)
-    GPIO.output(RIGHT_IN4, 1 if on else 0)
-
-def left_backward(on=True):
-    GPIO.output(LEFT_IN1, 0)
-    GPIO.output(LEFT_IN2, 1 if on else 0)
-
-def right_forward(on=True):
-    GPIO.output(RIGHT_IN3, 1 if on else 0)
-    GPIO.output(RIGHT_IN4, 0)
-
-def tank_turn_ccw(duration_s: float):
-    # LEFT forward + RIGHT backward -> spin CCW
-    left_forward(True)
-    right_backward(True)
-    time.sleep(duration_s)
-    motors_stop()
-
-def tank_turn_cw(duration_s: float):
-    # LEFT backward + RIGHT forward -> spin CW
-    left_backward(True)
-    right_forward(True)
-    time.sleep(duration_s)
-    motors_stop()
-
-def distance_cm():
-    # 10us trigger
-    GPIO.output(TRIG, GPIO.LOW); time.sleep(0.00001)
-    GPIO.output(TRIG, GPIO.HIGH); time.sleep(0.00001)
-    GPIO.output(TRIG, GPIO.LOW)
-
-    t0 = time.time()
-    while GPIO.input(ECHO) == 0:
-        if time.time() - t0 > TIMEOUT_S:
-            return None
-    start = time.time()
-
-    while GPIO.input(ECHO) == 1:
-        if time.time() - start > TIMEOUT_S:
-            return None
-    end = time.time()
-
-    dur = end - start
-    return (dur * 34300.0) / 2.0
+TURN_180_S = 0.7   # first guess for the turn model; measured with VANIS_IMU / VANIS_ENCODERS (hal/turn.py)
 
 # ===== Main =====
 def main():
-    GPIO.setmode(GPIO.BCM)
-
-    # Motors
-    for p in (LEFT_IN1, LEFT_IN2, RIGHT_IN3, RIGHT_IN4):
-        GPIO.setup(p, GPIO.OUT); GPIO.output(p, 0)
-
-    # Ultrasonic
-    GPIO.setup(TRIG, GPIO.OUT); GPIO.output(TRIG, GPIO.LOW)
-    GPIO.setup(ECHO, GPIO.IN)
-
-    # Servo
-    GPIO.setup(SERVO, GPIO.OUT)
-    servo = GPIO.PWM(SERVO, 50)
-    servo.start(angle_to_duty(60))  # mid-ish
-    time.sleep(0.3)
-
-    direction = +1
-    angle = SWEEP_MIN
-    state = "SWEEP"
-    near_ct = 0
-    hide_start = None
+    bot = Robot("rpi", servo=SERVO, trig=TRIG, echo=ECHO,
+                left=(LEFT_IN1, LEFT_IN2), right=(RIGHT_IN3, RIGHT_IN4), timeout_s=TIMEOUT_S)
+    turner = make_turner(bot, TURN_180_S)     # turns by angle, not by time
+    planner = (AdaptiveSweep((SWEEP_MIN, SWEEP_MAX)) if ADAPTIVE_SWEEP
+               else FixedSweep((SWEEP_MIN, SWEEP_MAX), STEP_DEG, STEP_DELAY))
+    sh = AsyncSweepHide(bot, hide="turn_back", sweep=(SWEEP_MIN, SWEEP_MAX), step_deg=STEP_DEG,
+                   step_delay=STEP_DELAY, settle_s=SETTLE_S, near_cm=NEAR_CM, near_hits=NEAR_HITS,
+                   fixed_hide_s=FIXED_HIDE_S, turn_s=TURN_180_S, turner=turner,
+                   planner=planner)
 
     print("Sweep 40↔80 on GPIO17; detect -> CCW turn, hide 5s, CW turn back, resume sweep.")
     try:
-        while True:
-            d = distance_cm()
-
-            if state == "SWEEP":
-                if d is not None and d <= NEAR_CM:
-                    near_ct += 1
-                else:
-                    near_ct = 0
-
-                if near_ct >= NEAR_HITS:
-                    print(f"[DETECTED] {d:.1f} cm -> CCW turn + HIDE ({FIXED_HIDE_S}s)")
-                    # Face "away" with servo (optional visual), then tank turn CCW
-                    servo.ChangeDutyCycle(angle_to_duty(180))
-                    time.sleep(SETTLE_S)
-                    tank_turn_ccw(TURN_180_S)
-                    state = "HIDING"
-                    hide_start = time.time()
-                    continue
-
-                # normal sweep
-                servo.ChangeDutyCycle(angle_to_duty(angle))
-                time.sleep(STEP_DELAY)
-                angle += direction * STEP_DEG
-                if angle >= SWEEP_MAX:
-                    angle = SWEEP_MAX; direction = -1
-                elif angle <= SWEEP_MIN:
-                    angle = SWEEP_MIN; direction = +1
-
-            else:  # HIDING
-                if time.time() - hide_start >= FIXED_HIDE_S:
-                    print("[DONE HIDING] Turning back CW, then resume sweep")
-                    tank_turn_cw(TURN_180_S)              # reverse the first spin
-                    servo.ChangeDutyCycle(angle_to_duty(60))
-                    time.sleep(SETTLE_S)
-                    state = "SWEEP"
-                    near_ct = 0
-                    angle = SWEEP_MIN
-                    direction = +1
-                else:
-                    time.sleep(0.05)
-
+        asyncio.run(sh.run())
     except KeyboardInterrupt:
         pass
     finally:
-        motors_stop()
-        servo.stop()
-        GPIO.cleanup()
+        deg_s, pings_s = planner.rates()
+        print(f"sweep: {deg_s:.0f} deg/s, {pings_s:.1f} pings/s")
+        turner.close()
+        bot.close()
 
 if __name__ == "__main__":
     main()
-
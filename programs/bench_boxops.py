@@ -0,0 +1,92 @@
+# bench_boxops.py
+# Micro-benchmark: boxops.py (NumPy) vs the pure-Python iou()/nms()/agreement/
+# persistence loops that face_body_detect.py used before. Also checks both
+# give the same boxes.
+#
+#   python bench_boxops.py            # N = 5, 20, 50, 100 candidates
+
+import sys, random, timeit
+from collections import deque
+import boxops
+
+# ==== Old pure-Python versions (reference) ====
+def py_iou(a, b):
+    ax1, ay1, aw, ah = a; ax2, ay2 = ax1+aw, ay1+ah
+    bx1, by1, bw, bh = b; bx2, by2 = bx1+bw, by1+bh
+    inter = max(0, min(ax2,bx2)-max(ax1,bx1)) * max(0, min(ay2,by2)-max(ay1,by1))
+    ua = aw*ah + bw*bh - inter
+    return inter/ua if ua>0 else 0.0
+
+def py_nms(boxes, iou_thresh=0.4):
+    if not boxes: return []
+    boxes = sorted(boxes, key=lambda b: b[2]*b[3], reverse=True)
+    keep=[]
+    while boxes:
+        b = boxes.pop(0)
+        keep.append(b)
+        boxes = [x for x in boxes if py_iou(b,x) < iou_thresh]
+    return keep
+
+def py_agree(haar, hog_boxes):
+    agreed = []
+    for b in haar:
+        for c in hog_boxes:
+            if py_iou(b, c) >= 0.3:
+                agreed.append(b if (b[2]*b[3] >= c[2]*c[3]) else c)
+                break
+    return agreed
+
+def py_persistent(merged, history):
+    return [b for b in merged
+            if sum(1 for past in history for pb in past if py_iou(b, pb) >= 0.4) >= 2]
+
+# ==== Vectorized versions, same call shape ====
+def np_persistent(merged, history):
+    return merged[boxops.history_count(merged, history, 0.4) >= 2]
+
+# ==== Data ====
+def clustered_boxes(n, rng, w=640, h=480, people=3):
+    # candidates clump around a few "people", like Haar on a busy scene
+    centers = [(rng.randint(80, w-80), rng.randint(120, h-120)) for _ in range(people)]
+    out = []
+    for _ in range(n):
+        cx, cy = rng.choice(centers)
+        bw, bh = rng.randint(40, 110), rng.randint(90, 220)
+        out.append((cx - bw//2 + rng.randint(-15, 15), cy - bh//2 + rng.randint(-15, 15), bw, bh))
+    return out
+
+def bench(label, fn, number):
+    t = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    return label, t * 1e6
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [5, 20, 50, 100]
+    rng = random.Random(0)
+    print(f"{'N':>4}  {'op':<12} {'python us':>10} {'numpy us':>10} {'speedup':>8}")
+    for n in sizes:
+        haar = clustered_boxes(n, rng)
+        hog_boxes = clustered_boxes(max(1, n // 3), rng)
+        history = deque([clustered_boxes(max(1, n // 4), rng) for _ in range(6)], maxlen=6)
+        np_haar, np_hog = boxops.as_boxes(haar), boxops.as_boxes(hog_boxes)
+        np_hist = deque([boxops.as_boxes(h) for h in history], maxlen=6)
+        number = max(3, 2000 // n)
+
+        # same answers first
+        assert boxops.to_list(boxops.nms(np_haar, 0.4)) == [tuple(b) for b in py_nms(haar, 0.4)]
+        assert boxops.to_list(boxops.agree(np_haar, np_hog)) == [tuple(b) for b in py_agree(haar, hog_boxes)]
+        assert boxops.to_list(np_persistent(np_haar, np_hist)) == [tuple(b) for b in py_persistent(haar, history)]
+
+        cases = [
+            ("iou pairs", lambda: [[py_iou(a, b) for b in hog_boxes] for a in haar],
+                          lambda: boxops.iou_matrix(np_haar, np_hog)),
+            ("nms",       lambda: py_nms(haar, 0.4), lambda: boxops.nms(np_haar, 0.4)),
+            ("agree",     lambda: py_agree(haar, hog_boxes), lambda: boxops.agree(np_haar, np_hog)),
+            ("persist",   lambda: py_persistent(haar, history), lambda: np_persistent(np_haar, np_hist)),
+        ]
+        for op, py_fn, np_fn in cases:
+            _, t_py = bench(op, py_fn, number)
+            _, t_np = bench(op, np_fn, number)
+            print(f"{n:>4}  {op:<12} {t_py:>10.1f} {t_np:>10.1f} {t_py/t_np:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
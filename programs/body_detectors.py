@@ -0,0 +1,275 @@
+# body_detectors.py
+# Person ("body") detectors behind one interface, so the live loops and
+# replay_bench.py can swap them:
+#   haarhog  Haar upper/full body + HOG, agreement/NMS fusion (face_body_detect.py) - the baseline
+#   haar     person_detect_test.py's full-resolution Haar cascades
+#   dnn      SSD / YOLO person model on the CPU through cv2.dnn
+#   ort      the same ONNX models through ONNX Runtime (pip install onnxruntime)
+# Every detector returns boxes (x, y, w, h) in frame pixels. detect(frame, rois)
+# scans the motion-gate ROIs like run_in_rois; detect_batch(frames) takes one
+# frame per camera and, for the DNN backends, runs them (and ROI crops) as one
+# batched forward pass when the model has a dynamic batch axis.
+#
+#   det = body_detectors.make("dnn", model="models/yolov8n.onnx", input_size=320, threads=4)
+#   boxes = det.detect(frame)
+#   per_cam = det.detect_batch([frame0, frame1])
+#
+# The scripts pick one with BODY_DETECTOR (default: their old Haar/HOG code),
+# BODY_MODEL, BODY_INPUT, BODY_THREADS and BODY_PRECISION=fp32|fp16|int8.
+# fp16/int8 first look for a "<model>-fp16.onnx" / "<model>-int8.onnx" file
+# next to the model; fp16 without one runs the fp32 model with OpenCV's FP16
+# CPU target (fast on the Pi 5's Cortex-A76). Models are not bundled.
+
+import os
+import numpy as np
+import cv2
+
+BODY_DETECTOR = os.getenv("BODY_DETECTOR", "")
+BODY_MODEL = os.getenv("BODY_MODEL", "models/yolov8n.onnx")
+BODY_INPUT = int(os.getenv("BODY_INPUT", "320"))
+BODY_THREADS = int(os.getenv("BODY_THREADS", "0"))         # 0 = library default
+BODY_PRECISION = os.getenv("BODY_PRECISION", "fp32")
+
+# ==== Interface ====
+class BodyDetector:
+    name = "?"
+
+    def detect_batch(self, frames):
+        """One box list per frame."""
+        raise NotImplementedError
+
+    def detect(self, frame, rois=None):
+        """Boxes in frame; rois as from MotionGate.rois() (None = whole frame)."""
+        if rois is None:
+            return self.detect_batch([frame])[0]
+        crops = [frame[y:y+h, x:x+w] for (x, y, w, h) in rois]
+        out = []
+        for (x, y, _, _), boxes in zip(rois, self.detect_batch(crops) if crops else []):
+            out += [(bx + x, by + y, bw, bh) for (bx, by, bw, bh) in boxes]
+        return out
+
+    def reset(self):
+        """Forget per-stream state (start of a new video / stream)."""
+
+# ==== Baselines ====
+class HaarHog(BodyDetector):
+    """face_body_detect.py's Haar + HOG fusion. Its persistence filter keeps
+    one history per instance, so use one instance per stream and not with
+    detect_batch across streams."""
+    name = "haarhog"
+
+    def __init__(self):
+        import face_body_detect as fbd
+        fbd.init_detectors(("haar", "hog"))
+        self.fbd = fbd
+        self.history = fbd.BodyHistory()
+
+    def detect(self, frame, rois=None):
+        return self.fbd.detect_haarhog(frame, rois, self.history)
+
+    def detect_batch(self, frames):
+        return [self.fbd.detect_haarhog(f, history=self.history) for f in frames]
+
+    def reset(self):
+        self.history.clear()
+
+class Haar(BodyDetector):
+    name = "haar"
+
+    def __init__(self):
+        import person_detect_test as pdt
+        self.pdt = pdt
+
+    def detect_batch(self, frames):
+        return [self.pdt.detect_body_haar(f) for f in frames]
+
+# ==== DNN ====
+def model_variant(path, precision):
+    """models/x.onnx + "int8" -> models/x-int8.onnx if that exists."""
+    if precision in ("fp16", "int8"):
+        stem, ext = os.path.splitext(path)
+        for cand in (f"{stem}-{precision}{ext}", f"{stem}_{precision}{ext}"):
+            if os.path.exists(cand):
+                return cand, True
+        if precision == "int8":
+            raise FileNotFoundError(f"int8 needs a quantized model next to {path} ({stem}-int8{ext})")
+    return path, False
+
+class DnnDetector(BodyDetector):
+    """kind "yolo": YOLOv5/v8-style ONNX (letterboxed input, (cx, cy, w, h) +
+    scores per anchor). kind "ssd": SSD DetectionOutput rows
+    [batch, class, conf, x1, y1, x2, y2] (e.g. MobileNet-SSD Caffe with its
+    .prototxt as config; person_class 15 for VOC, 1 for COCO TF models)."""
+    name = "dnn"
+
+    def __init__(self, model=BODY_MODEL, config=None, kind=None, input_size=None, threads=BODY_THREADS,
+                 precision=BODY_PRECISION, conf=0.4, nms=0.45, person_class=None, num_classes=80,
+                 scale=None, mean=None, swap_rb=None):
+        self.model, native = model_variant(model, precision)
+        self.config = config
+        self.kind = kind or ("yolo" if self.model.endswith(".onnx") else "ssd")
+        yolo = self.kind == "yolo"
+        self.size = input_size or (BODY_INPUT if yolo else 300)
+        self.conf, self.nms = conf, nms
+        self.person = (0 if yolo else 15) if person_class is None else person_class
+        self.num_classes = num_classes
+        self.scale = (1 / 255.0 if yolo else 1 / 127.5) if scale is None else scale
+        self.mean = (0.0 if yolo else 127.5) if mean is None else mean
+        self.swap_rb = yolo if swap_rb is None else swap_rb
+        self.threads, self.precision = threads, precision
+        self.batch_ok = True                # cleared the first time a batched forward fails
+        self._canvas = {}                   # letterbox canvases, reused
+        self._load(native)
+
+    def _load(self, native):
+        if self.threads:
+            cv2.setNumThreads(self.threads)     # process-wide: Haar/HOG share the pool
+        self.net = cv2.dnn.readNet(self.model, self.config_path())
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        if self.precision == "fp16" and not native:
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU_FP16)
+        else:
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def config_path(self):
+        if self.config:
+            return self.config
+        if self.model.endswith(".caffemodel"):
+            proto = os.path.splitext(self.model)[0] + ".prototxt"
+            return proto if os.path.exists(proto) else ""
+        return ""
+
+    # ---- pre / post ----
+    def _letterbox(self, frame, i):
+        """frame resized into a size x size canvas (aspect kept, grey padding).
+        Returns (canvas, ratio, pad_x, pad_y)."""
+        s = self.size
+        h, w = frame.shape[:2]
+        r = min(s / w, s / h)
+        nw, nh = max(1, round(w * r)), max(1, round(h * r))
+        px, py = (s - nw) // 2, (s - nh) // 2
+        canvas = self._canvas.get(i)
+        if canvas is None:
+            canvas = self._canvas[i] = np.full((s, s, 3), 114, np.uint8)
+        else:
+            canvas[:] = 114
+        cv2.resize(frame, (nw, nh), dst=canvas[py:py+nh, px:px+nw], interpolation=cv2.INTER_LINEAR)
+        return canvas, r, px, py
+
+    def _blob(self, frames):
+        if self.kind == "yolo":
+            boxes = [self._letterbox(f, i) for i, f in enumerate(frames)]
+            imgs = [b[0] for b in boxes]
+            geo = [b[1:] for b in boxes]
+        else:
+            imgs, geo = frames, None
+        blob = cv2.dnn.blobFromImages(imgs, self.scale, (self.size, self.size),
+                                      (self.mean,) * 3, swapRB=self.swap_rb, crop=False)
+        return blob, geo
+
+    def _forward(self, blob):
+        self.net.setInput(blob)
+        return self.net.forward()
+
+    def _run(self, blob):
+        """Raw output for the whole batch, one frame at a time if the model
+        has a fixed batch of 1."""
+        if len(blob) > 1 and self.batch_ok:
+            try:
+                return self._forward(blob), True
+            except cv2.error:
+                self.batch_ok = False
+        return [self._forward(blob[i:i+1]) for i in range(len(blob))], False
+
+    def _keep(self, boxes, scores):
+        if not boxes:
+            return []
+        idx = cv2.dnn.NMSBoxes(boxes, scores, self.conf, self.nms)
+        return [tuple(int(v) for v in boxes[i]) for i in np.array(idx).reshape(-1)]
+
+    def _yolo(self, out, frame, geo):
+        o = out
+        if o.shape[0] < o.shape[1]:
+            o = o.T                                 # v8: (4 + nc, anchors) -> (anchors, 4 + nc)
+        if o.shape[1] == 5 + self.num_classes:      # v5: objectness * class score
+            score = o[:, 4] * o[:, 5 + self.person]
+        else:
+            score = o[:, 4 + self.person]
+        keep = score >= self.conf
+        o, score = o[keep], score[keep]
+        r, px, py = geo
+        h, w = frame.shape[:2]
+        x0 = np.clip((o[:, 0] - o[:, 2] / 2 - px) / r, 0, w)
+        y0 = np.clip((o[:, 1] - o[:, 3] / 2 - py) / r, 0, h)
+        x1 = np.clip((o[:, 0] + o[:, 2] / 2 - px) / r, 0, w)
+        y1 = np.clip((o[:, 1] + o[:, 3] / 2 - py) / r, 0, h)
+        boxes = np.stack([x0, y0, x1 - x0, y1 - y0], axis=1)
+        return self._keep(boxes.tolist(), score.tolist())
+
+    def _ssd(self, out, frame, b):
+        rows = out.reshape(-1, 7)
+        rows = rows[(rows[:, 0] == b) & (rows[:, 1] == self.person) & (rows[:, 2] >= self.conf)]
+        h, w = frame.shape[:2]
+        x0, y0 = np.clip(rows[:, 3] * w, 0, w), np.clip(rows[:, 4] * h, 0, h)
+        x1, y1 = np.clip(rows[:, 5] * w, 0, w), np.clip(rows[:, 6] * h, 0, h)
+        boxes = np.stack([x0, y0, x1 - x0, y1 - y0], axis=1)
+        return self._keep(boxes.tolist(), rows[:, 2].tolist())
+
+    def decode(self, outs, batched, frames, geo):
+        res = []
+        for b, f in enumerate(frames):
+            out, k = (outs, b) if batched else (outs[b], 0)
+            if self.kind == "yolo":
+                res.append(self._yolo(out[k], f, geo[b]))
+            else:
+                res.append(self._ssd(out, f, k))        # SSD rows carry their batch index
+        return res
+
+    def detect_batch(self, frames):
+        if not frames:
+            return []
+        blob, geo = self._blob(frames)
+        outs, batched = self._run(blob)
+        return self.decode(outs, batched, frames, geo)
+
+class OrtDetector(DnnDetector):
+    """DnnDetector's pre/post-processing with ONNX Runtime doing the forward pass."""
+    name = "ort"
+
+    def _load(self, native):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            opts.intra_op_num_threads = self.threads
+        self.sess = ort.InferenceSession(self.model, opts, providers=["CPUExecutionProvider"])
+        inp = self.sess.get_inputs()[0]
+        self.input_name = inp.name
+        self.batch_ok = not isinstance(inp.shape[0], int) or inp.shape[0] != 1
+        self.fp16_input = "float16" in inp.type
+
+    def _forward(self, blob):
+        if self.fp16_input:
+            blob = blob.astype(np.float16)
+        return self.sess.run(None, {self.input_name: blob})[0].astype(np.float32)
+
+    def _run(self, blob):
+        if len(blob) > 1 and self.batch_ok:
+            return self._forward(blob), True
+        return [self._forward(blob[i:i+1]) for i in range(len(blob))], False
+
+# ==== Registry ====
+BACKENDS = {"haarhog": HaarHog, "haar": Haar, "dnn": DnnDetector, "ort": OrtDetector}
+_shared = {}
+
+def make(name, **kw):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown body detector {name!r} (have: {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kw)
+
+def get(name):
+    """One shared instance per backend, configured from the BODY_* env vars."""
+    det = _shared.get(name)
+    if det is None:
+        det = _shared[name] = make(name)
+    return det
@@ -0,0 +1,78 @@
+# boxops.py
+# Batched box maths for the body detectors.
+# Boxes are (N,4) arrays of (x, y, w, h) in pixels. Everything is computed as
+# whole-array NumPy ops, so cost stays flat when the Haar cascades spit out
+# dozens of candidates on a cluttered frame. bench_boxops.py compares these
+# against the old pure-Python iou()/nms() loops.
+
+import numpy as np
+
+def as_boxes(boxes):
+    """Anything box-like (list of tuples, cv2 rects, array) -> (N,4) int64 array."""
+    return np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+
+def to_list(boxes):
+    """(N,4) array -> list of plain-int tuples (what cv2.rectangle and the UI code use)."""
+    return [tuple(b) for b in as_boxes(boxes).tolist()]
+
+def area(boxes):
+    b = as_boxes(boxes)
+    return b[:, 2] * b[:, 3]
+
+def iou_matrix(a, b):
+    """Pairwise IoU, shape (len(a), len(b))."""
+    a = as_boxes(a).astype(np.float64)
+    b = as_boxes(b).astype(np.float64)
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+def nms(boxes, iou_thresh=0.4):
+    """Greedy NMS, biggest box first (same order and result as the old loop)."""
+    boxes = as_boxes(boxes)
+    if len(boxes) == 0:
+        return boxes
+    boxes = boxes[np.argsort(-area(boxes), kind="stable")]
+    over = iou_matrix(boxes, boxes) >= iou_thresh
+    alive = np.ones(len(boxes), dtype=bool)
+    keep = []
+    for i in range(len(boxes)):
+        if alive[i]:
+            keep.append(i)
+            alive &= ~over[i]
+    return boxes[keep]
+
+def geom_mask(boxes, frame_w, frame_h):
+    """Person-shaped boxes only: not tiny, upright aspect, not glued to the top edge."""
+    b = as_boxes(boxes)
+    ar = b[:, 2] / (b[:, 3] + 1e-6)
+    return ((b[:, 2] * b[:, 3] >= 0.01 * frame_w * frame_h)
+            & (ar >= 0.25) & (ar <= 0.8)
+            & (b[:, 1] >= 0.05 * frame_h))
+
+def agree(haar, hog_boxes, iou_thresh=0.3):
+    """For each Haar box, its first HOG match (IoU >= thresh); keep the larger of the pair."""
+    haar, hog_boxes = as_boxes(haar), as_boxes(hog_boxes)
+    if len(haar) == 0 or len(hog_boxes) == 0:
+        return haar[:0]
+    match = iou_matrix(haar, hog_boxes) >= iou_thresh
+    rows = np.flatnonzero(match.any(axis=1))
+    cols = match[rows].argmax(axis=1)
+    take_haar = area(haar[rows]) >= area(hog_boxes[cols])
+    return np.where(take_haar[:, None], haar[rows], hog_boxes[cols])
+
+def history_count(boxes, history, iou_thresh=0.4):
+    """How many boxes across all past frames in `history` overlap each box."""
+    boxes = as_boxes(boxes)
+    past = [as_boxes(h) for h in history]
+    past = np.concatenate(past) if past else boxes[:0]
+    if len(boxes) == 0 or len(past) == 0:
+        return np.zeros(len(boxes), dtype=np.int64)
+    return (iou_matrix(boxes, past) >= iou_thresh).sum(axis=1)
@@ -0,0 +1,231 @@
+# cadence.py
+# Detect-then-track scheduler for the vision loops.
+# The heavy detectors (MediaPipe / Haar / HOG) only run every `interval` frames;
+# in between, the last boxes are carried forward by a cheap tracker (sparse
+# Lucas-Kanade optical flow by default, or OpenCV KCF/CSRT). A full detection
+# is forced early when tracking confidence drops or something moves outside
+# the tracked boxes. With adaptive=True the interval grows by one while tracking
+# keeps agreeing with the detector, shrinks by one when it doesn't, and halves
+# after a lost track or unexpected motion.
+#
+#   sched = DetectScheduler(interval=5)
+#   (faces, bodies), detected = sched.update(frame, lambda f: (detect_faces(f), detect_bodies(f)))
+
+import numpy as np
+import cv2
+import boxops
+import preproc
+
+MOTION_W = 160          # motion check runs on a frame this wide
+MOTION_DIFF = 25        # grey-level change that counts as "moved"
+
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+def _clip_box(b, w, h):
+    x, y, bw, bh = (int(v) for v in b)
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(w, x + bw), min(h, y + bh)
+    return x0, y0, x1, y1
+
+# ==== Trackers ====
+class FlowTracker:
+    """Moves each box by the median LK flow of feature points inside it."""
+    MIN_POINTS = 4
+    FB_ERR = 1.0        # forward-backward error (px) above which a point is dropped
+
+    def __init__(self):
+        self.boxes, self.points = [], []
+
+    def init(self, gray, boxes):
+        h, w = gray.shape[:2]
+        self.boxes, self.points = [], []
+        for b in boxes:
+            x0, y0, x1, y1 = _clip_box(b, w, h)
+            pts = None
+            if x1 - x0 >= 8 and y1 - y0 >= 8:
+                pts = cv2.goodFeaturesToTrack(gray[y0:y1, x0:x1], maxCorners=40,
+                                              qualityLevel=0.01, minDistance=4)
+            if pts is not None:
+                pts = pts.reshape(-1, 2) + (x0, y0)
+            self.boxes.append(np.array(b, dtype=np.float64))
+            self.points.append(pts)
+
+    def update(self, prev_gray, gray):
+        """Returns (boxes, confidence per box in 0..1)."""
+        if not self.boxes:
+            return [], []
+        counts = [0 if p is None else len(p) for p in self.points]
+        if not sum(counts):
+            return [tuple(int(v) for v in b) for b in self.boxes], [0.0] * len(self.boxes)
+
+        p0 = np.concatenate([p for p in self.points if p is not None]).astype(np.float32).reshape(-1, 1, 2)
+        p1, st, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, p0, None, **LK_PARAMS)
+        p0r, st_b, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, p1, None, **LK_PARAMS)
+        fb = np.linalg.norm((p0 - p0r).reshape(-1, 2), axis=1)
+        good = (st.ravel() == 1) & (st_b.ravel() == 1) & (fb < self.FB_ERR)
+        p0, p1 = p0.reshape(-1, 2), p1.reshape(-1, 2)
+
+        out, conf, i = [], [], 0
+        for k, n in enumerate(counts):
+            if n == 0:
+                out.append(tuple(int(v) for v in self.boxes[k])); conf.append(0.0)
+                continue
+            g = good[i:i+n]
+            a, b = p0[i:i+n][g], p1[i:i+n][g]
+            i += n
+            box = self.boxes[k]
+            if len(a) >= self.MIN_POINTS:
+                dx, dy = np.median(b - a, axis=0)
+                # scale from how the point cloud spread changed
+                da = np.linalg.norm(a - a.mean(axis=0), axis=1)
+                db = np.linalg.norm(b - b.mean(axis=0), axis=1)
+                s = float(np.clip(np.median(db[da > 1e-3] / da[da > 1e-3]), 0.8, 1.25)) if (da > 1e-3).any() else 1.0
+                cx, cy = box[0] + box[2] / 2 + dx, box[1] + box[3] / 2 + dy
+                bw, bh = box[2] * s, box[3] * s
+                box = np.array([cx - bw / 2, cy - bh / 2, bw, bh])
+                self.boxes[k] = box
+                self.points[k] = b
+            else:
+                self.points[k] = b if len(b) else None
+            conf.append(min(1.0, len(a) / float(max(n, 1)) / 0.6))   # 60% of points kept = full confidence
+            out.append(tuple(int(round(v)) for v in box))
+        return out, conf
+
+class CvTracker:
+    """One OpenCV tracker (KCF/CSRT) per box. Needs opencv-contrib."""
+    def __init__(self, kind="kcf"):
+        mod = getattr(cv2, "legacy", cv2)
+        name = {"kcf": "TrackerKCF_create", "csrt": "TrackerCSRT_create"}[kind]
+        self._create = getattr(mod, name, None) or getattr(cv2, name)
+        self.trackers, self.boxes = [], []
+
+    def init(self, frame, boxes):
+        self.trackers, self.boxes = [], [tuple(int(v) for v in b) for b in boxes]
+        for b in self.boxes:
+            t = self._create()
+            t.init(frame, b)
+            self.trackers.append(t)
+
+    def update(self, frame):
+        out, conf = [], []
+        for k, t in enumerate(self.trackers):
+            ok, b = t.update(frame)
+            if ok:
+                self.boxes[k] = tuple(int(round(v)) for v in b)
+            out.append(self.boxes[k]); conf.append(1.0 if ok else 0.0)
+        return out, conf
+
+# ==== Scheduler ====
+class DetectScheduler:
+    def __init__(self, interval=5, adaptive=True, min_interval=1, max_interval=15,
+                 tracker="flow", min_conf=0.5, motion_frac=0.02):
+        self.interval = max(1, interval)
+        self.adaptive = adaptive
+        self.min_interval, self.max_interval = min_interval, max_interval
+        self.tracker_kind = tracker
+        self.min_conf = min_conf
+        self.motion_frac = motion_frac      # changed pixels outside boxes that force a detect
+
+        self._since = None                  # frames since last detection (None = never)
+        self._prev_gray = None
+        self._prev_small = None
+        self._sizes = []                    # boxes per group, to split tracker output
+        self._trackers = None
+        self._tracked = None                # last tracked groups, to score the tracker
+
+        # stats
+        self.confidence = 1.0
+        self.reason = "init"
+        self.detect_runs = 0
+        self.track_runs = 0
+
+    def update(self, frame, detect):
+        """Returns (groups, detected). `detect(frame)` returns a tuple of box lists."""
+        views = preproc.of(frame)           # shared with the motion gate / detectors
+        gray = views.gray()
+        w = gray.shape[1]
+        small = views.scaled(MOTION_W / w, gray=True)
+
+        reason = self._need_detect(small, w)
+        groups = None
+        if reason is None:
+            groups = self._track(frame, gray)
+            if self.confidence < self.min_conf:
+                reason = "lost"
+
+        if reason is not None:
+            groups = [list(g) for g in detect(frame)]
+            self._adapt(reason, groups)
+            self._start(frame, gray, groups)
+            self._since = 0
+            self.detect_runs += 1
+        else:
+            self._since += 1
+            self.track_runs += 1
+            self._tracked = groups
+
+        self.reason = reason or "track"
+        self._prev_gray, self._prev_small = gray, small
+        return tuple(groups), reason is not None
+
+    # ---- internals ----
+    def _need_detect(self, small, frame_w):
+        if self._since is None or self._prev_small is None or self._prev_small.shape != small.shape:
+            return "init"
+        if self._since + 1 >= self.interval:
+            return "interval"
+        moved = cv2.absdiff(small, self._prev_small) > MOTION_DIFF
+        s = small.shape[1] / float(frame_w)
+        for g in (self._tracked or []):
+            for b in g:
+                x0, y0, x1, y1 = _clip_box([v * s for v in b], small.shape[1], small.shape[0])
+                moved[y0:y1, x0:x1] = False
+        if moved.mean() > self.motion_frac:
+            return "motion"
+        return None
+
+    def _start(self, frame, gray, groups):
+        flat = [b for g in groups for b in g]
+        self._sizes = [len(g) for g in groups]
+        if self.tracker_kind == "flow":
+            self._trackers = FlowTracker()
+            self._trackers.init(gray, flat)
+        else:
+            self._trackers = CvTracker(self.tracker_kind)
+            self._trackers.init(frame, flat)
+        self._tracked = groups
+        self.confidence = 1.0
+
+    def _track(self, frame, gray):
+        if self.tracker_kind == "flow":
+            flat, conf = self._trackers.update(self._prev_gray, gray)
+        else:
+            flat, conf = self._trackers.update(frame)
+        self.confidence = min(conf) if conf else 1.0
+        groups, i = [], 0
+        for n in self._sizes:
+            groups.append(flat[i:i+n]); i += n
+        return groups
+
+    def _adapt(self, reason, groups):
+        if not self.adaptive or reason == "init":
+            return
+        if reason == "interval":
+            # tracker held up until the scheduled detect: step the interval up/down
+            step = 1 if self._agrees(groups) else -1
+            self.interval = min(self.max_interval, max(self.min_interval, self.interval + step))
+        else:
+            # lost track / unexpected motion: back off hard
+            self.interval = max(self.min_interval, self.interval // 2)
+
+    def _agrees(self, groups):
+        """Did the tracked boxes match what the detector just found?"""
+        if self._tracked is None or len(self._tracked) != len(groups):
+            return False
+        for old, new in zip(self._tracked, groups):
+            if len(old) != len(new):
+                return False
+            if len(new) and (boxops.iou_matrix(new, old).max(axis=1) < 0.5).any():
+                return False
+        return True
@@ -1,44 +1,39 @@
 import os, time, cv2
+from capture import RECONNECT_DELAY
+from frame_bus import open_frames, drawable
+from display import Display
 
 URL = os.getenv("IP_CAM_URL", "http://127.0.0.1:8080/video")
 W, H = 640, 480
-RECONNECT_DELAY = 1.0
-fps, last = 0.0, time.time()
-
-def open_cap():
-    cap = cv2.VideoCapture(URL)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, W)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, H)
-    return cap
-
-cap = open_cap()
-
-while True:
-    if not cap.isOpened():
-        cap.release()
-        cap = open_cap()
-        time.sleep(RECONNECT_DELAY)
-
-    ok, frame = cap.read()
-    if not ok or frame is None:
-        cap.release()
-        cap = open_cap()
-        time.sleep(RECONNECT_DELAY)
-        continue
-
-    # FPS
-    now = time.time()
-    dt = max(1e-6, now - last)
-    inst = 1.0 / dt
-    fps = 0.9*fps + 0.1*inst if fps > 0 else inst
-    last = now
-
-    cv2.putText(frame, f"FPS: {fps:.1f}", (10, 22),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2, cv2.LINE_AA)
-    cv2.imshow("IP Cam Test (q=quit)", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
 
+def main():
+    fps, last = 0.0, time.time()
+    grab = open_frames(URL, W, H).start()
+    disp = Display("IP Cam Test (q=quit)")
+    try:
+        while True:
+            seq, frame = grab.read(timeout=RECONNECT_DELAY)
+            if frame is None:
+                # camera down: grabber thread is reconnecting, keep the UI alive
+                if disp.idle() == ord('q'):
+                    break
+                continue
+
+            # FPS
+            now = time.time()
+            dt = max(1e-6, now - last)
+            inst = 1.0 / dt
+            fps = 0.9*fps + 0.1*inst if fps > 0 else inst
+            last = now
+
+            frame = drawable(frame)
+            cv2.putText(frame, f"FPS: {fps:.1f} | dropped: {grab.dropped}", (10, 22),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2, cv2.LINE_AA)
+            if disp.show(frame) == ord('q'):
+                break
+    finally:
+        grab.stop()
+        disp.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# capture.py
+# Shared IP-camera reader for the vision scripts.
+# A background thread owns the cv2.VideoCapture, decodes every frame the stream
+# delivers and keeps only the newest one (latest-frame-wins). Detectors call
+# read() and always get the freshest frame; frames they never got to are
+# dropped and counted. Reconnects happen on the grabber thread, so a dead
+# camera never stalls the detection loop: read() just times out and the loop
+# carries on with its last boxes.
+#
+# Reconnecting backs off exponentially with jitter (BACKOFF_BASE doubling up
+# to BACKOFF_MAX, so a phone that went to sleep isn't hammered once a second
+# and several scripts don't retry in lockstep). Opening and reading a network
+# stream have timeouts (OPEN_TIMEOUT / READ_TIMEOUT, passed to the FFmpeg
+# backend); an open that ignores them is abandoned on its own thread after
+# OPEN_TIMEOUT, so an unreachable host can't wedge the grabber either.
+#
+# grab.state is the stream's health:
+#   connecting  opening the stream
+#   up          frames arriving
+#   stalled     connected, but no frame for STALL_S (read timeout pending)
+#   backoff     failed; next attempt in grab.retry_in() seconds
+#   stopped     stop() called
+
+import os, time, random, threading
+import cv2
+
+RECONNECT_DELAY = 1.0       # how long the scripts' read() waits for a frame before doing other work
+BACKOFF_BASE = float(os.getenv("CAM_BACKOFF_BASE", "0.5"))    # first retry after ~this, doubling...
+BACKOFF_MAX = float(os.getenv("CAM_BACKOFF_MAX", "30"))       # ...up to this
+OPEN_TIMEOUT = float(os.getenv("CAM_OPEN_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("CAM_READ_TIMEOUT", "5"))
+STALL_S = 2.0
+
+STATES = ("connecting", "up", "stalled", "backoff", "stopped")
+
+def backoff_delay(failures, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Delay before retry number `failures` (1, 2, ...): exponential, capped,
+    with "equal jitter" (somewhere in the upper half of the step)."""
+    d = min(cap, base * 2 ** (failures - 1))
+    return d / 2 + random.uniform(0, d / 2)
+
+def open_cap(url, w=640, h=480, open_timeout=OPEN_TIMEOUT, read_timeout=READ_TIMEOUT):
+    if isinstance(url, str) and "://" in url:
+        # network stream: make the FFmpeg backend give up instead of hanging
+        cap = cv2.VideoCapture(url, cv2.CAP_ANY, [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(open_timeout * 1000),
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(read_timeout * 1000)])
+    else:
+        cap = cv2.VideoCapture(url)         # device index / file: params would be rejected by some backends
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)   # ignored by some backends, we drain anyway
+    return cap
+
+class FrameGrabber:
+    def __init__(self, url, w=640, h=480, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 open_timeout=OPEN_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.url, self.w, self.h = url, w, h
+        self.backoff_base, self.backoff_max = backoff_base, backoff_max
+        self.open_timeout, self.read_timeout = open_timeout, read_timeout
+
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._frame = None
+        self._seq = 0           # seq of the frame in the slot
+        self._read_seq = 0      # seq last handed to read()
+        self.stamp = 0.0        # time.monotonic() when the slot frame was decoded
+
+        self._state = "connecting"
+        self.since = time.monotonic()   # when _state was entered
+        self.failures = 0               # consecutive failed attempts (0 while up)
+        self._retry_at = 0.0
+
+        # stats
+        self.grabbed = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.open_hangs = 0     # opens abandoned after open_timeout
+        self.connected = False
+
+    # ---- lifecycle ----
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._set_state("stopped")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---- health ----
+    @property
+    def state(self):
+        st = self._state
+        if st == "up" and self.age() > STALL_S:
+            return "stalled"
+        return st
+
+    def _set_state(self, st):
+        if st != self._state:
+            self._state, self.since = st, time.monotonic()
+        self.connected = st == "up"
+
+    def retry_in(self):
+        """Seconds to the next connect attempt (0 unless backing off)."""
+        return max(0.0, self._retry_at - time.monotonic()) if self._state == "backoff" else 0.0
+
+    def health(self):
+        """One-line status for logs / overlays."""
+        st = self.state
+        if st == "backoff":
+            return f"backoff {self.retry_in():.1f}s (failures {self.failures})"
+        if st == "stalled":
+            return f"stalled {self.age():.1f}s"
+        return st
+
+    # ---- grabber thread ----
+    def _open(self):
+        """open_cap() on a helper thread; None if it failed or outlived open_timeout
+        (the helper then releases the capture itself whenever it returns)."""
+        box, lock = {}, threading.Lock()
+
+        def run():
+            cap = open_cap(self.url, self.w, self.h, self.open_timeout, self.read_timeout)
+            with lock:
+                if "abandoned" in box:
+                    cap.release()
+                else:
+                    box["cap"] = cap
+
+        t = threading.Thread(target=run, name="FrameGrabber-open", daemon=True)
+        t.start()
+        t.join(self.open_timeout + 1.0)
+        with lock:
+            cap = box.get("cap")
+            if cap is None:
+                box["abandoned"] = True
+                if t.is_alive():
+                    self.open_hangs += 1
+                return None
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def _run(self):
+        cap = None
+        while not self._stop.is_set():
+            if cap is None:
+                self._set_state("connecting")
+                cap = self._open()
+                if cap is None:
+                    self._backoff()
+                continue
+
+            ok, frame = cap.read()
+            if not ok or frame is None:
+                cap.release(); cap = None
+                self._backoff()
+                continue
+
+            self.failures = 0
+            self._set_state("up")
+            self.grabbed += 1
+            with self._cond:
+                if self._seq != self._read_seq:
+                    self.dropped += 1      # previous frame was never read
+                self._frame = frame
+                self._seq += 1
+                self.stamp = time.monotonic()
+                self._cond.notify_all()
+
+        if cap is not None:
+            cap.release()
+
+    def _backoff(self):
+        self.failures += 1
+        self.reconnects += 1
+        delay = backoff_delay(self.failures, self.backoff_base, self.backoff_max)
+        self._retry_at = time.monotonic() + delay
+        self._set_state("backoff")
+        self._stop.wait(delay)
+
+    # ---- consumer side ----
+    def read(self, timeout=None):
+        """Newest unread frame as (seq, frame); (None, None) on timeout/stop."""
+        with self._cond:
+            ok = self._cond.wait_for(
+                lambda: self._seq != self._read_seq or self._stop.is_set(), timeout)
+            if not ok or self._seq == self._read_seq:
+                return None, None
+            self._read_seq = self._seq
+            return self._seq, self._frame
+
+    def age(self):
+        """Seconds since the newest frame was decoded."""
+        return time.monotonic() - self.stamp if self.stamp else float("inf")
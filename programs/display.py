@@ -0,0 +1,149 @@
+# display.py
+# Where the annotated frames go: a cv2.imshow window, nowhere (headless), and
+# optionally an MJPEG stream any browser / VLC can open:
+#   http://<robot>:<MJPEG_PORT>/
+# Headless is the default when there is no X/Wayland display (e.g. the Pi over
+# ssh) or with VANIS_HEADLESS=1; then imshow/waitKey are never called.
+# The stream costs nothing while nobody watches: frames are only JPEG-encoded
+# when a viewer is connected, once per frame however many viewers there are,
+# and a slow viewer just skips to the newest frame (client queue of one).
+#
+#   disp = Display("Face + Body Detection")
+#   key = disp.show(frame)          # -1 when headless
+#   disp.close()
+
+import os, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+
+MJPEG_PORT = int(os.getenv("MJPEG_PORT", "0"))    # 0 = no stream
+MJPEG_HOST = os.getenv("MJPEG_HOST", "0.0.0.0")    # reachable from the LAN, like the IP camera
+JPEG_QUALITY = 80
+
+def no_display():
+    if os.getenv("VANIS_HEADLESS") is not None:
+        return os.getenv("VANIS_HEADLESS") != "0"
+    return sys.platform.startswith("linux") and not (os.getenv("DISPLAY") or os.getenv("WAYLAND_DISPLAY"))
+
+class MjpegServer:
+    BOUNDARY = "vanisframe"
+
+    def __init__(self, port=8090, host=MJPEG_HOST, quality=JPEG_QUALITY, max_clients=4):
+        self.quality, self.max_clients = quality, max_clients
+        self._cond = threading.Condition()
+        self._frame, self._seq = None, 0
+        self._enc_lock = threading.Lock()
+        self._jpeg, self._jpeg_seq = None, 0
+
+        # stats
+        self.clients = 0
+        self.encodes = 0
+        self.skipped = 0            # frames a viewer never got (it was too slow)
+        self.encode_errors = 0      # frames cv2.imencode refused (skipped, not resent)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/stream.mjpg"):
+                    self.send_error(404)
+                    return
+                server._stream(self)
+
+            def log_message(self, *a):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, name="mjpeg-http", daemon=True).start()
+
+    def publish(self, frame):
+        """Hand over the newest annotated frame (not copied: don't draw on it afterwards)."""
+        if not self.clients:
+            return                      # nobody watching: don't even keep it
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    def _encoded(self, after, timeout=1.0):
+        """(seq, jpeg bytes) of the first frame newer than `after`, encoded at most once."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after, timeout):
+                return after, None
+            seq, frame = self._seq, self._frame
+        with self._enc_lock:
+            if self._jpeg_seq < seq:    # first viewer to get here encodes, the rest reuse it
+                ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ok:
+                    self.encode_errors += 1
+                    return seq, None    # still seq: the viewer moves on to the next frame
+                self._jpeg, self._jpeg_seq = buf.tobytes(), seq
+                self.encodes += 1
+            return self._jpeg_seq, self._jpeg
+
+    def _stream(self, req):
+        with self._cond:
+            if self.clients >= self.max_clients:
+                req.send_error(503, "too many viewers")
+                return
+            self.clients += 1
+        try:
+            req.send_response(200)
+            req.send_header("Cache-Control", "no-cache")
+            req.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={self.BOUNDARY}")
+            req.end_headers()
+            last = self._seq
+            while True:
+                seq, jpeg = self._encoded(last)
+                if jpeg is None:
+                    last = seq          # timed out, or that frame didn't encode: wait for a newer one
+                    continue
+                if last and seq > last + 1:
+                    self.skipped += seq - last - 1
+                last = seq
+                req.wfile.write(f"--{self.BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                req.wfile.write(jpeg)
+                req.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass                        # viewer went away
+        finally:
+            with self._cond:
+                self.clients -= 1
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+class Display:
+    def __init__(self, title, headless=None, mjpeg_port=None):
+        self.title = title
+        self.headless = no_display() if headless is None else headless
+        port = MJPEG_PORT if mjpeg_port is None else mjpeg_port
+        self.stream = MjpegServer(port) if port else None
+        if self.headless:
+            where = f"MJPEG on :{self.stream.port}" if self.stream else "no preview"
+            print(f"[{title}] headless ({where}); Ctrl+C to quit")
+
+    def show(self, frame):
+        """Show/stream one frame; returns the key pressed (-1 if none / headless)."""
+        if self.stream:
+            self.stream.publish(frame)
+        if self.headless:
+            return -1
+        cv2.imshow(self.title, frame)
+        return cv2.waitKey(1) & 0xFF
+
+    def idle(self):
+        """No new frame this time round: keep the window responsive."""
+        if self.headless:
+            return -1
+        return cv2.waitKey(1) & 0xFF
+
+    def close(self):
+        if self.stream:
+            self.stream.close()
+        if not self.headless:
+            cv2.destroyAllWindows()
@@ -1,61 +1,34 @@
 #!/usr/bin/env python3
-import sys, time
-import lgpio  # sudo apt install python3-lgpio
+# drive_cli_lgpio.py
+# Drive the L298 by hand, from a file, or from another process.
+#
+#   python drive_cli_lgpio.py                         # interactive prompt
+#   python drive_cli_lgpio.py -f moves.txt            # run each line as a job, then exit
+#   python drive_cli_lgpio.py --listen unix:/tmp/vanis-drive.sock --listen tcp::8765
+#   python drive_cli_lgpio.py --send unix:/tmp/vanis-drive.sock "both f 70 for 0.5s; turn l 50 for 0.3s"
+#
+# The command language (l f 60, both b 40, turn r 50, stop, "... for 0.5s",
+# ";" sequences, "!" to preempt) is drive_cmd.py's. At the prompt every line
+# cuts in at once, as before; from a file or a socket lines queue. With
+# --listen the prompt stays up too, and a socket client that goes quiet for
+# DRIVE_WATCHDOG_S (0.5 s) while the motors run gets them halted.
+# In every mode the job runner feeds a motor watchdog (VANIS_WATCHDOG, 0.5 s;
+# 0 = off): if the runner itself hangs, the L298 pins are cut.
+
+import sys, time, argparse
+from hal import open_backend, L298, RampedMotors, Watchdog  # lgpio by default: sudo apt install python3-lgpio
+from hal.watchdog import WATCHDOG
+import drive_cmd
 
 # ===== PIN MAP (BCM) — change if needed =====
 IN1, IN2, ENA = 17, 27, 18   # Left
 IN3, IN4, ENB = 22, 23, 19   # Right
 
 PWM_FREQ = 1000  # 1 kHz is smooth for L298
+ACCEL = 300      # %/s speed ramp (0 = jump straight to the new speed)
+JERK = 3000      # %/s^2, S-curve (0 = trapezoid)
 
-def clamp_pct(p): 
-    try: p = int(p)
-    except: p = 0
-    return max(0, min(100, p))
-
-def main():
-    # Open first gpiochip (usually 0 on Pi)
-    h = lgpio.gpiochip_open(0)
-
-    # Claim outputs
-    for pin in (IN1, IN2, ENA, IN3, IN4, ENB):
-        lgpio.gpio_claim_output(h, pin)
-
-    def side_stop(side):
-        if side == "l":
-            lgpio.gpio_write(h, IN1, 0); lgpio.gpio_write(h, IN2, 0)
-            lgpio.tx_pwm(h, ENA, 0, 0)
-        else:
-            lgpio.gpio_write(h, IN3, 0); lgpio.gpio_write(h, IN4, 0)
-            lgpio.tx_pwm(h, ENB, 0, 0)
-
-    def side_drive(side, direction, speed_pct):
-        speed = clamp_pct(speed_pct)
-        if side == "l":
-            if direction == "f":
-                lgpio.gpio_write(h, IN1, 1); lgpio.gpio_write(h, IN2, 0)
-            elif direction == "b":
-                lgpio.gpio_write(h, IN1, 0); lgpio.gpio_write(h, IN2, 1)
-            else:
-                lgpio.gpio_write(h, IN1, 0); lgpio.gpio_write(h, IN2, 0)
-            lgpio.tx_pwm(h, ENA, PWM_FREQ, speed)
-        else:
-            if direction == "f":
-                lgpio.gpio_write(h, IN3, 1); lgpio.gpio_write(h, IN4, 0)
-            elif direction == "b":
-                lgpio.gpio_write(h, IN3, 0); lgpio.gpio_write(h, IN4, 1)
-            else:
-                lgpio.gpio_write(h, IN3, 0); lgpio.gpio_write(h, IN4, 0)
-            lgpio.tx_pwm(h, ENB, PWM_FREQ, speed)
-
-    def both_stop():
-        side_stop("l"); side_stop("r")
-
-    def both_drive(direction, speed_pct):
-        side_drive("l", direction, speed_pct)
-        side_drive("r", direction, speed_pct)
-
-    HELP = """
+HELP = """
 Commands:
   l f <spd>     LEFT  forward  at <spd>% (0-100)
   l b <spd>     LEFT  backward at <spd>%
@@ -72,71 +45,108 @@ Commands:
   turn l <spd>  spin-in-place LEFT  (L back, R fwd) at <spd>%
   turn r <spd>  spin-in-place RIGHT (L fwd, R back) at <spd>%
 
-  stop          stop both
+  stop          stop both (ramped)
+  halt          stop both now, no ramp
+  accel <a>     ramp rate in %/s (0 = no ramp)
+  jerk <j>      S-curve jerk in %/s^2 (0 = trapezoid)
+  wait <t>      pause a sequence (0.5, 0.5s, 500ms)
+
+  <cmd> for <t>        hold a command for t, then go on (stop after the last)
+  <cmd> ; <cmd> ...    one sequence, e.g.  both f 70 for 0.5s; turn l 50 for 0.3s
+  status        motors, queue, timing
   help          show this help
   quit/exit     exit
 """
-    print("L298 CLI (lgpio) ready. Type 'help' for commands.")
-    print("Examples:  l f 60  |  r b 40  |  both f 75  |  turn r 50")
-
-    try:
-        while True:
-            try:
-                line = input("> ").strip().lower()
-            except (EOFError, KeyboardInterrupt):
-                print()
-                break
-            if not line: 
-                continue
-            p = line.split()
 
+def prompt(seq, server=None):
+    print("L298 CLI (lgpio) ready. Type 'help' for commands.")
+    print("Examples:  l f 60  |  r b 40  |  both f 75  |  turn r 50  |  both f 70 for 0.5s; stop")
+    while True:
+        try:
+            line = input("> ").strip().lower()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
+        if not line:
+            continue
+        if line in ("quit", "exit"):
+            return
+        if line == "help":
+            print(HELP)
+        elif line == "status":
+            print(server.status() if server else f"motors {seq.motors.cmd['l']:+d} {seq.motors.cmd['r']:+d}")
+        else:
             try:
-                if p[0] in ("quit","exit"): break
-                elif p[0] == "help": print(HELP)
-
-                elif p[0] == "l":
-                    if len(p) >= 3 and p[1] in ("f","b"):
-                        side_drive("l", p[1], p[2])
-                    elif len(p) >= 2 and p[1] == "s":
-                        side_stop("l")
-                    else:
-                        print("Usage: l f|b <speed>  OR  l s")
-
-                elif p[0] == "r":
-                    if len(p) >= 3 and p[1] in ("f","b"):
-                        side_drive("r", p[1], p[2])
-                    elif len(p) >= 2 and p[1] == "s":
-                        side_stop("r")
-                    else:
-                        print("Usage: r f|b <speed>  OR  r s")
-
-                elif p[0] == "both":
-                    if len(p) >= 3 and p[1] in ("f","b"):
-                        both_drive(p[1], p[2])
-                    elif len(p) >= 2 and p[1] == "s":
-                        both_stop()
-                    else:
-                        print("Usage: both f|b <speed>  OR  both s")
-
-                elif p[0] == "turn":
-                    if len(p) >= 3 and p[1] == "l":
-                        side_drive("l","b", p[2]); side_drive("r","f", p[2])
-                    elif len(p) >= 3 and p[1] == "r":
-                        side_drive("l","f", p[2]); side_drive("r","b", p[2])
-                    else:
-                        print("Usage: turn l|r <speed>")
-
-                elif p[0] == "stop":
-                    both_stop()
-
-                else:
-                    print("Unknown command. Type 'help'.")
-            except Exception as e:
+                steps, _ = drive_cmd.parse(line)
+            except ValueError as e:
                 print("Error:", e)
-
+                continue
+            seq.submit(steps, preempt=True, line=line)
+
+def batch(seq, f):
+    """Queue every line of f as a job and wait for them all; returns the number that failed."""
+    jobs, bad = [], 0
+    for n, line in enumerate(f, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            steps, preempt = drive_cmd.parse(line)
+        except ValueError as e:
+            print(f"line {n}: {e}")
+            bad += 1
+            continue
+        jobs.append(seq.submit(steps, preempt, line=line))
+    for job in jobs:
+        job.finished.wait()
+        print(f"{job.status:9s} late {1000 * job.late_s:5.1f}ms  {job.line}")
+    return bad + sum(job.status != "done" for job in jobs)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="L298 drive CLI / command server")
+    ap.add_argument("-f", "--file", help="run the commands in FILE ('-' = stdin) and exit")
+    ap.add_argument("--listen", action="append", default=[], metavar="ADDR",
+                    help="serve commands on unix:/path or tcp:[host]:port (repeatable)")
+    ap.add_argument("--send", metavar="ADDR", help="send the commands to a running server and wait for them")
+    ap.add_argument("commands", nargs="*", help="with --send: command lines")
+    args = ap.parse_args(argv)
+
+    if args.send:
+        lines = args.commands or sys.stdin.read().splitlines()
+        return 1 if drive_cmd.send(args.send, lines) else 0
+
+    # first gpiochip via lgpio unless VANIS_GPIO says otherwise
+    hw = open_backend("lgpio")
+    l298 = L298(hw, (IN1, IN2), (IN3, IN4), en=(ENA, ENB), pwm_hz=PWM_FREQ)
+    motors = RampedMotors(l298, accel=ACCEL, jerk=JERK)
+    wd = Watchdog(hw, l298, None, motors, timeout_s=WATCHDOG) if WATCHDOG else None
+    seq = drive_cmd.Sequencer(motors, hw, wd=wd)
+    server = drive_cmd.CommandServer(seq, motors, args.listen) if args.listen else None
+    rc = 0
+    try:
+        if args.file:
+            if args.file == "-":
+                rc = 1 if batch(seq, sys.stdin) else 0
+            else:
+                with open(args.file) as f:
+                    rc = 1 if batch(seq, f) else 0
+        elif server and not sys.stdin.isatty():
+            while True:                     # no prompt to read: just serve (Ctrl+C ends)
+                time.sleep(3600)
+        else:
+            prompt(seq, server)
+    except KeyboardInterrupt:
+        pass
     finally:
-        both_stop()
-        lgpio.gpiochip_close(h)
+        if server:
+            server.close()
+        seq.close()
+        if wd:
+            wd.close()
+            print(wd.report())
+        motors.close()
+        hw.close()
+    return rc
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
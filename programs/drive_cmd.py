@@ -0,0 +1,494 @@
+# drive_cmd.py
+# The drive_cli_lgpio.py command language, for people and for programs.
+# A line is one job: steps separated by ";", each optionally held "for" a time.
+#
+#   l f 60                              left forward 60 % (r: right)
+#   both b 40 ; wait 1s ; stop          both back 40 %, 1 s later ramp down
+#   both f 70 for 0.5s; turn l 50 for 300ms
+#   !turn r 80 for 0.4s                 "!" preempts: drop the queue, cut in now
+#
+# Steps: l|r f|b <spd>, l|r s, both f|b <spd>, both s, turn l|r <spd>, stop,
+# halt (no ramp), wait <t>, accel <%/s>, jerk <%/s^2>.  Times: 0.5, 0.5s, 500ms.
+# A job whose last step is timed ends with a (ramped) stop; an untimed step
+# leaves the motors running, as in the interactive CLI.
+#
+# Sequencer runs jobs one after another on its own thread. Step deadlines are
+# absolute (start + sum of the "for"s) on the robot's clock, so a long
+# sequence doesn't drift by the scheduling jitter of each step. "!" and halt
+# jobs preempt whatever is running; anything else queues ("!stop" to cut in).
+# Given a hal Watchdog it feeds it from the runner thread, between jobs too,
+# so a runner that hangs (in a step, a hold, or on a lock) gets the motors cut.
+#
+# CommandServer takes the same lines over a Unix or TCP socket, one per line,
+# and answers each: "queued <id>", "done <id>", "preempted <id>",
+# "err <why>". A client that has the motors moving must send something
+# (a command or "ping") at least every watchdog_s, or they are halted; the
+# same happens when it disconnects. "status" reports, "clear" empties the
+# queue and stops.
+
+import os, re, time, queue, socket, threading, collections, socketserver
+
+WATCHDOG_S = float(os.getenv("DRIVE_WATCHDOG_S", "0.5"))
+SOCKET = os.getenv("DRIVE_SOCKET", "/tmp/vanis-drive.sock")
+OUTBOX = 256        # replies a client may leave unread before it is dropped
+SUMMARY = ("l|r f|b <spd> | l|r s | both f|b <spd> | both s | turn l|r <spd> | stop | halt | wait <t> | "
+           "accel <a> | jerk <j>; join with ';', hold with 'for <t>', '!' preempts")
+
+_TIME = re.compile(r"^(\d+(?:\.\d*)?|\.\d+)(ms|s)?$")
+
+def parse_time(tok):
+    m = _TIME.match(tok)
+    if not m:
+        raise ValueError(f"bad time {tok!r} (0.5, 0.5s or 500ms)")
+    return float(m.group(1)) / (1000.0 if m.group(2) == "ms" else 1.0)
+
+def _speed(tok):
+    v = int(float(tok))
+    if not 0 <= v <= 100:
+        raise ValueError(f"speed {tok} outside 0-100")
+    return v
+
+# ==== Parsing ====
+# STEPS turns the words of one step ("for <t>" already split off) into an
+# action tuple: ("side", l|r, f|b|s, spd), ("drive", left, right), ("wait", s), ...
+def _side(p):
+    side, d = p[0], p[1] if len(p) > 1 else ""
+    if d == "s" and len(p) == 2:
+        return ("side", side, "s", 0)
+    if d in ("f", "b") and len(p) == 3:
+        return ("side", side, d, _speed(p[2]))
+    raise ValueError(f"usage: {side} f|b <speed>  or  {side} s")
+
+def _both(p):
+    if len(p) == 2 and p[1] == "s":
+        return ("drive", 0, 0)
+    if len(p) == 3 and p[1] in ("f", "b"):
+        v = _speed(p[2]) * (1 if p[1] == "f" else -1)
+        return ("drive", v, v)
+    raise ValueError("usage: both f|b <speed>  or  both s")
+
+def _turn(p):
+    if len(p) == 3 and p[1] in ("l", "r"):
+        v = _speed(p[2])
+        return ("drive", -v, v) if p[1] == "l" else ("drive", v, -v)
+    raise ValueError("usage: turn l|r <speed>")
+
+def _one(op):
+    def build(p):
+        if len(p) != 1:
+            raise ValueError(f"usage: {op}")
+        return (op,)
+    return build
+
+def _num(op):
+    def build(p):
+        if len(p) != 2:
+            raise ValueError(f"usage: {op} <value>")
+        return (op, max(0.0, float(p[1])))
+    return build
+
+def _wait(p):
+    if len(p) != 2:
+        raise ValueError("usage: wait <time>")
+    return ("wait", parse_time(p[1]))
+
+STEPS = {"l": _side, "r": _side, "both": _both, "turn": _turn, "stop": _one("stop"),
+         "halt": _one("halt"), "wait": _wait, "accel": _num("accel"), "jerk": _num("jerk")}
+
+def parse(line):
+    """A line -> (steps, preempt). Each step is (action, hold_s or None).
+    Raises ValueError with a usage hint."""
+    line = line.strip().lower()
+    preempt = line.startswith("!")
+    steps = []
+    for part in line.lstrip("!").split(";"):
+        p = part.split()
+        if not p:
+            continue
+        hold = None
+        if len(p) >= 2 and p[-2] == "for":
+            hold = parse_time(p[-1])
+            p = p[:-2]
+        build = STEPS.get(p[0]) if p else None
+        if build is None:
+            raise ValueError(f"unknown command {part.strip()!r} (type 'help')")
+        steps.append((build(p), hold))
+    if not steps:
+        raise ValueError("empty command")
+    # an emergency stop doesn't wait in line ("stop" does: it ends a script)
+    preempt = preempt or steps[0][0][0] == "halt"
+    return steps, preempt
+
+# ==== Running ====
+class Job:
+    def __init__(self, jid, steps, client=None, line=""):
+        self.id, self.steps, self.client, self.line = jid, steps, client, line
+        self.status = "queued"          # running / done / preempted
+        self.late_s = 0.0               # worst step start behind its deadline
+        self.finished = threading.Event()
+
+class Sequencer:
+    """Runs jobs on a RampedMotors (or L298) in order. on_end(job) is called
+    when a job finishes or is preempted, from the runner thread or from
+    submit()/clear() with the queue locked: it must not block. wd: a
+    hal.watchdog.Watchdog the runner feeds at least every wd.timeout_s / 3."""
+    def __init__(self, motors, hw, on_end=None, wd=None):
+        self.motors, self.hw, self.wd = motors, hw, wd
+        self._tick = wd.timeout_s / 3 if wd else None
+        self.on_end = on_end or (lambda job: None)
+        self._q = collections.deque()
+        self._cv = threading.Condition()
+        self._cut = threading.Event()   # set: abandon the running job
+        self._step = threading.Lock()   # a step and a clear() never interleave
+        self._ids = 0
+        self.current = None
+        self.owner = None               # client of the job that last drove the motors
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="drive-seq", daemon=True)
+        self._thread.start()
+
+        # stats
+        self.jobs = 0
+        self.preempts = 0
+        self.late_max_s = 0.0
+
+    def submit(self, steps, preempt=False, client=None, line="", on_queued=None):
+        """Queue a job (preempt: drop the queue and cut the running job first).
+        on_queued(job) runs before the runner can pick the job up."""
+        with self._cv:
+            self._ids += 1
+            job = Job(self._ids, steps, client, line)
+            if preempt:
+                self._drop_queue()
+                if self.current is not None:
+                    self._cut.set()
+                self.owner = client     # in control from now, not when the runner gets to it
+            if on_queued:
+                on_queued(job)
+            self._q.append(job)
+            self._cv.notify()
+        return job
+
+    def clear(self, halt=False):
+        """Drop the queue, end the running job and stop (halt: no ramp)."""
+        with self._cv, self._step:
+            self._drop_queue()
+            if self.current is not None:
+                self._cut.set()
+            self.owner = None
+            if halt:
+                self._halt()
+            else:
+                self.motors.stop()
+
+    def _halt(self):
+        if hasattr(self.motors, "halt"):
+            self.motors.halt()          # RampedMotors: no ramp
+        else:
+            self.motors.stop()
+
+    def _drop_queue(self):
+        while self._q:
+            job = self._q.popleft()
+            self._end(job, "preempted")
+
+    def _end(self, job, status):
+        job.status = status
+        if status == "preempted":
+            self.preempts += 1
+        job.finished.set()
+        self.on_end(job)
+
+    def idle(self):
+        with self._cv:
+            return self.current is None and not self._q
+
+    def queued(self):
+        return len(self._q)
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._q and not self._closed:
+                    self._feed()
+                    self._cv.wait(self._tick)
+                if self._closed:
+                    return
+                job = self.current = self._q.popleft()
+                self.owner = job.client
+                self._cut.clear()
+            job.status = "running"
+            done = self._play(job)
+            with self._cv:
+                self.current = None
+            self.jobs += 1
+            self._end(job, "done" if done else "preempted")
+
+    def _feed(self):
+        if self.wd:
+            self.wd.feed()
+
+    def _hold(self, due):
+        """Wait until due (feeding on the way); True if cut."""
+        hw = self.hw
+        while True:
+            self._feed()
+            left = due - hw.now()
+            if left <= 0:
+                return self._cut.is_set()
+            if hw.wait(self._cut, min(left, self._tick) if self._tick else left):
+                return True
+
+    def _play(self, job):
+        """Run the steps against absolute deadlines; False if cut short."""
+        m, hw = self.motors, self.hw
+        due = hw.now()
+        for action, hold in job.steps:
+            self._feed()
+            with self._step:
+                if self._cut.is_set():
+                    return False
+                job.late_s = max(job.late_s, hw.now() - due)
+                op = action[0]
+                if op == "side":
+                    m.side(action[1], action[2], action[3])
+                elif op == "drive":
+                    m.drive(action[1], action[2])
+                elif op == "stop":
+                    m.stop()
+                elif op == "halt":
+                    self._halt()
+                elif op in ("accel", "jerk") and hasattr(m, "set_accel"):
+                    m.set_accel(**{op: action[1]})
+            if op == "wait":
+                hold = action[1] + (hold or 0.0)
+            if hold:
+                due += hold
+                if self._hold(due):
+                    return False
+            else:
+                due = max(due, hw.now())
+        self.late_max_s = max(self.late_max_s, job.late_s)
+        if job.steps[-1][1] is not None:
+            with self._step:
+                if self._cut.is_set():
+                    return False
+                m.stop()                # a timed sequence ends stopped
+        return True
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._drop_queue()
+            self._cut.set()
+            self._cv.notify()
+        self._thread.join(timeout=2.0)
+
+# ==== Socket server ====
+class _Client:
+    """send() only queues the line; the client's writer thread does the socket
+    I/O. send() runs under the Sequencer's lock (on_queued, on_end), so a
+    client that stops reading must stall nobody but its own writer."""
+    def __init__(self, name, wfile):
+        self.name, self.wfile = name, wfile
+        self.last = time.monotonic()    # last line heard
+        self.open = True
+        self._out = queue.Queue(OUTBOX)
+        threading.Thread(target=self._writer, name=f"drive-{name}-out", daemon=True).start()
+
+    def send(self, msg):
+        if not self.open:
+            return
+        try:
+            self._out.put_nowait(msg)
+        except queue.Full:              # OUTBOX replies unread: stop talking to it
+            self.open = False
+
+    def close(self):
+        self.open = False
+        try:
+            self._out.put_nowait(None)
+        except queue.Full:              # the writer is stuck in a write; the socket closing ends it
+            pass
+
+    def _writer(self):
+        while True:
+            msg = self._out.get()
+            if msg is None or not self.open:
+                return
+            try:
+                self.wfile.write((msg + "\n").encode()); self.wfile.flush()
+            except (OSError, ValueError):   # gone (ValueError: its file is already closed)
+                self.open = False
+                return
+
+class CommandServer:
+    """Serves a Sequencer on "unix:/path" and/or "tcp:host:port" addresses.
+    TCP listens on 127.0.0.1 unless a host is given (there is no auth)."""
+    def __init__(self, seq, motors, addrs=("unix:" + SOCKET,), watchdog_s=WATCHDOG_S, log=print):
+        self.seq, self.motors = seq, motors
+        self.watchdog_s = watchdog_s
+        self.log = log or (lambda *a: None)
+        self._servers = []
+        self._stop = threading.Event()
+        seq.on_end = self._job_ended
+
+        # stats
+        self.clients = 0
+        self.commands = 0
+        self.watchdog_trips = 0
+
+        server = self
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server._serve_client(self)
+
+        for addr in addrs:
+            kind, _, where = addr.partition(":")
+            if kind == "unix":
+                if os.path.exists(where):
+                    os.unlink(where)        # left over from a previous run
+                srv = socketserver.ThreadingUnixStreamServer(where, Handler)
+            elif kind == "tcp":
+                host, _, port = where.rpartition(":")
+                srv = socketserver.ThreadingTCPServer((host or "127.0.0.1", int(port)), Handler)
+            else:
+                raise ValueError(f"bad address {addr!r} (unix:/path or tcp:host:port)")
+            srv.daemon_threads = True
+            self._servers.append((addr, srv))
+            threading.Thread(target=srv.serve_forever, name=f"drive-{kind}", daemon=True).start()
+            self.log(f"[drive] listening on {addr}")
+        threading.Thread(target=self._watchdog, name="drive-watchdog", daemon=True).start()
+
+    def _serve_client(self, h):
+        c = _Client(f"client{self.clients + 1}", h.wfile)
+        self.clients += 1
+        try:
+            for raw in h.rfile:
+                c.last = time.monotonic()
+                line = raw.decode(errors="replace").strip()
+                if line and not line.startswith("#"):
+                    self._handle(c, line)
+        except OSError:
+            pass
+        finally:
+            c.close()
+            if self.seq.owner is c and self._moving():
+                self._trip(c, "disconnected")
+
+    def _handle(self, c, line):
+        cmd = line.lower()
+        if cmd == "ping":
+            c.send("pong")
+        elif cmd == "status":
+            c.send(self.status())
+        elif cmd == "clear":
+            self.seq.clear()
+            c.send("ok")
+        elif cmd == "help":
+            c.send("ok " + SUMMARY)
+        else:
+            try:
+                steps, preempt = parse(line)
+            except ValueError as e:
+                c.send(f"err {e}")
+                return
+            self.commands += 1
+            # "queued" has to go out before the runner can end the job and send "done"
+            self.seq.submit(steps, preempt, c, line, on_queued=lambda job: c.send(f"queued {job.id}"))
+
+    def _job_ended(self, job):
+        if job.client is not None:
+            job.client.send(f"{job.status} {job.id}" +
+                            (f" late {1000 * job.late_s:.1f}ms" if job.status == "done" else ""))
+
+    def _moving(self):
+        return any(self.motors.cmd.values()) or not self.seq.idle()
+
+    def _trip(self, c, why):
+        self.watchdog_trips += 1
+        self.seq.clear(halt=True)
+        self.log(f"[drive] {c.name} {why} -> motors halted")
+        c.send(f"watchdog {why}")
+
+    def _watchdog(self):
+        while not self._stop.wait(self.watchdog_s / 5):
+            c = self.seq.owner
+            if c is not None and time.monotonic() - c.last > self.watchdog_s and self._moving():
+                self._trip(c, f"silent {time.monotonic() - c.last:.2f}s")
+
+    def status(self):
+        cur = self.seq.current
+        l, r = self.motors.cmd["l"], self.motors.cmd["r"]
+        return (f"motors {l:+d} {r:+d} | job {cur.id if cur else '-'} queued {self.seq.queued()} | "
+                f"jobs {self.seq.jobs} preempts {self.seq.preempts} late_max {1000 * self.seq.late_max_s:.1f}ms "
+                f"watchdog {self.watchdog_trips}")
+
+    def close(self):
+        self._stop.set()
+        for addr, srv in self._servers:
+            srv.shutdown(); srv.server_close()
+            if addr.startswith("unix:"):
+                try:
+                    os.unlink(addr[5:])
+                except OSError:
+                    pass
+        self._servers = []
+
+# ==== Client ====
+def connect(addr):
+    kind, _, where = addr.partition(":")
+    if kind == "unix":
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.connect(where)
+    elif kind == "tcp":
+        host, _, port = where.rpartition(":")
+        s = socket.create_connection((host or "127.0.0.1", int(port)))
+    else:
+        raise ValueError(f"bad address {addr!r} (unix:/path or tcp:host:port)")
+    return s
+
+def send(addr, lines, watchdog_s=WATCHDOG_S, log=print):
+    """Send command lines and stay connected (pinging, so the watchdog
+    stays quiet) until every job they queued has ended. Returns how many
+    lines failed or jobs didn't finish."""
+    lines = [l.strip() for l in lines if l.strip()]
+    s = connect(addr)
+    rf = s.makefile("rb")
+    stop = threading.Event()
+
+    def pinger():
+        while not stop.wait(watchdog_s / 3):
+            try:
+                s.sendall(b"ping\n")
+            except OSError:
+                return
+
+    threading.Thread(target=pinger, name="drive-ping", daemon=True).start()
+    pending, answered, failed = set(), 0, 0
+    try:
+        s.sendall("".join(l + "\n" for l in lines).encode())
+        while answered < len(lines) or pending:
+            reply = rf.readline().decode().strip()
+            if not reply:
+                break                           # server went away
+            word, _, rest = reply.partition(" ")
+            if word == "pong":
+                continue
+            if word == "queued":
+                pending.add(rest); answered += 1
+                continue
+            log(reply)
+            if word in ("done", "preempted"):
+                pending.discard(rest.split()[0])
+                failed += word == "preempted"
+            elif word == "watchdog":
+                failed += 1
+                break
+            else:                               # err / status / ok: the answer to one line
+                answered += 1
+                failed += word == "err"
+        return failed + len(pending) + (len(lines) - answered)
+    finally:
+        stop.set()
+        s.close()
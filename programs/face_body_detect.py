@@ -1,42 +1,78 @@
-import cv2, time
+import os, cv2, time
+import numpy as np
 import mediapipe as mp
 from collections import deque
+import boxops
+import preproc
+import body_detectors
+from capture import RECONNECT_DELAY
+from frame_bus import open_frames, drawable
+from cadence import DetectScheduler
+from motion import MotionGate, run_in_rois
+from metrics import REGISTRY, stage, count, gauge
+from display import Display
 
 # ==== CONFIG ====
 IP_CAM_URL = "http://192.168.43.205:8080/video"
 DETECT_W = 640
-
-# ==== Helpers ====
-def iou(a, b):
-    ax1, ay1, aw, ah = a; ax2, ay2 = ax1+aw, ay1+ah
-    bx1, by1, bw, bh = b; bx2, by2 = bx1+bw, by1+bh
-    inter = max(0, min(ax2,bx2)-max(ax1,bx1)) * max(0, min(ay2,by2)-max(ay1,by1))
-    ua = aw*ah + bw*bh - inter
-    return inter/ua if ua>0 else 0.0
-
-def nms(boxes, iou_thresh=0.4):
-    if not boxes: return []
-    boxes = sorted(boxes, key=lambda b: b[2]*b[3], reverse=True)
-    keep=[]
-    while boxes:
-        b = boxes.pop(0)
-        keep.append(b)
-        boxes = [x for x in boxes if iou(b,x) < iou_thresh]
-    return keep
+PIPELINE = os.getenv("FB_PIPELINE", "0") == "1"   # run stages in worker processes (fb_pipeline.py)
+DETECT_EVERY = 5          # full detection every Nth frame, track in between (1 = every frame)
+ADAPTIVE_CADENCE = True   # let DETECT_EVERY grow/shrink with tracking quality
+MOTION_GATE = True        # only scan regions that moved (plus a periodic full-frame pass)
+BODY_DETECTOR = body_detectors.BODY_DETECTOR or "haarhog"   # or dnn / ort (see body_detectors.py)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))   # >0: Prometheus text on 127.0.0.1:PORT/metrics
+METRICS_LOG_S = 10        # per-stage timing log line every N s (0 = off)
+PERSIST_S = 1.0           # a body box needs a second hit within this long ...
+PERSIST_N = 6             # ... and within this many fusion passes
 
 # ==== Init detectors ====
-mp_face = mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.6)
-hog = cv2.HOGDescriptor()
-hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
-upper = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_upperbody.xml")
-fullb = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_fullbody.xml")
-body_history = deque(maxlen=6)
+# Filled in by init_detectors(); pipeline workers only load the stage they run.
+mp_face = hog = upper = fullb = None
+
+class BodyHistory:
+    """Fused body boxes of the last PERSIST_N fusion passes, no older than
+    PERSIST_S. Fusion only runs on detection frames (DETECT_EVERY, adaptive),
+    so a pass count alone would stretch the persistence window with the
+    cadence."""
+    def __init__(self, window_s=PERSIST_S, maxlen=PERSIST_N, clock=time.monotonic):
+        self.window_s, self.clock = window_s, clock
+        self._past = deque(maxlen=maxlen)   # (t, boxes)
+
+    def append(self, boxes):
+        t = self.clock()
+        self._past.append((t, boxes))
+        while t - self._past[0][0] > self.window_s:
+            self._past.popleft()
+
+    def clear(self):
+        self._past.clear()
+
+    def __iter__(self):
+        return (boxes for _, boxes in self._past)
+
+    def __len__(self):
+        return len(self._past)
+
+body_history = BodyHistory()
+
+def init_detectors(stages=("face", "haar", "hog")):
+    global mp_face, hog, upper, fullb
+    if "face" in stages and mp_face is None:
+        mp_face = mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.6)
+    if "hog" in stages and hog is None:
+        hog = cv2.HOGDescriptor()
+        hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+    if "haar" in stages and upper is None:
+        upper = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_upperbody.xml")
+        fullb = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_fullbody.xml")
 
 def detect_faces(frame):
     faces_out = []
     h, w = frame.shape[:2]
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    res = mp_face.process(rgb)
+    with stage("cvtcolor"):
+        rgb = preproc.of(frame).rgb()
+    with stage("mediapipe"):
+        res = mp_face.process(rgb)
     if res.detections:
         for det in res.detections:
             bbox = det.location_data.relative_bounding_box
@@ -47,85 +83,142 @@ def detect_faces(frame):
             faces_out.append((x,y,ww,hh))
     return faces_out
 
-def detect_bodies(frame_bgr):
-    h, w = frame_bgr.shape[:2]
-    scale = DETECT_W / float(w)
-    small = cv2.resize(frame_bgr, (int(w*scale), int(h*scale)), interpolation=cv2.INTER_AREA)
-
-    gray_s = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
-    haar_upper = upper.detectMultiScale(gray_s, scaleFactor=1.12, minNeighbors=5,
-                                        minSize=(int(50*scale), int(70*scale)))
-    haar_full  = fullb.detectMultiScale(gray_s, scaleFactor=1.08, minNeighbors=5,
-                                        minSize=(int(50*scale), int(110*scale)))
+# Body detection is split in three stages (Haar, HOG, fusion) so the
+# pipeline mode (fb_pipeline.py) can run the first two in parallel.
+def detect_haar(frame_bgr, full_w=None):
+    # full_w: width of the whole frame when frame_bgr is a motion ROI crop,
+    # so crops are scanned at the same scale as a full-frame pass
+    w = frame_bgr.shape[1]
+    scale = DETECT_W / float(full_w or w)
+    with stage("cvtcolor"):
+        gray_s = preproc.of(frame_bgr).scaled(scale, gray=True)
+    with stage("haar"):
+        haar_upper = upper.detectMultiScale(gray_s, scaleFactor=1.12, minNeighbors=5,
+                                            minSize=(int(50*scale), int(70*scale)))
+        haar_full  = fullb.detectMultiScale(gray_s, scaleFactor=1.08, minNeighbors=5,
+                                            minSize=(int(50*scale), int(110*scale)))
     haar = list(haar_upper) + list(haar_full)
-    haar = [(int(x/scale), int(y/scale), int(W/scale), int(H/scale)) for (x,y,W,H) in haar]
+    return [(int(x/scale), int(y/scale), int(W/scale), int(H/scale)) for (x,y,W,H) in haar]
 
+def detect_hog(frame_bgr):
     hog_scale = 0.6
-    small2 = cv2.resize(frame_bgr, (int(w*hog_scale), int(h*hog_scale)), interpolation=cv2.INTER_AREA)
-    rects, _ = hog.detectMultiScale(small2, winStride=(8,8), padding=(8,8), scale=1.05)
-    hog_boxes = [(int(x/hog_scale), int(y/hog_scale), int(W/hog_scale), int(H/hog_scale)) for (x,y,W,H) in rects]
-
-    def good_geom(b):
-        x,y,W,H = b
-        area = W*H
-        ar = W/float(H+1e-6)
-        if area < 0.01*w*h: return False
-        if not (0.25 <= ar <= 0.8): return False
-        if y < 0.05*h: return False
-        return True
-
-    haar = [b for b in haar if good_geom(b)]
-    hog_boxes = [b for b in hog_boxes if good_geom(b)]
-
-    agreed = []
-    for b in haar:
-        for c in hog_boxes:
-            if iou(b, c) >= 0.3:
-                agreed.append(b if (b[2]*b[3] >= c[2]*c[3]) else c)
-                break
-
-    merged = agreed if agreed else nms(haar + hog_boxes, iou_thresh=0.4)
-    body_history.append(merged)
-    persistent = []
-    for b in merged:
-        count = sum(1 for past in body_history for pb in past if iou(b, pb) >= 0.4)
-        if count >= 2:
-            persistent.append(b)
-    return nms(persistent, iou_thresh=0.5)
-
-# ==== Main ====
-cap = cv2.VideoCapture(IP_CAM_URL)
-last = time.time()
-fps = 0
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("Camera disconnected")
-        break
-
-    faces = detect_faces(frame)
-    bodies = detect_bodies(frame)
-
-    # Draw
+    small2 = preproc.of(frame_bgr).scaled(hog_scale)
+    with stage("hog"):
+        rects, _ = hog.detectMultiScale(small2, winStride=(8,8), padding=(8,8), scale=1.05)
+    return [(int(x/hog_scale), int(y/hog_scale), int(W/hog_scale), int(H/hog_scale)) for (x,y,W,H) in rects]
+
+def fuse_bodies(frame_shape, haar, hog_boxes, history=None):
+    # history: past fused boxes of this stream (default: the single-camera body_history)
+    history = body_history if history is None else history
+    h, w = frame_shape[:2]
+    haar, hog_boxes = boxops.as_boxes(haar), boxops.as_boxes(hog_boxes)
+
+    haar = haar[boxops.geom_mask(haar, w, h)]
+    hog_boxes = hog_boxes[boxops.geom_mask(hog_boxes, w, h)]
+
+    agreed = boxops.agree(haar, hog_boxes, iou_thresh=0.3)
+    merged = agreed if len(agreed) else boxops.nms(np.concatenate([haar, hog_boxes]), iou_thresh=0.4)
+    history.append(merged)
+    persistent = merged[boxops.history_count(merged, history, iou_thresh=0.4) >= 2]
+    return boxops.to_list(boxops.nms(persistent, iou_thresh=0.5))
+
+def detect_haarhog(frame_bgr, rois=None, history=None):
+    w = frame_bgr.shape[1]
+    haar = run_in_rois(lambda crop: detect_haar(crop, full_w=w), frame_bgr, rois)
+    hog_boxes = run_in_rois(detect_hog, frame_bgr, rois)
+    with stage("fuse"):
+        return fuse_bodies(frame_bgr.shape, haar, hog_boxes, history)
+
+def detect_bodies(frame_bgr, rois=None, history=None):
+    # history: as for fuse_bodies (haarhog only; the other detectors keep no history here)
+    if BODY_DETECTOR == "haarhog":
+        return detect_haarhog(frame_bgr, rois, history)
+    with stage("body_" + BODY_DETECTOR):
+        return body_detectors.get(BODY_DETECTOR).detect(frame_bgr, rois)
+
+def draw(frame, faces, bodies, fps, dropped, note=""):
     for (x,y,w,h) in faces:
         cv2.rectangle(frame, (x,y), (x+w,y+h), (0,255,255), 2)
     for (x,y,w,h) in bodies:
         cv2.rectangle(frame, (x,y), (x+w,y+h), (0,255,0), 2)
 
-    # FPS
-    now = time.time()
-    dt = max(1e-6, now-last)
-    fps = 0.9*fps + 0.1*(1.0/dt)
-    last = now
-
     txt = "PERSON !" if (faces or bodies) else "NO PERSON"
-    cv2.putText(frame, f"{txt} | FPS: {fps:.1f}", (10, 22),
+    if note:
+        txt += f" | {note}"
+    cv2.putText(frame, f"{txt} | FPS: {fps:.1f} | dropped: {dropped}", (10, 22),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0) if faces or bodies else (0,0,255), 2)
 
-    cv2.imshow("Face + Body Detection", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+# ==== Main ====
+def main():
+    if BODY_DETECTOR == "haarhog":
+        init_detectors()
+    else:
+        init_detectors(("face",))
+        body_detectors.get(BODY_DETECTOR)     # load the model now, not on the first detection
+    if METRICS_PORT:
+        REGISTRY.serve(METRICS_PORT)
+    if METRICS_LOG_S:
+        REGISTRY.start_log(METRICS_LOG_S)
+    grab = open_frames(IP_CAM_URL).start()
+    disp = Display("Face + Body Detection")
+    sched = DetectScheduler(interval=DETECT_EVERY, adaptive=ADAPTIVE_CADENCE)
+    gate = MotionGate() if MOTION_GATE else None
+    faces, bodies = [], []
+
+    def detect_all(f):
+        rois = gate.rois(f, hold=faces + bodies) if gate else None
+        return run_in_rois(detect_faces, f, rois), detect_bodies(f, rois)
+
+    last = time.time()
+    fps = 0
+    cam_state = None
+
+    try:
+        while True:
+            with stage("capture"):          # waiting for the grabber's next frame
+                seq, frame = grab.read(timeout=RECONNECT_DELAY)
+            gauge("dropped", grab.dropped); gauge("reconnects", grab.reconnects)
+            gauge("camera_up", int(grab.connected))
+            if grab.state not in (cam_state, "connecting"):   # log transitions, not every retry
+                cam_state = grab.state
+                print(f"Camera {grab.health()}")
+            if frame is None:
+                # keep the last boxes; the grabber reconnects with backoff on its own thread
+                count("no_frame")
+                if disp.idle() == ord('q'):
+                    break
+                continue
+
+            with stage("detect"):           # motion gate + detect or track
+                if gate:
+                    gate.update(frame)
+                (faces, bodies), detected = sched.update(frame, detect_all)
+            count("frames"); count("detections" if detected else "tracked")
+
+            # FPS
+            now = time.time()
+            dt = max(1e-6, now-last)
+            fps = 0.9*fps + 0.1*(1.0/dt)
+            last = now
+            gauge("fps", fps)
+
+            with stage("draw"):
+                frame = drawable(frame)
+                draw(frame, faces, bodies, fps, grab.dropped,
+                     note=f"{sched.reason} 1/{sched.interval}")
+
+            with stage("imshow"):
+                key = disp.show(frame)
+            if key == ord('q'):
+                break
+    finally:
+        grab.stop()
+        REGISTRY.close()
+        disp.close()
+
+if __name__ == "__main__":
+    if PIPELINE:
+        import fb_pipeline
+        fb_pipeline.main()
+    else:
+        main()
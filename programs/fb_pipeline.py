@@ -0,0 +1,174 @@
+# fb_pipeline.py
+# Pipeline mode for face_body_detect.py.
+# Capture, MediaPipe faces, the Haar cascades and HOG each run in their own
+# process so the detectors use all four Pi 5 cores. Frames are copied once
+# into a shared-memory ring (shm_ring.py); queues only carry (seq, slot, shape).
+# The main process joins the three stage results by frame seq, runs the
+# agreed/NMS fusion (it owns body_history) and draws. With another
+# BODY_DETECTOR (dnn / ort, body_detectors.py) one "body" process runs that
+# detector instead of Haar + HOG, and its boxes are drawn as they come.
+# A stage process that dies is restarted (MAX_RESTARTS times) and the frames
+# it took with it are given up, so their ring slots go back to capture.
+#
+#   FB_PIPELINE=1 python face_body_detect.py     or     python fb_pipeline.py
+
+import time, queue
+import multiprocessing as mproc
+
+import face_body_detect as fbd
+from capture import RECONNECT_DELAY
+from frame_bus import open_frames
+from shm_ring import FrameRing
+from display import Display
+
+# ==== CONFIG ====
+SLOTS = 4           # frames in flight: more = better core usage, more latency
+MAX_RESTARTS = 5    # a detector process that dies is restarted this many times, then we give up
+STAGES = {"face": "detect_faces", "haar": "detect_haar", "hog": "detect_hog"}   # BODY_DETECTOR haarhog
+PLUGIN_STAGES = {"face": "detect_faces", "body": None}                            # any other: body_detectors
+
+def stages(body_detector):
+    return STAGES if body_detector == "haarhog" else PLUGIN_STAGES
+
+# ==== Workers ====
+def capture_worker(url, ring_name, free_q, stage_qs, stop, dropped):
+    ring = FrameRing.attach(ring_name, SLOTS)
+    grab = open_frames(url).start()
+    seq, skipped = 0, 0
+    try:
+        while not stop.is_set():
+            _, frame = grab.read(timeout=RECONNECT_DELAY)
+            if frame is None:
+                continue
+            try:
+                slot = free_q.get_nowait()
+            except queue.Empty:
+                skipped += 1            # all slots still in flight
+                dropped.value = grab.dropped + skipped
+                continue
+            seq += 1
+            shape = ring.write(slot, frame)
+            for q in stage_qs:
+                q.put((seq, slot, shape))
+            dropped.value = grab.dropped + skipped
+    finally:
+        for q in stage_qs:
+            q.put(None)
+        grab.stop()
+        ring.close()
+
+def stage_worker(stage, ring_name, in_q, out_q, body_detector="haarhog"):
+    if stage == "body":
+        import body_detectors
+        detect = body_detectors.get(body_detector).detect
+    else:
+        fbd.init_detectors((stage,))
+        detect = getattr(fbd, STAGES[stage])
+    ring = FrameRing.attach(ring_name, SLOTS)
+    try:
+        while True:
+            msg = in_q.get()
+            if msg is None:
+                break
+            seq, slot, shape = msg
+            boxes = detect(ring.view(slot, shape))
+            out_q.put((seq, slot, shape, stage, boxes))
+    finally:
+        ring.close()
+
+# ==== Main ====
+def main():
+    ctx = mproc.get_context("spawn")   # MediaPipe does not survive fork
+    ring = FrameRing(slots=SLOTS)
+    free_q = ctx.Queue()
+    for s in range(SLOTS):
+        free_q.put(s)
+    names = stages(fbd.BODY_DETECTOR)
+    stage_qs = {name: ctx.Queue() for name in names}
+    out_q = ctx.Queue()
+    stop = ctx.Event()
+    dropped = ctx.Value("L", 0)
+
+    def spawn_stage(name):
+        p = ctx.Process(target=stage_worker, args=(name, ring.name, stage_qs[name], out_q, fbd.BODY_DETECTOR),
+                        daemon=True)
+        p.start()
+        return p
+
+    capture = ctx.Process(target=capture_worker, daemon=True,
+                          args=(fbd.IP_CAM_URL, ring.name, free_q, list(stage_qs.values()), stop, dropped))
+    capture.start()
+    workers = {name: spawn_stage(name) for name in names}
+    restarts = 0
+
+    disp = Display("Face + Body Detection (pipeline)")
+    pending = {}    # seq -> (slot, {stage: boxes})
+    horizon = 0     # seqs below this were given up on (a stage died with them)
+    last = next_check = time.time()
+    fps = 0
+
+    try:
+        while True:
+            if time.time() >= next_check:
+                next_check = time.time() + 1.0
+                if not capture.is_alive():
+                    raise SystemExit(f"capture process died (exit code {capture.exitcode})")
+                for name, p in workers.items():
+                    if p.is_alive():
+                        continue
+                    restarts += 1
+                    if restarts > MAX_RESTARTS:
+                        raise SystemExit(f"{name} stage died (exit code {p.exitcode}), "
+                                         f"{MAX_RESTARTS} restarts used up")
+                    print(f"[pipeline] {name} stage died (exit code {p.exitcode}), restarting it")
+                    workers[name] = spawn_stage(name)
+
+            try:
+                seq, slot, shape, stage, boxes = out_q.get(timeout=RECONNECT_DELAY)
+            except queue.Empty:
+                if disp.idle() == ord('q'):
+                    break
+                continue
+            if seq < horizon:
+                continue
+
+            # at most SLOTS frames are in flight, so anything older is waiting
+            # on a stage that died with it: give its slot back
+            for old in [q for q in pending if q <= seq - SLOTS]:
+                free_q.put(pending.pop(old)[0])
+                horizon = max(horizon, old + 1)
+
+            got = pending.setdefault(seq, (slot, {}))[1]
+            got[stage] = boxes
+            if len(got) < len(names):
+                continue
+            del pending[seq]
+
+            # every stage is done with this slot: take our copy and recycle it
+            frame = ring.view(slot, shape).copy()
+            free_q.put(slot)
+
+            if "body" in got:
+                bodies = got["body"]
+            else:
+                bodies = fbd.fuse_bodies(frame.shape, got["haar"], got["hog"])
+
+            now = time.time()
+            dt = max(1e-6, now-last)
+            fps = 0.9*fps + 0.1*(1.0/dt)
+            last = now
+
+            fbd.draw(frame, got["face"], bodies, fps, dropped.value)
+            if disp.show(frame) == ord('q'):
+                break
+    finally:
+        stop.set()
+        for p in [capture, *workers.values()]:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+        ring.close()
+        disp.close()
+
+if __name__ == "__main__":
+    main()
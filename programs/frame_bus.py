@@ -0,0 +1,322 @@
+# frame_bus.py
+# One camera connection for every vision script on the robot.
+# The bus process owns the only cv2.VideoCapture (a FrameGrabber), decodes
+# each frame once and copies it into a named shared-memory ring. Any number
+# of local processes attach as readers by name and get numpy views straight
+# onto the ring: no second MJPEG decode, no second upload from the phone.
+#
+#   python frame_bus.py                              # start the bus (Ctrl+C to stop)
+#   FRAME_BUS=vanis python face_test.py              # scripts read from it instead of the camera
+#   FRAME_BUS=vanis python person_detect_test.py
+#
+#   with BusReader("vanis") as bus:
+#       seq, frame = bus.read(timeout=1.0)           # read-only view, zero-copy
+#       boxes = detect(frame)
+#       if not bus.valid(seq): ...                   # writer lapped us while detecting
+#
+# Layout: a header of int64 fields, one int64 row per slot (begin seq, end
+# seq, shape, stamp) and the slot data. The writer bumps a slot's begin seq,
+# copies the frame, then sets its end seq (a per-slot seqlock), so a reader
+# can tell a complete frame from one being overwritten without any lock
+# shared between unrelated processes. A view stays valid for about SLOTS-1
+# frame periods; readers that need a frame longer copy it (copy=True).
+
+import os, sys, time, signal, argparse
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from capture import FrameGrabber, RECONNECT_DELAY, STATES, STALL_S
+from shm_ring import MAX_FRAME_BYTES
+
+BUS_NAME = os.getenv("FRAME_BUS", "")       # set -> scripts read from this bus
+SLOTS = 6
+POLL_S = 0.002                              # reader poll while waiting for a new frame
+STALE_S = 3.0                               # no writer heartbeat this long = bus gone
+
+MAGIC = 0x56414E4953425553                  # "VANISBUS"
+# header fields
+(H_MAGIC, H_SLOTS, H_SLOT_BYTES, H_HEAD, H_PID, H_CONNECTED, H_RECONNECTS, H_DROPPED, H_BEAT_NS,
+ H_STATE, H_FAILURES) = range(11)
+HEADER_FIELDS = 16
+# per-slot fields
+S_BEGIN, S_END, S_H, S_W, S_C, S_STAMP_NS = range(6)
+SLOT_FIELDS = 8
+ALIGN = 64
+
+def _layout(slots):
+    meta_off = HEADER_FIELDS * 8
+    data_off = -(-(meta_off + slots * SLOT_FIELDS * 8) // ALIGN) * ALIGN
+    return meta_off, data_off
+
+def _attach(name):
+    """Open an existing segment without letting this process's resource
+    tracker unlink it on exit (readers are not started by the bus)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)       # 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class _Ring:
+    def __init__(self, shm):
+        self.shm = shm
+        self.hdr = np.ndarray((HEADER_FIELDS,), np.int64, shm.buf)
+        self.slots, self.slot_bytes = int(self.hdr[H_SLOTS]), int(self.hdr[H_SLOT_BYTES])
+        meta_off, self.data_off = _layout(self.slots)
+        self.meta = np.ndarray((self.slots, SLOT_FIELDS), np.int64, shm.buf, meta_off)
+
+    def view(self, slot, shape):
+        return np.ndarray(shape, np.uint8, self.shm.buf, self.data_off + slot * self.slot_bytes)
+
+    def release(self):
+        del self.hdr, self.meta         # views pin the buffer; drop them before close()
+        try:
+            self.shm.close()
+        except BufferError:
+            pass                        # a reader still holds a frame view; unmapped when it goes
+
+# ==== Writer ====
+class FrameBus:
+    """Owns the capture and the segment. publish() is also usable on its own
+    (e.g. to put replayed video on the bus)."""
+    def __init__(self, name="vanis", slots=SLOTS, slot_bytes=MAX_FRAME_BYTES):
+        meta_off, data_off = _layout(slots)
+        size = data_off + slots * slot_bytes
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            old = _attach(name)
+            hdr = np.ndarray((HEADER_FIELDS,), np.int64, old.buf)
+            pid = int(hdr[H_PID]); del hdr
+            if _pid_alive(pid):
+                old.close()
+                raise RuntimeError(f"frame bus '{name}' is already served by pid {pid}")
+            old.close()
+            shared_memory.SharedMemory(name=name).unlink()     # left over from a crashed bus
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = name
+        hdr = np.ndarray((HEADER_FIELDS,), np.int64, shm.buf)
+        hdr[:] = 0
+        hdr[H_SLOTS], hdr[H_SLOT_BYTES], hdr[H_PID] = slots, slot_bytes, os.getpid()
+        del hdr
+        self.ring = _Ring(shm)
+        self.ring.meta[:] = 0
+        self.beat(connected=False)
+        self.ring.hdr[H_MAGIC] = MAGIC          # last: readers check it before trusting the rest
+        self.published = 0
+        self.oversize = 0
+
+    def beat(self, connected=True, reconnects=0, dropped=0, state=None, failures=0):
+        hdr = self.ring.hdr
+        hdr[H_CONNECTED], hdr[H_RECONNECTS], hdr[H_DROPPED] = int(connected), reconnects, dropped
+        hdr[H_STATE] = STATES.index(state or ("up" if connected else "connecting"))
+        hdr[H_FAILURES] = failures
+        hdr[H_BEAT_NS] = time.monotonic_ns()
+
+    def publish(self, frame):
+        r = self.ring
+        if frame.nbytes > r.slot_bytes or frame.dtype != np.uint8:
+            self.oversize += 1
+            return None
+        seq = int(r.hdr[H_HEAD]) + 1
+        slot, m = seq % r.slots, r.meta[seq % r.slots]
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        m[S_BEGIN] = seq                        # readers of the old frame in this slot now see it as gone
+        np.copyto(r.view(slot, frame.shape), frame)
+        m[S_H], m[S_W], m[S_C], m[S_STAMP_NS] = h, w, c, time.monotonic_ns()
+        m[S_END] = seq                          # frame complete
+        r.hdr[H_HEAD] = seq
+        self.published += 1
+        return seq
+
+    def serve(self, url, w=640, h=480, log_s=10.0):
+        """Grab from url and publish until Ctrl+C."""
+        grab = FrameGrabber(url, w, h).start()
+        next_log = time.monotonic() + log_s
+        try:
+            while True:
+                _, frame = grab.read(timeout=RECONNECT_DELAY)
+                if frame is not None:
+                    self.publish(frame)
+                self.beat(grab.connected, grab.reconnects, grab.dropped, grab.state, grab.failures)
+                if log_s and time.monotonic() >= next_log:
+                    next_log += log_s
+                    print(f"[bus {self.name}] {grab.health()} | published {self.published} dropped {grab.dropped} "
+                          f"reconnects {grab.reconnects} oversize {self.oversize}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            grab.stop()
+
+    def close(self):
+        self.ring.hdr[H_MAGIC] = 0
+        shm = self.ring.shm
+        self.ring.release()
+        shm.unlink()
+
+# ==== Readers ====
+class BusReader:
+    """Reads the newest frame from a running bus. Quacks like FrameGrabber
+    (start/stop/read/age/state/health, dropped/reconnects/connected), so scripts can take
+    either. copy=False hands out read-only views into the ring; copy=True a
+    private, writable copy (for scripts that draw on the frame)."""
+    def __init__(self, name=None, copy=False, poll_s=POLL_S):
+        self.name = name or BUS_NAME or "vanis"
+        self.copy, self.poll_s = copy, poll_s
+        self.ring = None
+        if not self._reattach():
+            raise RuntimeError(f"'{self.name}' is not a running frame bus (start frame_bus.py)")
+        self.stamp = 0.0
+
+        # stats
+        self.grabbed = 0
+        self.dropped = 0        # frames published that this reader never read
+        self.torn = 0           # frames overwritten while being read or copied
+
+    # ---- FrameGrabber compatibility ----
+    def start(self):
+        return self
+
+    def stop(self):
+        if self.ring is not None:
+            self.ring.release()
+            self.ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def reconnects(self):
+        return int(self.ring.hdr[H_RECONNECTS]) if self.ring else 0
+
+    @property
+    def connected(self):
+        return self.alive() and bool(self.ring.hdr[H_CONNECTED])
+
+    @property
+    def state(self):
+        """The bus's camera state; "connecting" while there is no bus to read."""
+        if not self.alive():
+            return "connecting"
+        st = STATES[int(self.ring.hdr[H_STATE])]
+        return "stalled" if st == "up" and self.age() > STALL_S else st
+
+    @property
+    def failures(self):
+        return int(self.ring.hdr[H_FAILURES]) if self.ring else 0
+
+    def health(self):
+        st = self.state
+        if not self.alive():
+            return f"no bus '{self.name}'"
+        return f"{st} (failures {self.failures})" if st == "backoff" else st
+
+    def alive(self):
+        """Writer still running (heartbeat within STALE_S)."""
+        if self.ring is None or self.ring.hdr[H_MAGIC] != MAGIC:
+            return False
+        return time.monotonic_ns() - int(self.ring.hdr[H_BEAT_NS]) < STALE_S * 1e9
+
+    def age(self):
+        return time.monotonic() - self.stamp if self.stamp else float("inf")
+
+    def _reattach(self):
+        """Pick up a (re)started bus under our name; False if there is none."""
+        try:
+            ring = _Ring(_attach(self.name))
+        except (FileNotFoundError, ValueError):
+            return False
+        if ring.hdr[H_MAGIC] != MAGIC or (self.ring is not None and ring.hdr[H_PID] == self.ring.hdr[H_PID]):
+            ring.release()
+            return False
+        if self.ring is not None:
+            self.ring.release()
+        self.ring = ring
+        self._read_seq = int(ring.hdr[H_HEAD])          # only frames published from now on
+        return True
+
+    # ---- reading ----
+    def read(self, timeout=None):
+        """Newest unread frame as (seq, frame); (None, None) on timeout."""
+        r = self.ring
+        end = None if timeout is None else time.monotonic() + timeout
+        while r is not None:
+            seq = int(r.hdr[H_HEAD])
+            if seq > self._read_seq:
+                m = r.meta[seq % r.slots]
+                if m[S_END] == seq:
+                    h, w, c = int(m[S_H]), int(m[S_W]), int(m[S_C])
+                    stamp_ns = int(m[S_STAMP_NS])
+                    view = r.view(seq % r.slots, (h, w, c) if c > 1 else (h, w))
+                    frame = view.copy() if self.copy else view
+                    if m[S_BEGIN] == seq:           # not lapped while we looked
+                        if not self.copy:
+                            frame.flags.writeable = False
+                        if self._read_seq:
+                            self.dropped += seq - self._read_seq - 1
+                        self._read_seq = seq
+                        self.grabbed += 1
+                        self.stamp = stamp_ns / 1e9
+                        return seq, frame
+                    self.torn += 1
+                continue                            # writer mid-frame or lapped: look again
+            if end is not None and time.monotonic() >= end:
+                if not self.alive():
+                    self._reattach()                # bus restarted: follow it
+                return None, None
+            time.sleep(self.poll_s)
+        return None, None
+
+    def valid(self, seq):
+        """True while the frame read as seq has not started being overwritten."""
+        r = self.ring
+        return r is not None and r.meta[seq % r.slots][S_BEGIN] == seq
+
+def open_frames(url, w=640, h=480, copy=False):
+    """What the vision scripts read from: the frame bus when FRAME_BUS names
+    one, otherwise their own FrameGrabber. From the bus frames are read-only
+    views into the ring unless copy=True; pass a frame through drawable()
+    right before drawing on it."""
+    if BUS_NAME:
+        return BusReader(BUS_NAME, copy=copy)
+    return FrameGrabber(url, w, h)
+
+def drawable(frame):
+    """frame itself if it's writable (a FrameGrabber frame, a copy), else a
+    private copy of the bus view: only the frames that get drawn on are copied."""
+    return frame if frame.flags.writeable else frame.copy()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve one camera to every local vision script")
+    ap.add_argument("--url", default=os.getenv("IP_CAM_URL", "http://127.0.0.1:8080/video"))
+    ap.add_argument("--name", default=BUS_NAME or "vanis")
+    ap.add_argument("--slots", type=int, default=SLOTS)
+    ap.add_argument("--width", type=int, default=640)
+    ap.add_argument("--height", type=int, default=480)
+    args = ap.parse_args(argv)
+
+    bus = FrameBus(args.name, args.slots)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)     # systemd stop = Ctrl+C: unlink the segment
+    print(f"[bus {args.name}] {args.url} -> /dev/shm/{args.name}, {args.slots} slots; "
+          f"FRAME_BUS={args.name} python <script>.py to read it")
+    try:
+        bus.serve(args.url, args.width, args.height)
+    finally:
+        bus.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+# fused_hide.py
+# Camera + sonar in one process, one decision engine. The person/face
+# detector (person_detect_test.py's MediaPipe face + body detector) runs on
+# its own thread against the newest camera frame while the async sweep/hide
+# machine (sweep_hide_async.py) keeps ranging. Either path can start the hide:
+#   vision  a face (MediaPipe, score >= 0.6) in one frame, or a body box at
+#           least MIN_BODY_FRAC of the frame tall in VISION_HITS frames in a row
+#           -> hide early, while the person is still metres away
+#   sonar   as in suhide.py, the range filter's track <= NEAR_CM or closing
+#           on it within TTC_S (NEAR_HITS raw readings without RANGE_FILTER):
+#           the close-range backstop when the camera misses someone (or is down)
+# In until_clear mode the robot only comes out when the sonar reads clear AND
+# nobody has been seen for VISION_CLEAR_S.
+#
+# Latency is measured per path: sample -> decision (frame decoded / echo
+# measured until the engine has acted on it) and first hit -> hide command.
+# p50/p99/worst go to the metrics log every LOG_S and are printed on exit.
+#
+#   python fused_hide.py
+#   VANIS_GPIO=sim IP_CAM_URL=assets/VID-20250809-WA0004.mp4 VANIS_HEADLESS=1 python fused_hide.py
+
+import os, time, asyncio, threading
+from hal import Robot
+from sweep_hide_async import AsyncSweepHide
+from sweep_planner import FixedSweep, AdaptiveSweep
+from range_filter import RangeFilter
+from capture import RECONNECT_DELAY
+from frame_bus import open_frames
+from metrics import REGISTRY, count
+
+# ---- PINS (BCM) ----
+SERVO = 17
+TRIG  = 20
+ECHO  = 24          # MUST be level-shifted to 3.3V
+LEFT_IN1, LEFT_IN2  = 5, 6
+RIGHT_IN3, RIGHT_IN4 = 13, 19
+
+# ---- SWEEP ----
+SWEEP_MIN = 40
+SWEEP_MAX = 80
+STEP_DEG  = 2
+STEP_DELAY = 0.03
+SETTLE_S   = 0.10
+ADAPTIVE_SWEEP = True
+
+# ---- ULTRASONIC / LOGIC ----
+HIDE_MODE   = "until_clear"
+NEAR_CM     = 35
+CLEAR_CM    = 45
+NEAR_HITS   = 2
+CLEAR_HITS  = 3
+TIMEOUT_S   = 0.025
+HIDE_BACK_S = 0.5
+RANGE_FILTER = True
+TTC_S       = 0.5
+
+# ---- VISION ----
+URL = os.getenv("IP_CAM_URL", "http://127.0.0.1:8080/video")
+W, H = 640, 480
+VISION_HITS    = 2      # a face scores 2 at once, a body box 1 per frame
+MIN_BODY_FRAC  = 0.25   # body boxes shorter than this * frame height are too far away to matter
+VISION_CLEAR_S = 2.0    # until_clear: nobody seen for this long before coming out
+LOG_S = 10              # latency/metrics log line every N s (0 = off)
+
+# ==== Vision path ====
+class VisionWatch:
+    """Runs the detector on the newest frame, on its own thread; each result
+    goes to on_result(frame_stamp, faces, bodies, frame_h) on that thread."""
+    def __init__(self, url=URL, w=W, h=H, detect=None, on_result=None):
+        self.url, self.w, self.h = url, w, h
+        self.detect = detect
+        self.on_result = on_result
+        self._stop = threading.Event()
+        self._thread = None
+        self.grab = None
+
+        # stats
+        self.frames = 0
+
+    def start(self):
+        if self.detect is None:
+            import person_detect_test as pdt      # loads MediaPipe + cascades
+            self.detect = pdt.detect_all
+        self.grab = open_frames(self.url, self.w, self.h).start()
+        self._thread = threading.Thread(target=self._run, name="vision", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self.grab is not None:
+            self.grab.stop()
+
+    def _run(self):
+        cam_state = None
+        while not self._stop.is_set():
+            _, frame = self.grab.read(timeout=RECONNECT_DELAY)
+            if self.grab.state not in (cam_state, "connecting"):
+                cam_state = self.grab.state
+                print(f"[vision] camera {self.grab.health()}")
+            if frame is None:
+                continue                    # camera down: the sonar path carries on alone
+            stamp = self.grab.stamp
+            faces, bodies = self.detect(frame)
+            self.frames += 1
+            if self.on_result:
+                self.on_result(stamp, faces, bodies, frame.shape[0])
+
+# ==== Decision engine ====
+class FusedSweepHide(AsyncSweepHide):
+    """AsyncSweepHide with a second trigger path from the camera."""
+    def __init__(self, bot, vision=None, vision_hits=VISION_HITS, min_body_frac=MIN_BODY_FRAC,
+                 vision_clear_s=VISION_CLEAR_S, **kw):
+        super().__init__(bot, **kw)
+        self.vision = vision
+        self.vision_hits, self.min_body_frac = vision_hits, min_body_frac
+        self.vision_clear_s = vision_clear_s
+        self._results = None
+        self.vision_ct = 0
+        self._seen_at = None            # time.monotonic() of the last frame with a person
+        self._vision_since = None       # frame stamp of the first hit in the current run
+        self._near_since = None         # sonar stamp of the first near reading in the current run
+                                        # (with an rfilter: the start of the fired track's approach)
+
+        # stats
+        self.triggers = {"vision": 0, "sonar": 0}
+        self.worst = {}                 # metric name -> worst latency seen (s)
+
+    def _latency(self, name, s):
+        REGISTRY.observe(name, s)
+        if s > self.worst.get(name, 0.0):
+            self.worst[name] = s
+
+    async def run(self, duration=None):
+        loop = asyncio.get_running_loop()
+        self._results = asyncio.Queue()
+        self._near_since = None
+        if self.vision is not None:
+            self.vision.on_result = lambda *r: loop.call_soon_threadsafe(self._results.put_nowait, r)
+        try:
+            await super().run(duration)
+        finally:
+            if self.vision is not None:
+                self.vision.on_result = None
+
+    def _tasks(self):
+        return super()._tasks() + (self._seer(),)
+
+    # ---- vision path ----
+    async def _seer(self):
+        while True:
+            r = await self._results.get()
+            self._frame(*r)
+
+    def _frame(self, stamp, faces, bodies, frame_h):
+        close = [b for b in bodies if b[3] >= self.min_body_frac * frame_h]
+        if self.tel:
+            for b in faces:
+                self.tel.detect("face", b)
+            for b in close:
+                self.tel.detect("body", b)
+        hit = 2 if faces else 1 if close else 0
+        if hit:
+            if not self.vision_ct:
+                self._vision_since = stamp
+            self.vision_ct += hit
+            self._seen_at = time.monotonic()
+        else:
+            self.vision_ct = 0
+        count("vision_frames")
+        if self.state == "SWEEP" and self.vision_ct >= self.vision_hits:
+            what = f"{len(faces)} face(s)" if faces else f"{len(close)} body box(es)"
+            self.log(f"[SEEN] {what} -> HIDE ({self.hide})")
+            self.triggers["vision"] += 1
+            self.vision_ct = 0
+            self._start_hide()
+            if self.tel:
+                self.tel.event("trigger_vision")
+            self._latency("vision_trigger", time.monotonic() - self._vision_since)
+        self._latency("vision_decide", time.monotonic() - stamp)
+
+    # ---- sonar path ----
+    def _reading(self, stamp, d, pinged=None):
+        if d is not None and d <= self.near_cm and not self.near_ct:
+            self._near_since = stamp
+        hides = len(self.hide_times)
+        super()._reading(stamp, d, pinged)
+        now = self.bot.now()
+        if len(self.hide_times) > hides:
+            self.triggers["sonar"] += 1
+            if self.tel:
+                self.tel.event("trigger_sonar", d)
+            since = self._near_since
+            if self.rfilter is not None:
+                # ttc hides fire with no reading <= near_cm: time it from when the
+                # track came within clear_cm or started closing, not from its first echo
+                tr = self.rfilter.track(self.servo_at)
+                since = tr.t_approach if tr.t_approach is not None else tr.t0
+            if since is not None:
+                self._latency("sonar_trigger", now - since)
+            self._near_since = None
+        self._latency("sonar_decide", now - stamp)
+
+    def _may_resume(self):
+        return self._seen_at is None or time.monotonic() - self._seen_at >= self.vision_clear_s
+
+    # ---- report ----
+    def report(self):
+        lines = []
+        for path in ("vision", "sonar"):
+            for kind in ("decide", "trigger"):
+                name = f"{path}_{kind}"
+                st = REGISTRY.stages.get(name)
+                if st is None or not st.n:
+                    continue
+                p50, _, p99 = st.quantiles()
+                lines.append(f"{name:15s} n {st.n:5d}  p50 {1000 * p50:6.1f}  p99 {1000 * p99:6.1f}  "
+                             f"worst {1000 * self.worst[name]:6.1f} ms")
+        return lines
+
+def main():
+    bot = Robot("rpi", servo=SERVO, trig=TRIG, echo=ECHO,
+                left=(LEFT_IN1, LEFT_IN2), right=(RIGHT_IN3, RIGHT_IN4), timeout_s=TIMEOUT_S)
+    planner = (AdaptiveSweep((SWEEP_MIN, SWEEP_MAX)) if ADAPTIVE_SWEEP
+               else FixedSweep((SWEEP_MIN, SWEEP_MAX), STEP_DEG, STEP_DELAY))
+    vision = VisionWatch(URL, W, H)
+    sh = FusedSweepHide(bot, vision=vision, hide=HIDE_MODE, sweep=(SWEEP_MIN, SWEEP_MAX), step_deg=STEP_DEG,
+                        step_delay=STEP_DELAY, settle_s=SETTLE_S, near_cm=NEAR_CM, near_hits=NEAR_HITS,
+                        clear_cm=CLEAR_CM, clear_hits=CLEAR_HITS, back_s=HIDE_BACK_S, planner=planner,
+                        rfilter=RangeFilter(ttc_s=TTC_S) if RANGE_FILTER else None)
+    if LOG_S:
+        REGISTRY.start_log(LOG_S)
+
+    print(f"Sweep {SWEEP_MIN}↔{SWEEP_MAX} + camera {URL}; hide on a person or a sonar hit. Ctrl+C to quit.")
+    vision.start()
+    try:
+        asyncio.run(sh.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        vision.stop()
+        bot.close()
+        REGISTRY.close()
+        print(f"hides: vision {sh.triggers['vision']}, sonar {sh.triggers['sonar']}; "
+              f"{vision.frames} frames, {sh.readings} sonar readings")
+        for line in sh.report():
+            print(line)
+
+if __name__ == "__main__":
+    main()
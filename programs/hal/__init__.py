@@ -0,0 +1,19 @@
+# hal — hardware abstraction for the VANIS robot scripts.
+# One pin-level Backend per GPIO library (RPi.GPIO, pigpio, lgpio, gpiozero)
+# plus a deterministic simulator, and the robot devices (L298, servo, HC-SR04)
+# written once on top. Scripts pick their usual library; VANIS_GPIO overrides:
+#   VANIS_GPIO=sim python back.py        simulated robot, real time
+#   VANIS_GPIO=sim-fast python back.py   virtual clock, faster than real time
+#   VANIS_TELEMETRY=runs/ python back.py   record the run (telemetry.py)
+#   VANIS_RAMP=s python back.py          S-curve speed ramps (motion.py)
+#   VANIS_WATCHDOG=0.3 python back.py    motor deadman timeout, 0.5 s by default; 0 = off (watchdog.py)
+
+from .base import Backend, open_backend
+from .devices import L298, Servo, HCSR04, angle_to_us, clamp_pct
+from .ranger import Ranger
+from .robot import Robot
+from .sim import SimBackend, SimWorld
+from .telemetry import Telemetry, TelemetryLog, ReplayWorld
+from .motion import Ramp, RampedMotors, ramped
+from .watchdog import Watchdog
+from .turn import Turner, TurnModel, make_turner
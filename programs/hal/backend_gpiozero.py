@@ -0,0 +1,67 @@
+# hal/backend_gpiozero.py
+# gpiozero devices used as raw pins (works with any gpiozero pin factory).
+
+from gpiozero import DigitalOutputDevice, DigitalInputDevice, PWMOutputDevice
+from .base import Backend
+
+class GpiozeroBackend(Backend):
+    name = "gpiozero"
+
+    def __init__(self):
+        self._dev = {}
+
+    def _replace(self, pin, dev):
+        old = self._dev.pop(pin, None)
+        if old is not None:
+            old.close()
+        self._dev[pin] = dev
+        return dev
+
+    def setup_output(self, pin, value=0):
+        self._replace(pin, DigitalOutputDevice(pin, initial_value=bool(value)))
+
+    def setup_input(self, pin):
+        # HC-SR04 echo is driven push-pull through the divider: no pull resistor
+        self._replace(pin, DigitalInputDevice(pin, pull_up=None, active_state=True))
+
+    def write(self, pin, value):
+        self._dev[pin].value = value
+
+    def read(self, pin):
+        return int(self._dev[pin].value)
+
+    def edges(self, pin, fn):
+        # pin-factory ticks (hardware ticks on the pigpio/lgpio factories);
+        # ticks_diff handles wrap-around, so keep a running total in seconds
+        dev = self._dev[pin]
+        pin_, factory = dev.pin, dev.pin_factory
+        inner = pin_.when_changed
+        last = [None, 0.0]
+
+        def changed(ticks, state):
+            if inner is not None:
+                inner(ticks, state)
+            if last[0] is not None:
+                last[1] += factory.ticks_diff(ticks, last[0])
+            last[0] = ticks
+            fn(int(state), last[1])
+
+        pin_.edges = "both"
+        pin_.when_changed = changed
+
+        def cancel():
+            pin_.when_changed = inner
+        return cancel
+
+    def pwm(self, pin, freq_hz, duty_pct):
+        dev = self._dev.get(pin)
+        if not isinstance(dev, PWMOutputDevice):
+            dev = self._replace(pin, PWMOutputDevice(pin, frequency=freq_hz))
+        elif dev.frequency != freq_hz:
+            dev.frequency = freq_hz
+        dev.value = max(0.0, min(1.0, duty_pct / 100.0))
+
+    def close(self):
+        for dev in self._dev.values():
+            dev.close()
+        self._dev.clear()
@@ -0,0 +1,44 @@
+# hal/backend_lgpio.py
+# lgpio (sudo apt install python3-lgpio), talks to /dev/gpiochip directly.
+
+import lgpio
+from .base import Backend
+
+class LgpioBackend(Backend):
+    name = "lgpio"
+
+    def __init__(self, chip=0):
+        self.h = lgpio.gpiochip_open(chip)   # first gpiochip (usually 0 on Pi)
+
+    def setup_output(self, pin, value=0):
+        lgpio.gpio_claim_output(self.h, pin, value)
+
+    def setup_input(self, pin):
+        lgpio.gpio_claim_input(self.h, pin)
+
+    def write(self, pin, value):
+        lgpio.gpio_write(self.h, pin, value)
+
+    def read(self, pin):
+        return lgpio.gpio_read(self.h, pin)
+
+    def edges(self, pin, fn):
+        # gpiochip line events: the kernel stamps each edge (ns)
+        lgpio.gpio_claim_alert(self.h, pin, lgpio.BOTH_EDGES)
+        def cb(chip, gpio, level, timestamp):
+            if level < 2:                       # 2 = watchdog, not an edge
+                fn(level, timestamp / 1e9)
+        return lgpio.callback(self.h, pin, lgpio.BOTH_EDGES, cb).cancel
+
+    def pwm(self, pin, freq_hz, duty_pct):
+        if duty_pct <= 0:
+            lgpio.tx_pwm(self.h, pin, 0, 0)
+            lgpio.gpio_write(self.h, pin, 0)     # PWM off leaves the line where it was
+        else:
+            lgpio.tx_pwm(self.h, pin, freq_hz, duty_pct)
+
+    def servo(self, pin, pulse_us):
+        lgpio.tx_servo(self.h, pin, int(pulse_us))
+
+    def close(self):
+        lgpio.gpiochip_close(self.h)
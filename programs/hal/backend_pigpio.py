@@ -0,0 +1,58 @@
+# hal/backend_pigpio.py
+# pigpio daemon (sudo systemctl start pigpiod). Hardware-timed servo pulses
+# and trigger pulses; echo edges are timestamped by the daemon (us ticks).
+
+import pigpio
+from .base import Backend
+
+class PigpioBackend(Backend):
+    name = "pigpio"
+
+    def __init__(self):
+        self.pi = pigpio.pi()
+        if not self.pi.connected:
+            raise RuntimeError("pigpio daemon not running (sudo systemctl start pigpiod)")
+        self._servos = set()
+        self._tick, self._wraps = None, 0
+
+    def setup_output(self, pin, value=0):
+        self.pi.set_mode(pin, pigpio.OUTPUT)
+        self.pi.write(pin, value)
+
+    def setup_input(self, pin):
+        self.pi.set_mode(pin, pigpio.INPUT)
+
+    def write(self, pin, value):
+        self.pi.write(pin, value)
+
+    def read(self, pin):
+        return self.pi.read(pin)
+
+    def edges(self, pin, fn):
+        def cb(gpio, level, tick):
+            if level < 2:                       # 2 = watchdog, not an edge
+                fn(level, self._seconds(tick))
+        return self.pi.callback(pin, pigpio.EITHER_EDGE, cb).cancel
+
+    def _seconds(self, tick):
+        # ticks are a 32-bit us counter, wrapping every ~72 min
+        if self._tick is not None and tick < self._tick:
+            self._wraps += 1
+        self._tick = tick
+        return (self._wraps * 2**32 + tick) / 1e6
+
+    def pwm(self, pin, freq_hz, duty_pct):
+        self.pi.set_PWM_frequency(pin, int(freq_hz))
+        self.pi.set_PWM_dutycycle(pin, int(round(duty_pct * 255 / 100.0)))
+
+    def servo(self, pin, pulse_us):
+        self._servos.add(pin)
+        self.pi.set_servo_pulsewidth(pin, int(pulse_us))
+
+    def trigger(self, pin, pulse_us=10):
+        self.pi.gpio_trigger(pin, pulse_us, 1)
+
+    def close(self):
+        for pin in self._servos:
+            self.pi.set_servo_pulsewidth(pin, 0)
+        self.pi.stop()
@@ -0,0 +1,50 @@
+# hal/backend_rpi.py
+# RPi.GPIO (or python3-rpi-lgpio on the Pi 5, same API).
+
+import time
+import RPi.GPIO as GPIO
+from .base import Backend
+
+class RPiBackend(Backend):
+    name = "rpi"
+
+    def __init__(self):
+        GPIO.setmode(GPIO.BCM)
+        self._pwm = {}      # pin -> [GPIO.PWM, freq]
+
+    def setup_output(self, pin, value=0):
+        GPIO.setup(pin, GPIO.OUT)
+        GPIO.output(pin, value)
+
+    def setup_input(self, pin):
+        GPIO.setup(pin, GPIO.IN)
+
+    def write(self, pin, value):
+        GPIO.output(pin, value)
+
+    def read(self, pin):
+        return GPIO.input(pin)
+
+    def edges(self, pin, fn):
+        # kernel edge detection, but the timestamp is taken in RPi.GPIO's
+        # callback thread: better than polling, not as tight as pigpio ticks
+        GPIO.add_event_detect(pin, GPIO.BOTH, callback=lambda ch: fn(GPIO.input(ch), time.monotonic()))
+        return lambda: GPIO.remove_event_detect(pin)
+
+    def pwm(self, pin, freq_hz, duty_pct):
+        p = self._pwm.get(pin)
+        if p is None:
+            GPIO.setup(pin, GPIO.OUT)
+            pw = GPIO.PWM(pin, freq_hz)
+            pw.start(duty_pct)
+            self._pwm[pin] = [pw, freq_hz]
+            return
+        if p[1] != freq_hz:
+            p[0].ChangeFrequency(freq_hz); p[1] = freq_hz
+        p[0].ChangeDutyCycle(duty_pct)
+
+    def close(self):
+        for pw, _ in self._pwm.values():
+            pw.stop()
+        self._pwm.clear()
+        GPIO.cleanup()
@@ -0,0 +1,111 @@
+# hal/base.py
+# Pin-level backend interface. Pins are BCM numbers everywhere.
+# The robot devices (devices.py) only talk to a Backend, so the same motor /
+# servo / ultrasonic code runs on RPi.GPIO, pigpio, lgpio, gpiozero or the
+# simulator (sim.py).
+
+import os, threading, time
+
+class Backend:
+    name = "base"
+
+    # ---- pins ----
+    def setup_output(self, pin, value=0):
+        raise NotImplementedError
+
+    def setup_input(self, pin):
+        raise NotImplementedError
+
+    def write(self, pin, value):
+        raise NotImplementedError
+
+    def read(self, pin):
+        raise NotImplementedError
+
+    # ---- PWM ----
+    def pwm(self, pin, freq_hz, duty_pct):
+        """Hardware/software PWM on pin; duty_pct 0 stops it."""
+        raise NotImplementedError
+
+    def servo(self, pin, pulse_us):
+        # 50 Hz frame is 20000 us, so duty% = us / 200 (0.5-2.5 ms -> 2.5-12.5%)
+        self.pwm(pin, 50, pulse_us / 200.0)
+
+    def trigger(self, pin, pulse_us=10):
+        self.write(pin, 0); self.sleep(0.00001)
+        self.write(pin, 1); self.sleep(pulse_us / 1e6)
+        self.write(pin, 0)
+
+    # ---- edges ----
+    def edges(self, pin, fn):
+        """Call fn(level, t) on every edge of an input pin, t in seconds taken
+        as close to the hardware as the library allows (only differences
+        between two t's mean anything). Returns a cancel() function, or None
+        if this backend can't do it (callers fall back to polling)."""
+        return None
+
+    # ---- time ----
+    # Always monotonic: wall-clock steps (NTP) must not show up as distance.
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, s):
+        if s > 0:
+            time.sleep(s)
+
+    def wait(self, event, timeout=None):
+        """threading.Event.wait on the robot's clock."""
+        return event.wait(timeout)
+
+    def every(self, period_s, fn, name="every"):
+        """Run fn() every period_s on a fixed schedule (a late call does not
+        make the next one early). Returns a stop() function."""
+        stop = threading.Event()
+
+        def run():
+            nxt = self.now()
+            while not stop.is_set():
+                fn()
+                nxt += period_s
+                delay = nxt - self.now()
+                if delay < 0:                   # overran: skip, don't burst to catch up
+                    nxt, delay = self.now(), 0
+                stop.wait(delay)
+
+        threading.Thread(target=run, name=name, daemon=True).start()
+        return stop.set
+
+    # ---- simulator hook ----
+    def attach(self, kind, **pins):
+        """Called by devices when they claim their pins; SimBackend builds a
+        virtual device here, real backends ignore it."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+BACKENDS = {
+    "rpi":      ("hal.backend_rpi", "RPiBackend"),
+    "pigpio":   ("hal.backend_pigpio", "PigpioBackend"),
+    "lgpio":    ("hal.backend_lgpio", "LgpioBackend"),
+    "gpiozero": ("hal.backend_gpiozero", "GpiozeroBackend"),
+    "sim":      ("hal.sim", "SimBackend"),
+    "sim-fast": ("hal.sim", "SimBackend"),
+}
+
+def open_backend(default="rpi", name=None, **kw):
+    """Backend by name; VANIS_GPIO overrides the script's default.
+    Library imports are lazy, so e.g. the simulator needs none of them."""
+    import importlib
+    name = (name or os.getenv("VANIS_GPIO") or default).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"unknown GPIO backend {name!r} (choose from {', '.join(BACKENDS)})")
+    mod, cls = BACKENDS[name]
+    if name.startswith("sim"):
+        kw.setdefault("realtime", name == "sim")
+    return getattr(importlib.import_module(mod), cls)(**kw)
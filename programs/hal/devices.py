@@ -0,0 +1,174 @@
+# hal/devices.py
+# The robot's parts, written once on top of a Backend:
+#   L298    two DC motors (IN1..IN4, optional ENA/ENB PWM or PWM on the INs;
+#           motion.py ramps its speed)
+#   Servo   hobby servo, 0-180 deg -> 500-2500 us
+#   HCSR04  ultrasonic ranger (trigger + polled echo; see ranger.py for the
+#           edge-timed one the scripts use)
+# Each records what it is told / measures to .tel (a hal.telemetry.Telemetry)
+# when Robot gives it one.
+
+SPEED_OF_SOUND_CM_S = 34300.0
+
+def angle_to_us(deg, min_us=500, max_us=2500):
+    # map 0..180 deg -> 500..2500 µs
+    deg = max(0.0, min(180.0, deg))
+    return int(min_us + (deg / 180.0) * (max_us - min_us))
+
+def clamp_pct(p):
+    try: p = int(p)
+    except (TypeError, ValueError): p = 0
+    return max(0, min(100, p))
+
+class L298:
+    """en=(ENA, ENB) PWM pins, or (None, None) when ENA/ENB are tied high
+    (then there is no speed control, only on/off, unless in_pwm puts the
+    PWM on the IN pins instead). enabled=False (the watchdog) turns every
+    command into a stop."""
+    tel = None
+    wd = None                           # hal.watchdog.Watchdog, set by Robot
+
+    def __init__(self, hw, left=(5, 6), right=(13, 19), en=(None, None), pwm_hz=1000, in_pwm=False):
+        self.hw = hw
+        self.left_pins, self.right_pins = tuple(left), tuple(right)
+        self.ena, self.enb = en
+        self.pwm_hz = pwm_hz
+        self.in_pwm = in_pwm and en == (None, None)
+        self.enabled = True
+        self.cmd = {"l": 0, "r": 0}     # signed speed each side was last given
+        for p in self.left_pins + self.right_pins:
+            hw.setup_output(p, 0)
+        for p in en:
+            if p is not None:
+                hw.setup_output(p, 0)
+        hw.attach("l298", in1=left[0], in2=left[1], in3=right[0], in4=right[1], ena=en[0], enb=en[1])
+
+    def side(self, side, direction, speed=100):
+        """side "l"/"r", direction "f"/"b"/"s", speed 0-100 %."""
+        a, b = self.left_pins if side == "l" else self.right_pins
+        en = self.ena if side == "l" else self.enb
+        if not self.enabled:
+            direction = "s"
+        if self.in_pwm:
+            # drive/coast: PWM on the IN for this direction, the other one low
+            duty = clamp_pct(speed)
+            self.hw.pwm(a, self.pwm_hz, duty if direction == "f" else 0)
+            self.hw.pwm(b, self.pwm_hz, duty if direction == "b" else 0)
+        elif direction == "f":
+            self.hw.write(a, 1); self.hw.write(b, 0)
+        elif direction == "b":
+            self.hw.write(a, 0); self.hw.write(b, 1)
+        else:
+            self.hw.write(a, 0); self.hw.write(b, 0)
+        if en is not None:
+            self.hw.pwm(en, self.pwm_hz, clamp_pct(speed) if direction in ("f", "b") else 0)
+        self.cmd[side] = clamp_pct(speed) * {"f": 1, "b": -1}.get(direction, 0)
+        if self.tel:
+            self.tel.motor(0 if side == "l" else 1, self.cmd[side])
+
+    def drive(self, left, right):
+        """Signed speeds -100..100 per side."""
+        self.side("l", "f" if left > 0 else "b" if left < 0 else "s", abs(left))
+        self.side("r", "f" if right > 0 else "b" if right < 0 else "s", abs(right))
+
+    def stop(self):
+        self.side("l", "s"); self.side("r", "s")
+
+    def cut(self):
+        """All IN/EN pins low, straight to the backend (no telemetry, no locks)."""
+        for p in self.left_pins + self.right_pins:
+            if self.in_pwm:
+                self.hw.pwm(p, self.pwm_hz, 0)
+            else:
+                self.hw.write(p, 0)
+        for p in (self.ena, self.enb):
+            if p is not None:
+                self.hw.pwm(p, self.pwm_hz, 0)
+        self.cmd = {"l": 0, "r": 0}
+
+    def close(self):
+        self.stop()
+
+    def _timed(self, t, left, right):
+        """drive(left, right), and with t > 0 hold it for t s and stop."""
+        if t > 0 and self.wd:
+            self.wd.expect(t)           # before drive(): this also lifts a trip, so the move isn't lost
+        self.drive(left, right)
+        if t > 0:
+            self.hw.sleep(t); self.stop()
+            if self.wd:
+                self.wd.disarm()        # stopped: nothing to cut until the loop feeds again
+
+    # ---- the moves the sweep/hide scripts use ----
+    def forward(self, t=0, speed=100):
+        self._timed(t, speed, speed)
+
+    def backward(self, t=0, speed=100):
+        self._timed(t, -speed, -speed)
+
+    def tank_ccw(self, t=0, speed=100):
+        # LEFT forward + RIGHT backward -> spin in place (CCW)
+        self._timed(t, speed, -speed)
+
+    def tank_cw(self, t=0, speed=100):
+        # LEFT backward + RIGHT forward -> spin in place (CW)
+        self._timed(t, -speed, speed)
+
+class Servo:
+    tel = None
+
+    def __init__(self, hw, pin, min_us=500, max_us=2500):
+        self.hw, self.pin = hw, pin
+        self.min_us, self.max_us = min_us, max_us
+        self.angle = None
+        hw.setup_output(pin, 0)
+        hw.attach("servo", pin=pin)
+
+    def set_deg(self, deg, settle=0.0):
+        deg = max(0, min(180, deg))
+        self.hw.servo(self.pin, angle_to_us(deg, self.min_us, self.max_us))
+        self.angle = deg
+        if self.tel:
+            self.tel.servo(deg)
+        if settle:
+            self.hw.sleep(settle)
+
+    def off(self):
+        self.hw.servo(self.pin, 0)      # no pulses -> servo goes limp
+
+class HCSR04:
+    """ECHO must be level-shifted to 3.3V."""
+    tel = None
+
+    def __init__(self, hw, trig, echo, timeout_s=0.025):
+        self.hw, self.trig, self.echo = hw, trig, echo
+        self.timeout_s = timeout_s      # 0.025 s ~ 4 m
+        hw.setup_output(trig, 0)
+        hw.setup_input(echo)
+        hw.attach("hcsr04", trig=trig, echo=echo)
+
+    def distance_cm(self, since=None):
+        # since: don't ping before this (servo move + settle); as Ranger.distance_cm
+        if since is not None and since > self.hw.now():
+            self.hw.sleep(since - self.hw.now())
+        cm = self._measure()
+        if self.tel:
+            self.tel.range(cm)
+        return cm
+
+    def _measure(self):
+        hw = self.hw
+        hw.trigger(self.trig, 10)
+
+        t0 = hw.now()
+        while hw.read(self.echo) == 0:
+            if hw.now() - t0 > self.timeout_s:
+                return None
+        start = hw.now()
+
+        while hw.read(self.echo) == 1:
+            if hw.now() - start > self.timeout_s:
+                return None
+        end = hw.now()
+
+        return ((end - start) * SPEED_OF_SOUND_CM_S) / 2.0
@@ -0,0 +1,202 @@
+# hal/motion.py
+# Speed ramps for the L298. Going straight from 0 to full duty (or from full
+# forward to full reverse) spins the wheels and pulls a current spike that can
+# brown out the Pi; RampedMotors puts a motion profile between what the script
+# asks for and the pins. Each side's speed follows its target at a limited
+# acceleration (trapezoid) or, with a jerk limit, with the acceleration itself
+# ramped too (S-curve), updated at rate_hz on the backend's timer. A new
+# command mid-ramp starts from where the wheels are now, so a reverse that
+# runs into a turn blends into it instead of stopping in between.
+#
+#   motors = RampedMotors(L298(hw, ..., en=(ENA, ENB)), accel=400, jerk=4000)
+#   motors.drive(80, 80)          # returns at once; the control thread ramps
+#   motors.wait()                 # until both sides are at speed
+#   motors.tank_ccw(0.7)          # same moves as L298
+#   motors.halt()                 # no ramp: pins off now
+#
+#   VANIS_RAMP=s python suhide.py     # Robot ramps its motors (trap | s)
+#
+# Without ENA/ENB (tied high, like the sweep/hide wiring) the speed goes on the
+# IN pins instead (L298(in_pwm=True): PWM on the active IN, the other low);
+# Robot does that by itself when VANIS_RAMP is set.
+
+import os, math, threading
+from .devices import clamp_pct
+
+RAMP = os.getenv("VANIS_RAMP", "")                      # "" (off) | trap | s
+ACCEL = float(os.getenv("VANIS_ACCEL", "400"))          # %/s: 0 -> full in 0.25 s
+JERK = float(os.getenv("VANIS_JERK", "4000"))           # %/s^2 for the S-curve
+MIN_PCT = float(os.getenv("VANIS_MIN_PCT", "0"))        # duty where the wheels start to turn
+RATE_HZ = 100
+
+class Ramp:
+    """One side's profile: speed v (%) and acceleration a (%/s) chasing target."""
+    def __init__(self, accel=ACCEL, jerk=0.0):
+        self.accel, self.jerk = accel, jerk
+        self.v = self.a = 0.0
+        self.target = 0.0
+        self.scale = 1.0                # < 1 slows this side so both sides land together
+
+    def done(self):
+        return self.v == self.target and self.a == 0.0
+
+    def step(self, dt):
+        err = self.target - self.v
+        if err == 0.0 and self.a == 0.0:
+            return self.v
+        if self.accel <= 0:
+            self.v, self.a = self.target, 0.0
+            return self.v
+        a_max = self.accel * self.scale
+        sign = 1.0 if err > 0 else -1.0
+        if self.jerk > 0:
+            j = self.jerk * self.scale
+            # the most acceleration that can still be ramped back to 0 by the target
+            want = sign * min(a_max, math.sqrt(2.0 * j * abs(err)))
+            self.a += max(-j * dt, min(j * dt, want - self.a))
+        else:
+            self.a = sign * a_max
+        dv = self.a * dt
+        if dv * sign >= abs(err):       # would reach (or pass) the target this tick
+            self.v, self.a = self.target, 0.0
+        else:
+            self.v += dv
+        return self.v
+
+class RampedMotors:
+    """Drop-in for L298 (drive / side / stop / forward / backward / tank_*):
+    commands set targets, the control thread moves the pins. jerk=0 is a
+    trapezoid, accel=0 no ramp at all."""
+    wd = None                           # hal.watchdog.Watchdog, set by Robot
+    def __init__(self, motors, accel=ACCEL, jerk=JERK, rate_hz=RATE_HZ, min_pct=MIN_PCT, sync=True):
+        self.motors, self.hw = motors, motors.hw
+        self.ramps = {"l": Ramp(accel, jerk), "r": Ramp(accel, jerk)}
+        self.period = 1.0 / rate_hz
+        self.min_pct = min_pct
+        self.sync = sync                # scale the ramps so both sides reach their targets together
+        self._out = {"l": 0, "r": 0}    # signed duty last written per side
+        self._lock = threading.Lock()
+        self._settled = threading.Event()
+        self._settled.set()
+        self._last_t = None
+        self._stop = None               # control timer; runs only while ramping
+
+        # stats
+        self.ticks = 0
+        self.writes = 0
+
+    @property
+    def cmd(self):
+        return self.motors.cmd
+
+    def set_accel(self, accel=None, jerk=None):
+        with self._lock:
+            for r in self.ramps.values():
+                if accel is not None:
+                    r.accel = accel
+                if jerk is not None:
+                    r.jerk = jerk
+
+    # ---- commands ----
+    def drive(self, left, right):
+        """Signed target speeds -100..100 per side."""
+        with self._lock:
+            for s, v in (("l", left), ("r", right)):
+                self.ramps[s].target = float(max(-100, min(100, v)))
+            self._rescale()
+            self._settled.clear()
+            if self._stop is None:
+                self._last_t = None
+                self._stop = self.hw.every(self.period, self._tick, name="motion")
+
+    def side(self, side, direction, speed=100):
+        """side "l"/"r", direction "f"/"b"/"s", speed 0-100 %."""
+        target = {s: r.target for s, r in self.ramps.items()}
+        target[side] = clamp_pct(speed) * {"f": 1, "b": -1}.get(direction, 0)
+        self.drive(target["l"], target["r"])
+
+    def stop(self):
+        """Ramp both sides down to 0."""
+        self.drive(0, 0)
+
+    def halt(self):
+        """Stop now, no ramp (emergencies, shutdown)."""
+        with self._lock:
+            for r in self.ramps.values():
+                r.v = r.a = r.target = 0.0
+            self.motors.stop()
+            self._out = {"l": 0, "r": 0}
+            self._settled.set()
+            if self._stop:
+                self._stop(); self._stop = None
+
+    def wait(self, timeout=None):
+        """Block until both sides are at their targets."""
+        return self.hw.wait(self._settled, timeout)
+
+    def _rescale(self):
+        if not self.sync:
+            return
+        need = {s: abs(r.target - r.v) for s, r in self.ramps.items()}
+        most = max(need.values())
+        for s, r in self.ramps.items():
+            r.scale = max(0.05, need[s] / most) if most > 0 else 1.0
+
+    # ---- control thread ----
+    def _duty(self, v):
+        if abs(v) < 0.5:
+            return 0
+        mag = self.min_pct + (100.0 - self.min_pct) * abs(v) / 100.0
+        return int(round(math.copysign(mag, v)))
+
+    def _tick(self):
+        t = self.hw.now()
+        dt = self.period if self._last_t is None else min(t - self._last_t, 5 * self.period)
+        self._last_t = t
+        with self._lock:
+            if self._stop is None:      # halted while this tick was due
+                return
+            self.ticks += 1
+            for s, r in self.ramps.items():
+                out = self._duty(r.step(dt))
+                if out != self._out[s]:
+                    self.motors.side(s, "f" if out > 0 else "b" if out < 0 else "s", abs(out))
+                    self._out[s] = out
+                    self.writes += 1
+            if all(r.done() for r in self.ramps.values()):
+                self._settled.set()
+                self._stop(); self._stop = None
+
+    def _timed(self, t, left, right):
+        """drive(left, right), and with t > 0 hold it for t s and stop."""
+        if t > 0 and self.wd:
+            self.wd.expect(t)           # before drive(): this also lifts a trip, so the move isn't lost
+        self.drive(left, right)
+        if t > 0:
+            self.hw.sleep(t); self.stop()
+            if self.wd:
+                self.wd.disarm()        # stopped: nothing to cut until the loop feeds again
+
+    # ---- the moves the sweep/hide scripts use ----
+    def forward(self, t=0, speed=100):
+        self._timed(t, speed, speed)
+
+    def backward(self, t=0, speed=100):
+        self._timed(t, -speed, -speed)
+
+    def tank_ccw(self, t=0, speed=100):
+        self._timed(t, speed, -speed)
+
+    def tank_cw(self, t=0, speed=100):
+        self._timed(t, -speed, speed)
+
+    def close(self):
+        self.halt()
+
+def ramped(motors, ramp=RAMP, accel=ACCEL, jerk=JERK, **kw):
+    """motors wrapped per `ramp` ("trap", "s"), or unchanged when it's empty."""
+    if not ramp:
+        return motors
+    if ramp not in ("trap", "s"):
+        raise ValueError(f"unknown VANIS_RAMP {ramp!r} (trap or s)")
+    return RampedMotors(motors, accel, jerk if ramp == "s" else 0.0, **kw)
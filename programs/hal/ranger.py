@@ -0,0 +1,145 @@
+# hal/ranger.py
+# HC-SR04 ranging without the busy-wait: a timer fires the trigger at a fixed
+# rate and the echo pulse is measured from edge callbacks timestamped by the
+# GPIO library (pigpio ticks, lgpio/gpiochip kernel stamps, ...), so the CPU is
+# free between pings and the width doesn't depend on Python's scheduling.
+# Readings are published with a monotonic stamp (and the time of the ping
+# they answer); anyone can take the latest one or wait for the next.
+#
+#   sonar = Ranger(hw, trig=20, echo=24, rate_hz=20).start()
+#   seq, stamp, cm = sonar.latest()           # never blocks
+#   cm = sonar.distance_cm()                  # next new reading (blocks <= 1 period)
+#   servo.set_deg(60); cm = sonar.distance_cm(since=hw.now() + 0.03)   # pinged once the servo got there
+
+import threading
+from .devices import HCSR04, SPEED_OF_SOUND_CM_S
+
+class Ranger:
+    """Same distance_cm() as HCSR04, so it drops into Robot / SweepHide.
+    rate_hz: the HC-SR04 wants ~60 ms between pings or late echoes from the
+    last one come back as ghosts, so keep it at or below ~16-20 Hz."""
+    tel = None                          # hal.telemetry.Telemetry, set by Robot
+
+    def __init__(self, hw, trig, echo, rate_hz=20, timeout_s=0.025, on_reading=None):
+        self.hw, self.trig, self.echo = hw, trig, echo
+        self.period = 1.0 / rate_hz
+        self.timeout_s = timeout_s      # max echo width that counts (0.025 s ~ 4 m)
+        self.on_reading = on_reading    # fn(seq, stamp, cm, pinged), called from the ranging thread
+        self._poll = HCSR04(hw, trig, echo, timeout_s)   # claims the pins; fallback if no edges()
+
+        self._lock = threading.Lock()
+        self._new = threading.Event()
+        self._armed = False             # ping sent, echo not measured yet
+        self._rise = None
+        self._ping_t = None             # when the armed ping was sent
+        self._stop = self._cancel = None
+        self._last_seq = 0              # what distance_cm() handed out last
+
+        # published reading
+        self.seq = 0
+        self.stamp = None               # hw.now() when it was measured
+        self.pinged = None              # hw.now() when its ping went out
+        self.cm = None                  # None = no echo within timeout_s
+
+        # stats
+        self.pings = 0
+        self.echoes = 0
+        self.timeouts = 0
+
+    def start(self):
+        self._cancel = self.hw.edges(self.echo, self._edge)
+        self._stop = self.hw.every(self.period, self._ping, name="ranger")
+        return self
+
+    def stop(self):
+        if self._stop:
+            self._stop(); self._stop = None
+        if self._cancel:
+            self._cancel(); self._cancel = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---- readers ----
+    def latest(self):
+        """(seq, stamp, cm) of the newest reading; seq 0 = none yet."""
+        with self._lock:
+            return self.seq, self.stamp, self.cm
+
+    def read(self, after=0, timeout=None, since=None):
+        """Wait for a reading newer than seq `after` whose ping went out at or
+        after `since` (older ones are skipped); (seq, stamp, cm), or
+        (None, None, None) on timeout."""
+        t_end = None if timeout is None else self.hw.now() + timeout
+        while True:
+            self._new.clear()
+            with self._lock:
+                if self.seq > after:
+                    if since is None or self.pinged >= since:
+                        return self.seq, self.stamp, self.cm
+                    after = self.seq
+            left = None if t_end is None else t_end - self.hw.now()
+            if left is not None and left <= 0:
+                return None, None, None
+            self.hw.wait(self._new, left)
+
+    def distance_cm(self, since=None):
+        # one new reading per call, like a polled ping, but without spinning.
+        # since: only a ping sent at or after this (e.g. servo move + settle)
+        # counts, so a reading isn't credited to an angle the servo just left
+        wait = 0.0 if since is None else max(0.0, since - self.hw.now())
+        seq, _, cm = self.read(self._last_seq, timeout=wait + 2 * self.period + self.timeout_s, since=since)
+        if seq is None:
+            return None
+        self._last_seq = seq
+        return cm
+
+    # ---- ranging thread / callbacks ----
+    def _ping(self):
+        if self._cancel is None:
+            t = self.hw.now()
+            self._publish(self._poll.distance_cm(), t)  # backend has no edges(): poll
+            return
+        with self._lock:
+            lost = self._armed          # last ping's echo never ended
+            lost_t = self._ping_t
+        if lost:
+            self._publish(None, lost_t)
+        with self._lock:
+            self._armed, self._rise = True, None
+            self._ping_t = self.hw.now()
+        self.pings += 1
+        self.hw.trigger(self.trig, 10)
+
+    def _edge(self, level, t):
+        with self._lock:
+            if not self._armed:
+                return
+            if level:
+                self._rise = t
+                return
+            if self._rise is None:
+                return
+            width = t - self._rise
+            pinged = self._ping_t
+        self._publish(width * SPEED_OF_SOUND_CM_S / 2.0 if width <= self.timeout_s else None, pinged)
+
+    def _publish(self, cm, pinged):
+        stamp = self.hw.now()
+        with self._lock:
+            self._armed = False
+            self.seq += 1
+            self.stamp, self.cm, self.pinged = stamp, cm, pinged
+            seq = self.seq
+            if cm is None:
+                self.timeouts += 1
+            else:
+                self.echoes += 1
+        self._new.set()
+        if self.tel:
+            self.tel.range(cm, stamp)
+        if self.on_reading:
+            self.on_reading(seq, stamp, cm, pinged)
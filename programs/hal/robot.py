@@ -0,0 +1,90 @@
+# hal/robot.py
+# The VANIS robot as one object: backend + L298 + sweep servo + HC-SR04,
+# wired the way the sweep/hide scripts wire it unless told otherwise.
+#
+#   bot = Robot(open_backend("rpi"), servo=17)
+#   bot.servo.set_deg(60); d = bot.sonar.distance_cm(); bot.motors.tank_ccw(0.7)
+#
+# bot.sonar is a Ranger (edge-timed, pings at ping_hz in the background) unless
+# ranging="poll" asks for the old busy-wait HCSR04.
+# With telemetry (or VANIS_TELEMETRY set) every reading, servo and motor
+# command is recorded; bot.tel is the recorder (None when off).
+# With ramp ("trap" / "s", or VANIS_RAMP) bot.motors is a RampedMotors
+# (motion.py) over bot.l298, and the speed goes on the IN pins when ENA/ENB
+# are tied high.
+# bot.wd (watchdog seconds, VANIS_WATCHDOG, 0.5 by default) cuts the motors
+# and servo when the loop stops calling bot.feed() (SweepHide does it every
+# step); it arms at the first feed or timed move. watchdog=0 opts out.
+
+from .base import Backend, open_backend
+from .devices import L298, Servo, HCSR04
+from .ranger import Ranger
+from .motion import RAMP, ramped
+from .watchdog import WATCHDOG, Watchdog
+from . import telemetry as _telemetry
+
+# ---- default PINS (BCM) ----
+SERVO = 17
+TRIG  = 20
+ECHO  = 24          # MUST be level-shifted to 3.3V
+LEFT  = (5, 6)      # LEFT_IN1, LEFT_IN2
+RIGHT = (13, 19)    # RIGHT_IN3, RIGHT_IN4
+
+class Robot:
+    """Pass None for a part the script does not use."""
+    def __init__(self, hw=None, servo=SERVO, trig=TRIG, echo=ECHO, left=LEFT, right=RIGHT,
+                 en=(None, None), pwm_hz=1000, timeout_s=0.025, ranging="async", ping_hz=20, telemetry=None,
+                 ramp=RAMP, watchdog=WATCHDOG):
+        self.hw = hw if isinstance(hw, Backend) else open_backend(hw or "rpi")
+        self.tel = telemetry if telemetry is not None else _telemetry.from_env(self.hw.now)
+        self.l298 = L298(self.hw, left, right, en, pwm_hz, in_pwm=bool(ramp)) if left and right else None
+        self.motors = ramped(self.l298, ramp) if self.l298 else None
+        self.servo = Servo(self.hw, servo) if servo is not None else None
+        self.sonar = None
+        if trig is not None and echo is not None:
+            if ranging == "poll":
+                self.sonar = HCSR04(self.hw, trig, echo, timeout_s)
+            else:
+                self.sonar = Ranger(self.hw, trig, echo, ping_hz, timeout_s)
+        self.wd = None
+        if watchdog:
+            self.wd = Watchdog(self.hw, self.l298, self.servo, self.motors, timeout_s=watchdog)
+        for part in (self.l298, self.servo, self.sonar, self.wd):
+            if part is not None:
+                part.tel = self.tel
+        for part in (self.l298, self.motors):
+            if part is not None:
+                part.wd = self.wd
+        if isinstance(self.sonar, Ranger):
+            self.sonar.start()
+
+    def now(self):
+        return self.hw.now()
+
+    def sleep(self, s):
+        self.hw.sleep(s)
+
+    def feed(self):
+        """Tell the watchdog (if any) the control loop is alive."""
+        if self.wd:
+            self.wd.feed()
+
+    def close(self):
+        if self.wd:
+            self.wd.close()
+            print(self.wd.report())
+        if self.motors:
+            self.motors.close()
+        if self.servo:
+            self.servo.off()
+        if isinstance(self.sonar, Ranger):
+            self.sonar.stop()
+        self.hw.close()
+        if self.tel:
+            self.tel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,346 @@
+# hal/sim.py
+# Deterministic simulated robot: a virtual L298 + tank chassis, a virtual
+# servo and a virtual HC-SR04 looking into a scripted world.
+# With realtime=False time is a virtual clock: sleep() just advances it and
+# polling the echo pin jumps to its next edge, so busy-wait echo loops
+# terminate at once and a control loop runs as fast as the CPU allows.
+# every() timers and edges() callbacks run inline, at their virtual time,
+# in whichever thread is moving the clock.
+# Same seed -> same run.
+#
+#   world = SimWorld().add(bearing=60, dist_cm=150, t0=2.0, speed_cm_s=40)
+#   bot = Robot(SimBackend(world=world))
+
+import math, random, threading, time
+from .base import Backend
+
+SPEED_OF_SOUND_CM_S = 34300.0
+
+def angle_diff(a, b):
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+# ==== World ====
+class SimObject:
+    def __init__(self, bearing, dist_cm, width_deg, t0, t1, speed_cm_s, relative):
+        self.bearing, self.dist_cm, self.width_deg = bearing, dist_cm, width_deg
+        self.t0, self.t1, self.speed_cm_s = t0, t1, speed_cm_s
+        self.relative = relative      # bearing is in the robot's frame (follows it around)
+
+    def distance(self, t):
+        # approaching (speed > 0) objects stop at 2 cm, the sensor minimum
+        return max(2.0, self.dist_cm - self.speed_cm_s * (t - self.t0))
+
+class SimWorld:
+    """Objects at world bearings (deg, 90 = robot's start heading), or
+    relative=True ones that stay at a bearing in the robot's frame."""
+    def __init__(self, max_cm=400.0, noise_cm=0.0, dropout=0.0, ghost=0.0, seed=0):
+        self.max_cm = max_cm
+        self.noise_cm = noise_cm      # gaussian range noise
+        self.dropout = dropout        # chance a ping gets no echo at all
+        self.ghost = ghost            # chance of a spurious short echo (5-60 cm)
+        self.rng = random.Random(seed)
+        self.objects = []
+
+    def add(self, bearing, dist_cm, width_deg=15.0, t0=0.0, t1=math.inf, speed_cm_s=0.0, relative=False):
+        self.objects.append(SimObject(bearing, dist_cm, width_deg, t0, t1, speed_cm_s, relative))
+        return self
+
+    def distance(self, bearing, t, heading=90.0):
+        best = None
+        for o in self.objects:
+            ob = (heading + o.bearing - 90.0) if o.relative else o.bearing
+            if o.t0 <= t < o.t1 and angle_diff(bearing, ob) <= o.width_deg / 2:
+                d = o.distance(t)
+                best = d if best is None else min(best, d)
+        if self.ghost and self.rng.random() < self.ghost:
+            return self.rng.uniform(5.0, 60.0)
+        if best is None or best > self.max_cm:
+            return None
+        if self.dropout and self.rng.random() < self.dropout:
+            return None
+        if self.noise_cm:
+            best = max(2.0, best + self.rng.gauss(0.0, self.noise_cm))
+        return best
+
+    @classmethod
+    def demo(cls, seed=0, period_s=12.0, count=200, ghost=0.0):
+        """Someone walks up to the robot, inside its sweep arc, every period_s."""
+        rng = random.Random(seed)
+        w = cls(noise_cm=0.5, dropout=0.02, ghost=ghost, seed=seed)
+        w.add(bearing=90, dist_cm=300, width_deg=360)       # room walls, all round
+        for k in range(count):
+            t0 = 1.0 + k * period_s + rng.uniform(0, 2.0)
+            w.add(bearing=rng.uniform(45, 75), dist_cm=rng.uniform(120, 200), width_deg=20,
+                  t0=t0, t1=t0 + period_s * 0.6, speed_cm_s=rng.uniform(25, 60), relative=True)
+        return w
+
+# ==== Virtual devices ====
+class VirtualL298:
+    """Reads the IN/EN pins back from the sim and reports signed wheel duty -1..1."""
+    def __init__(self, sim, in1, in2, in3, in4, ena=None, enb=None):
+        self.sim = sim
+        self.left_pins, self.right_pins = (in1, in2, ena), (in3, in4, enb)
+
+    def _level(self, pin):
+        if pin in self.sim.pwms:                        # PWM on an IN pin (L298 in_pwm)
+            return self.sim.pwms[pin][1] / 100.0
+        return self.sim.levels.get(pin, 0)
+
+    def _side(self, a, b, en):
+        direction = self._level(a) - self._level(b)
+        if en is None:
+            duty = 1.0                                  # EN tied high
+        elif en in self.sim.pwms:
+            duty = self.sim.pwms[en][1] / 100.0
+        else:
+            duty = float(self.sim.levels.get(en, 0))
+        return direction * duty
+
+    def wheels(self):
+        return self._side(*self.left_pins), self._side(*self.right_pins)
+
+class VirtualServo:
+    """Slew-limited hobby servo (SG90: ~0.1 s / 60 deg)."""
+    SLEW_DPS = 600.0
+
+    def __init__(self, sim, pin):
+        self.sim, self.pin = sim, pin
+        self.pos, self.target, self.t = 90.0, 90.0, 0.0
+
+    def command(self, pulse_us, t):
+        self.angle(t)
+        if pulse_us > 0:
+            self.target = (pulse_us - 500.0) / 2000.0 * 180.0
+
+    def angle(self, t):
+        step = self.SLEW_DPS * max(0.0, t - self.t)
+        d = self.target - self.pos
+        self.pos = self.target if abs(d) <= step else self.pos + math.copysign(step, d)
+        self.t = t
+        return self.pos
+
+class VirtualHCSR04:
+    LATENCY_S = 0.0005      # trigger -> echo rising (40 kHz burst + setup)
+    NO_ECHO_S = 0.038       # echo pulse length when nothing comes back
+
+    def __init__(self, sim, trig, echo):
+        self.sim, self.trig, self.echo = sim, trig, echo
+        self.rise = self.fall = -1.0
+        self.sent = 2                   # edges of this ping already sent to edges() callbacks
+        self.pings = 0
+        self.last_cm = None
+
+    def fire(self, t):
+        if self.rise <= t < self.fall:
+            return                                      # still busy with the last ping
+        self.pings += 1
+        d = self.sim.world.distance(self.sim.bearing(), t, self.sim.heading)
+        self.last_cm = d
+        self.rise = t + self.LATENCY_S
+        self.fall = self.rise + (self.NO_ECHO_S if d is None else 2.0 * d / SPEED_OF_SOUND_CM_S)
+        self.sent = 0
+
+    def due_edges(self, t):
+        """(level, time) of the edges up to t not sent yet."""
+        out = []
+        if self.sent == 0 and t >= self.rise:
+            out.append((1, self.rise)); self.sent = 1
+        if self.sent == 1 and t >= self.fall:
+            out.append((0, self.fall)); self.sent = 2
+        return out
+
+    def level(self, t):
+        return 1 if self.rise <= t < self.fall else 0
+
+    def next_edge(self, t):
+        if t < self.rise:
+            return self.rise
+        if t < self.fall:
+            return self.fall
+        return None
+
+# ==== Backend ====
+class SimBackend(Backend):
+    name = "sim"
+
+    TURN_DPS = 257.0        # full-duty tank-turn rate (~180 deg in 0.7 s, like TURN_180_S)
+    SPEED_CM_S = 30.0       # full-duty straight speed
+
+    def __init__(self, world=None, realtime=False, read_cost_s=5e-6, seed=0):
+        self.world = world if world is not None else SimWorld.demo(seed)
+        self.realtime = realtime
+        self.read_cost_s = read_cost_s
+        self._t = 0.0
+        self._t0 = time.monotonic()
+        self._last = 0.0
+
+        self.levels, self.pwms, self.pulses = {}, {}, {}
+        self._edge_fns = {}     # pin -> [fn(level, t)]
+        self._timers = []       # [due, period, fn] (virtual clock only)
+        self._in_timer = False
+        self._lock = threading.RLock()
+        self.motors, self.servo_model, self.sonars = None, None, []
+
+        # robot pose (world frame; heading 90 = start, + = CCW as in the scripts)
+        self.heading, self.x, self.y = 90.0, 0.0, 0.0
+        self.yaw = 0.0          # total turn since the start, unwrapped (what a gyro integrates)
+        self.motor_log = []     # (t, left, right) on every wheel change
+
+    # ---- time ----
+    def now(self):
+        with self._lock:
+            t = (time.monotonic() - self._t0) if self.realtime else self._t
+            self._integrate(t)
+            self._send_edges(t)
+            return t
+
+    def sleep(self, s):
+        if s <= 0:
+            return
+        if self.realtime:
+            time.sleep(s)
+            self.now()
+        else:
+            self._advance(self._t + s)
+
+    def _advance(self, to):
+        # virtual clock: stop at each echo edge someone listens to and each
+        # timer due before `to`, in time order, so they all see the right time
+        while True:
+            t_edge = min((e for e in (s.next_edge(self._t) for s in self.sonars if self._edge_fns.get(s.echo))
+                          if e is not None), default=math.inf)
+            tm = None if self._in_timer or not self._timers else min(self._timers, key=lambda x: x[0])
+            t_next = min(t_edge, tm[0] if tm else math.inf)
+            if t_next > to:
+                break
+            self._t = max(self._t, t_next)
+            self.now()                                  # sends the edge(s)
+            if tm is not None and tm[0] <= self._t:
+                tm[0] += tm[1]
+                self._in_timer = True
+                try:
+                    tm[2]()
+                finally:
+                    self._in_timer = False
+        self._t = max(self._t, to)
+        self.now()
+
+    def wait(self, event, timeout=None):
+        if self.realtime:
+            return event.wait(timeout)
+        deadline = math.inf if timeout is None else self._t + timeout
+        while not event.is_set() and self._t < deadline:
+            nxt = [deadline] + [tm[0] for tm in self._timers]
+            nxt += [e for e in (s.next_edge(self._t) for s in self.sonars) if e is not None]
+            nxt = min(nxt)
+            if nxt == math.inf:
+                break                                   # nothing will ever set it
+            self._advance(max(nxt, self._t + 1e-6))
+        return event.is_set()
+
+    def every(self, period_s, fn, name="every"):
+        if self.realtime:
+            return super().every(period_s, fn, name)
+        tm = [self._t, period_s, fn]
+        self._timers.append(tm)
+        return lambda: tm in self._timers and self._timers.remove(tm)
+
+    def _integrate(self, t):
+        dt = t - self._last
+        if dt <= 0:
+            return
+        self._last = t
+        if self.motors is None:
+            return
+        l, r = self.motors.wheels()
+        turn = (l - r) / 2.0 * self.TURN_DPS * dt
+        self.yaw += turn
+        self.heading = (self.heading + turn) % 360.0
+        v = (l + r) / 2.0 * self.SPEED_CM_S * dt
+        self.x += v * math.cos(math.radians(self.heading))
+        self.y += v * math.sin(math.radians(self.heading))
+
+    def bearing(self):
+        """World bearing the sonar points at (servo 90 deg = straight ahead)."""
+        a = self.servo_model.angle(self.now()) if self.servo_model else 90.0
+        return (self.heading + a - 90.0) % 360.0
+
+    # ---- pins ----
+    def setup_output(self, pin, value=0):
+        self.write(pin, value)
+
+    def setup_input(self, pin):
+        self.levels.setdefault(pin, 0)
+
+    def write(self, pin, value):
+        t = self.now()
+        old = self.levels.get(pin, 0)
+        self.levels[pin] = 1 if value else 0
+        for s in self.sonars:
+            if pin == s.trig and old and not value:     # falling edge ends the trigger pulse
+                s.fire(t)
+                if self.realtime and self._edge_fns.get(s.echo):
+                    self._wake_at(s.rise, s.fall)
+        self._log_wheels(t)
+
+    def read(self, pin):
+        for s in self.sonars:
+            if pin == s.echo:
+                if not self.realtime:
+                    # a polling loop would spin until the next echo edge: skip
+                    # towards it in steps of at most 1 ms, so the caller's
+                    # timeout still fires at the right (virtual) time
+                    nxt = s.next_edge(self._t)
+                    step = 1e-3 if nxt is None else min(1e-3, max(self.read_cost_s, nxt - self._t))
+                    self._advance(self._t + step)
+                return s.level(self.now())
+        if self.realtime:
+            self.now()
+        else:
+            self._advance(self._t + self.read_cost_s)
+        return self.levels.get(pin, 0)
+
+    # ---- edges ----
+    def edges(self, pin, fn):
+        self._edge_fns.setdefault(pin, []).append(fn)
+        return lambda: fn in self._edge_fns.get(pin, ()) and self._edge_fns[pin].remove(fn)
+
+    def _send_edges(self, t):
+        for s in self.sonars:
+            fns = self._edge_fns.get(s.echo)
+            if fns:
+                for level, te in s.due_edges(t):
+                    for fn in list(fns):
+                        fn(level, te)
+
+    def _wake_at(self, *ts):
+        # realtime: make sure edge callbacks go out on time even if nobody polls
+        for te in ts:
+            threading.Timer(max(0.0, te - self.now()), self.now).start()
+
+    def pwm(self, pin, freq_hz, duty_pct):
+        self.pwms[pin] = (freq_hz, duty_pct)
+        if self.servo_model is not None and pin == self.servo_model.pin and freq_hz == 50:
+            self.servo_model.command(duty_pct * 200.0, self.now())
+        self._log_wheels(self.now())
+
+    def servo(self, pin, pulse_us):
+        self.pulses[pin] = pulse_us
+        if self.servo_model is not None and pin == self.servo_model.pin:
+            self.servo_model.command(pulse_us, self.now())
+
+    def _log_wheels(self, t):
+        if self.motors is None:
+            return
+        w = self.motors.wheels()
+        if not self.motor_log or self.motor_log[-1][1:] != w:
+            self.motor_log.append((t,) + w)
+
+    # ---- virtual devices ----
+    def attach(self, kind, **pins):
+        if kind == "l298":
+            self.motors = VirtualL298(self, **pins)
+        elif kind == "servo":
+            self.servo_model = VirtualServo(self, pins["pin"])
+        elif kind == "hcsr04":
+            self.sonars.append(VirtualHCSR04(self, pins["trig"], pins["echo"]))
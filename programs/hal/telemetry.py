@@ -0,0 +1,259 @@
+# hal/telemetry.py
+# Flight recorder for the robot: ranging readings, servo angles, motor
+# commands, state-machine states, detections and named events go into one
+# append-only binary file of fixed-size records (a NumPy structured dtype, so
+# the file memory-maps straight into arrays for a notebook). Recording is a
+# tuple appended to a deque; a background thread batches them to disk every
+# flush_s, so the control loop never waits on the SD card.
+#
+#   VANIS_TELEMETRY=runs/ python suhide.py        # -> runs/suhide-20261018-110200.tlm
+#   log = TelemetryLog("runs/suhide-....tlm")
+#   t, cm, deg = log.ranges()                     # numpy arrays, cm NaN = no echo
+#   bot = Robot(SimBackend(world=ReplayWorld(log)))   # re-run the sweep/hide on what was seen
+#
+# Robot wires a Telemetry into its parts (devices.py record what they are
+# told to do); SweepHide records its states. telemetry_replay.py is the
+# command-line side (info / dump / sim).
+#
+# File: a 32-byte header (magic, version, record size, wall-clock start, robot
+# clock start), then RECORD_SIZE-byte records. Strings (state and event names)
+# are stored once as NAME records and referred to by code afterwards.
+
+import os, sys, math, time, struct, threading, collections
+import numpy as np
+from .sim import SimWorld
+
+TELEMETRY = os.getenv("VANIS_TELEMETRY", "")     # file, or directory ending in "/"
+
+MAGIC = b"VANISTLM"
+VERSION = 1
+HEADER = struct.Struct("<8sIIdd")               # magic, version, record size, wall t0, clock t0
+
+# record kinds
+NAME, RANGE, SERVO, MOTOR, STATE, DETECT, EVENT = range(7)
+KINDS = ("name", "range", "servo", "motor", "state", "detect", "event")
+
+RECORD = np.dtype([("t", "<f8"), ("kind", "u1"), ("pad", "u1"), ("code", "<u2"),
+                   ("a", "<f4"), ("b", "<f4"), ("c", "<f4"), ("d", "<f4")])
+# a NAME record carries its string where a..d would be
+NAME_RECORD = np.dtype({"names": ["t", "kind", "code", "text"], "formats": ["<f8", "u1", "<u2", "S16"],
+                        "offsets": [0, 8, 10, 12], "itemsize": RECORD.itemsize})
+RECORD_SIZE = RECORD.itemsize
+NAN = float("nan")
+
+def default_path(path=TELEMETRY, script=None):
+    """A directory gets <script>-<date>-<time>.tlm inside it."""
+    if path.endswith("/") or os.path.isdir(path):
+        script = script or os.path.splitext(os.path.basename(sys.argv[0] or "vanis"))[0] or "vanis"
+        path = os.path.join(path, f"{script}-{time.strftime('%Y%m%d-%H%M%S')}.tlm")
+    return path
+
+# ==== Writer ====
+class Telemetry:
+    """Thread-safe recorder. clock: the robot's (hw.now), so simulated runs
+    are stamped in simulated time."""
+    def __init__(self, path, clock=time.monotonic, flush_s=0.5, max_pending=100_000):
+        self.path = path
+        self.clock = clock
+        self.flush_s = flush_s
+        self.max_pending = max_pending
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._f = open(path, "wb")
+        self._f.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, time.time(), clock()))
+        self._q = collections.deque()
+        self._codes = {}
+        self._names_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+        # stats
+        self.written = 0
+        self.dropped = 0        # records lost because the writer fell max_pending behind
+
+    # ---- recording (any thread) ----
+    def _put(self, rec):
+        if len(self._q) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._q.append(rec)
+
+    def code(self, name):
+        c = self._codes.get(name)
+        if c is None:
+            with self._names_lock:
+                c = self._codes.get(name)
+                if c is None:
+                    c = len(self._codes)
+                    text = name.encode()[:16]
+                    self._q.append(np.array([(self.clock(), NAME, c, text)], NAME_RECORD).tobytes())
+                    self._codes[name] = c      # only after its NAME record is queued
+        return c
+
+    def range(self, cm, t=None):
+        self._put((self.clock() if t is None else t, RANGE, 0, 0, NAN if cm is None else cm, NAN, NAN, NAN))
+
+    def servo(self, deg):
+        self._put((self.clock(), SERVO, 0, 0, deg, NAN, NAN, NAN))
+
+    def motor(self, side, speed):
+        """side 0 = left, 1 = right; signed speed -100..100."""
+        self._put((self.clock(), MOTOR, 0, side, speed, NAN, NAN, NAN))
+
+    def state(self, name):
+        self._put((self.clock(), STATE, 0, self.code(name), NAN, NAN, NAN, NAN))
+
+    def detect(self, what, box, t=None):
+        x, y, w, h = box
+        self._put((self.clock() if t is None else t, DETECT, 0, self.code(what), x, y, w, h))
+
+    def event(self, name, value=NAN):
+        self._put((self.clock(), EVENT, 0, self.code(name), value, NAN, NAN, NAN))
+
+    # ---- writer thread ----
+    def _drain(self):
+        q, batch, n = self._q, [], 0
+        while q:
+            rec = q.popleft()
+            if isinstance(rec, bytes):          # NAME record, already packed
+                if batch:
+                    n += self._write(batch); batch = []
+                self._f.write(rec); n += 1
+            else:
+                batch.append(rec)
+        if batch:
+            n += self._write(batch)
+        if n:
+            self._f.flush()
+            self.written += n
+
+    def _write(self, batch):
+        self._f.write(np.array(batch, RECORD).tobytes())
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_s):
+            self._drain()
+        self._drain()
+
+    def close(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def from_env(clock=time.monotonic):
+    """Telemetry to VANIS_TELEMETRY, or None when it isn't set."""
+    return Telemetry(default_path(), clock) if TELEMETRY else None
+
+# ==== Reader ====
+class TelemetryLog:
+    """A recorded run, memory-mapped. recs is the raw record array; the
+    helpers return plain numpy columns."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, size, self.wall_t0, self.t0 = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or size != RECORD_SIZE:
+            raise ValueError(f"{path}: not a v{VERSION} telemetry file")
+        n = (os.path.getsize(path) - HEADER.size) // RECORD_SIZE     # ignore a half-written tail
+        self.recs = (np.memmap(path, RECORD, "r", HEADER.size, (n,)) if n
+                     else np.zeros(0, RECORD))
+        names = self.recs[self.recs["kind"] == NAME].view(NAME_RECORD)
+        self.names = {int(c): t.decode() for c, t in zip(names["code"], names["text"])}
+
+    def __len__(self):
+        return len(self.recs)
+
+    def kind(self, k):
+        return self.recs[self.recs["kind"] == k]
+
+    @property
+    def duration(self):
+        return float(self.recs["t"][-1] - self.t0) if len(self.recs) else 0.0
+
+    def counts(self):
+        return {KINDS[k]: int((self.recs["kind"] == k).sum()) for k in range(len(KINDS))}
+
+    def servo(self):
+        r = self.kind(SERVO)
+        return r["t"], r["a"]
+
+    def ranges(self):
+        """(t, cm, deg): cm NaN = no echo; deg = last servo command before
+        the reading (NaN before the first one)."""
+        r = self.kind(RANGE)
+        st, sdeg = self.servo()
+        i = np.searchsorted(st, r["t"], side="right") - 1
+        deg = np.where(i >= 0, sdeg[np.maximum(i, 0)] if len(sdeg) else NAN, NAN)
+        return r["t"], r["a"], deg
+
+    def motors(self):
+        """(t, left, right) after every motor command."""
+        r = self.kind(MOTOR)
+        left, right, out = 0.0, 0.0, []
+        for t, side, v in zip(r["t"], r["code"], r["a"]):
+            if side == 0:
+                left = float(v)
+            else:
+                right = float(v)
+            out.append((t, left, right))
+        arr = np.array(out, float).reshape(-1, 3)
+        return arr[:, 0], arr[:, 1], arr[:, 2]
+
+    def states(self):
+        r = self.kind(STATE)
+        return [(float(t), self.names.get(int(c), "?")) for t, c in zip(r["t"], r["code"])]
+
+    def events(self, name=None):
+        r = self.kind(EVENT)
+        out = [(float(t), self.names.get(int(c), "?"), float(v)) for t, c, v in zip(r["t"], r["code"], r["a"])]
+        return [e for e in out if e[1] == name] if name else out
+
+    def detections(self, what=None):
+        r = self.kind(DETECT)
+        out = [(float(t), self.names.get(int(c), "?"), (int(x), int(y), int(w), int(h)))
+               for t, c, x, y, w, h in zip(r["t"], r["code"], r["a"], r["b"], r["c"], r["d"])]
+        return [d for d in out if d[1] == what] if what else out
+
+# ==== Replay into the simulator ====
+class ReplayWorld(SimWorld):
+    """A SimWorld that answers pings with what the real sonar read: the most
+    recent recorded reading at (about) the same servo angle, no older than
+    max_age_s. Sim time 0 is the start of the recording. The servo angle is
+    taken relative to the robot, so a replayed run that turns differently
+    still sees what the recorded robot saw in front of it."""
+    def __init__(self, log, tol_deg=3.0, max_age_s=1.0):
+        super().__init__()
+        t, cm, deg = log.ranges()
+        ok = ~np.isnan(deg)
+        self.t, self.cm, self.deg = t[ok] - log.t0, cm[ok], deg[ok]
+        self.tol_deg, self.max_age_s = tol_deg, max_age_s
+        self.duration = log.duration
+        self.bins = {}                          # whole degree -> (times, cm)
+        for b in np.unique(np.round(self.deg)):
+            m = np.round(self.deg) == b
+            self.bins[int(b)] = (self.t[m], self.cm[m])
+
+    def distance(self, bearing, t, heading=90.0):
+        deg = (bearing - heading + 90.0) % 360.0
+        best_t, best = -math.inf, None
+        lo, hi = math.floor(deg - self.tol_deg), math.ceil(deg + self.tol_deg)
+        for b in range(lo, hi + 1):
+            col = self.bins.get(b)
+            if col is None or abs(b - deg) > self.tol_deg:
+                continue
+            i = np.searchsorted(col[0], t, side="right") - 1
+            if i >= 0 and col[0][i] > best_t:
+                best_t, best = col[0][i], col[1][i]
+        if best is None or t - best_t > self.max_age_s or math.isnan(best):
+            return None
+        return float(best)
@@ -0,0 +1,283 @@
+# hal/turn.py
+# Tank turns by angle instead of by time. TURN_180_S-style timing drifts with
+# battery voltage and floor grip, and a CW "turn back" for the same time as
+# the CCW turn doesn't land where it started. A Turner spins until a heading
+# source says the angle is done (stopping early by the learned coast), or,
+# with no sensor, for the time a learned model says the angle takes.
+#
+#   turner = make_turner(bot, turn_180_s=0.7)     # source from VANIS_IMU / VANIS_ENCODERS
+#   h0 = turner.heading()
+#   turner.turn(180)                              # + = CCW (tank_ccw), as in the scripts
+#   turner.turn_to(h0)                            # back to where it started
+#   await turner.aturn(180)                       # same, for asyncio code (cancel = stop)
+#
+# Heading sources (degrees, + = the tank_ccw direction, unwrapped):
+#   VANIS_IMU=mpu6050    gyro Z integrated at 200 Hz (I2C bus 1, pip install smbus2)
+#   VANIS_IMU=sim        the simulator's true heading
+#   VANIS_ENCODERS=L,R   one-channel wheel encoders on BCM pins L and R
+# The time model (rate and coast per direction) is learned from every turn
+# made with a heading source and kept in VANIS_TURN_MODEL (~/.vanis_turn.json),
+# so a robot that lost its sensor still turns on recent numbers; without any
+# history it starts from 180 deg per turn_180_s.
+
+import os, json, math, asyncio
+from .devices import clamp_pct
+
+TURN_MODEL = os.getenv("VANIS_TURN_MODEL", os.path.expanduser("~/.vanis_turn.json"))
+IMU = os.getenv("VANIS_IMU", "")
+IMU_SIGN = float(os.getenv("VANIS_IMU_SIGN", "1"))      # -1 if the gyro is mounted upside down
+ENCODERS = os.getenv("VANIS_ENCODERS", "")
+
+# ==== Heading sources ====
+class SimHeading:
+    """SimBackend's true yaw (a perfect gyro)."""
+    def __init__(self, hw):
+        self.hw = hw
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def heading(self):
+        self.hw.now()                   # brings the simulated pose up to date
+        return self.hw.yaw
+
+class GyroHeading:
+    """Integrates a yaw-rate reader (deg/s) on the backend's timer. The bias
+    is measured over calib_s at start(), so keep the robot still then."""
+    def __init__(self, hw, read_dps, rate_hz=200, sign=IMU_SIGN, calib_s=0.5):
+        self.hw, self.read_dps = hw, read_dps
+        self.period = 1.0 / rate_hz
+        self.sign, self.calib_s = sign, calib_s
+        self.bias = 0.0
+        self._total = 0.0
+        self._last_t = None
+        self._stop = None
+
+    def start(self):
+        n = max(1, int(self.calib_s / self.period))
+        acc = 0.0
+        for _ in range(n):
+            acc += self.read_dps()
+            self.hw.sleep(self.period)
+        self.bias = acc / n
+        self._stop = self.hw.every(self.period, self._tick, name="gyro")
+        return self
+
+    def stop(self):
+        if self._stop:
+            self._stop(); self._stop = None
+
+    def _tick(self):
+        t = self.hw.now()
+        dps = self.read_dps() - self.bias
+        if self._last_t is not None:
+            self._total += self.sign * dps * (t - self._last_t)
+        self._last_t = t
+
+    def heading(self):
+        return self._total
+
+class Mpu6050:
+    """Yaw rate from an MPU-6050 (+-250 deg/s range)."""
+    PWR_MGMT_1, GYRO_ZOUT_H = 0x6B, 0x47
+
+    def __init__(self, bus=1, addr=0x68):
+        from smbus2 import SMBus            # optional: only robots with the IMU need it
+        self.bus, self.addr = SMBus(bus), addr
+        self.bus.write_byte_data(addr, self.PWR_MGMT_1, 0)      # wake up
+
+    def __call__(self):
+        hi, lo = self.bus.read_i2c_block_data(self.addr, self.GYRO_ZOUT_H, 2)
+        raw = (hi << 8) | lo
+        return (raw - 65536 if raw & 0x8000 else raw) / 131.0
+
+class EncoderHeading:
+    """Heading from one-channel wheel encoders: ticks * wheel travel, with
+    the sign of each wheel taken from what the L298 was last told."""
+    def __init__(self, hw, motors, left_pin, right_pin, ticks_per_rev=20, wheel_cm=6.5, track_cm=13.0):
+        self.hw, self.motors = hw, motors
+        self.pins = (left_pin, right_pin)
+        self.cm_per_tick = math.pi * wheel_cm / ticks_per_rev
+        self.track_cm = track_cm
+        self.dist = [0.0, 0.0]          # signed cm per wheel
+        self._cancel = []
+
+    def start(self):
+        for i, (pin, side) in enumerate(zip(self.pins, "lr")):
+            self.hw.setup_input(pin)
+            cancel = self.hw.edges(pin, lambda level, t, i=i, side=side: self._tick(i, side, level))
+            if cancel is None:
+                raise RuntimeError(f"{self.hw.name} backend can't watch encoder edges")
+            self._cancel.append(cancel)
+        return self
+
+    def stop(self):
+        for c in self._cancel:
+            c()
+        self._cancel = []
+
+    def _tick(self, i, side, level):
+        if level:
+            cmd = self.motors.cmd[side]
+            self.dist[i] += self.cm_per_tick * (1 if cmd > 0 else -1 if cmd < 0 else 0)
+
+    def heading(self):
+        # left forward / right back is the tank_ccw direction
+        return math.degrees((self.dist[0] - self.dist[1]) / self.track_cm)
+
+# ==== Time model ====
+class TurnModel:
+    """Per direction: turn rate (deg/s while the motors run) and coast (deg
+    turned after they stop). Learned as a running mean over the first turns,
+    then a moving average (ALPHA) so it follows the battery."""
+    ALPHA = 0.3
+
+    def __init__(self, rate_dps=257.0, coast_deg=0.0, path=TURN_MODEL):
+        self.rate = {"ccw": rate_dps, "cw": rate_dps}
+        self.coast = {"ccw": coast_deg, "cw": coast_deg}
+        self.turns = {"ccw": 0, "cw": 0}
+        self.path = path
+
+    @classmethod
+    def load(cls, turn_180_s=0.7, path=TURN_MODEL):
+        m = cls(180.0 / turn_180_s, 0.0, path)
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    d = json.load(f)
+                m.rate.update(d["rate"]); m.coast.update(d["coast"]); m.turns.update(d["turns"])
+            except (OSError, ValueError, KeyError):
+                pass                    # unreadable: start from the prior
+        return m
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"rate": self.rate, "coast": self.coast, "turns": self.turns}, f)
+        os.replace(tmp, self.path)
+
+    def time_for(self, deg):
+        d = "ccw" if deg > 0 else "cw"
+        return max(0.0, abs(deg) - self.coast[d]) / self.rate[d]
+
+    def learn(self, deg_cmd, on_s, at_stop, total):
+        """A turn commanded as deg_cmd ran the motors on_s, had turned at_stop
+        degrees when they stopped and total once it came to rest."""
+        d = "ccw" if deg_cmd > 0 else "cw"
+        a = max(self.ALPHA, 1.0 / (self.turns[d] + 1))     # the first turn replaces the prior
+        if on_s > 0.05 and at_stop > 5.0:
+            self.rate[d] += a * (at_stop / on_s - self.rate[d])
+        self.coast[d] += a * (max(0.0, total - at_stop) - self.coast[d])
+        self.turns[d] += 1
+        self.save()
+
+# ==== Turner ====
+class Turner:
+    def __init__(self, bot, source=None, model=None, speed=100, poll_s=0.005, settle_s=0.15,
+                 timeout_factor=2.5):
+        self.bot, self.source = bot, source
+        self.model = model or TurnModel.load()
+        self.speed = clamp_pct(speed)
+        self.poll_s, self.settle_s = poll_s, settle_s
+        self.timeout_factor = timeout_factor
+        self._est = 0.0                 # dead-reckoned heading when there is no source
+
+        # stats
+        self.turns = 0
+        self.timeouts = 0               # gave up waiting for the source to reach the angle
+        self.last = None                # (commanded, turned, motor-on seconds) of the last turn
+
+    def heading(self):
+        return self.source.heading() if self.source else self._est
+
+    def _steps(self, deg):
+        """The turn as a generator of waits, shared by turn() and aturn()."""
+        motors, now = self.bot.motors, self.bot.now
+        spin = motors.tank_ccw if deg > 0 else motors.tank_cw
+        src = self.source
+        h0 = src.heading() if src else None
+        plan = self.model.time_for(deg)
+        coast = self.model.coast["ccw" if deg > 0 else "cw"]
+        t0 = now()
+        spin(0, self.speed)
+        try:
+            if src is None:
+                yield plan
+            else:
+                limit = t0 + self.timeout_factor * plan + 0.5
+                while abs(src.heading() - h0) < abs(deg) - coast:
+                    if now() >= limit:
+                        self.timeouts += 1
+                        break
+                    yield self.poll_s
+        finally:
+            motors.stop()
+        on_s = now() - t0
+        self.turns += 1
+        if src is None:
+            self._est += deg
+            self.last = (deg, deg, on_s)
+            return
+        at_stop = abs(src.heading() - h0)
+        yield self.settle_s
+        total = src.heading() - h0
+        self.model.learn(deg, on_s, at_stop, abs(total))
+        self.last = (deg, total, on_s)
+
+    def turn(self, deg):
+        """Blocking turn by deg (+ = CCW); returns the angle turned (estimated
+        without a source)."""
+        if abs(deg) < 1.0:
+            return 0.0
+        wd = getattr(self.bot, "wd", None)
+        if wd:
+            wd.feed()                   # before _steps() drives: lifts a trip, so the turn isn't lost
+        for s in self._steps(deg):
+            if wd:
+                wd.expect(s)
+            self.bot.sleep(s)
+        if wd:
+            wd.disarm()                 # motors stopped: nothing to cut until the loop feeds again
+        return self.last[1]
+
+    def turn_to(self, heading):
+        return self.turn(heading - self.heading())
+
+    async def aturn(self, deg):
+        if abs(deg) < 1.0:
+            return 0.0
+        steps = self._steps(deg)
+        try:
+            for s in steps:
+                await asyncio.sleep(s)
+        finally:
+            steps.close()               # cancelled mid-turn: motors stop in _steps' finally
+        return self.last[1]
+
+    async def aturn_to(self, heading):
+        return await self.aturn(heading - self.heading())
+
+    def close(self):
+        if self.source:
+            self.source.stop()
+
+def make_turner(bot, turn_180_s=0.7, imu=IMU, encoders=ENCODERS, **kw):
+    """Turner with the heading source the environment asks for (none: time model)."""
+    src = None
+    if imu == "sim":
+        src = SimHeading(bot.hw)
+    elif imu == "mpu6050":
+        src = GyroHeading(bot.hw, Mpu6050())
+    elif imu:
+        raise ValueError(f"unknown VANIS_IMU {imu!r} (mpu6050 or sim)")
+    elif encoders:
+        left, right = (int(p) for p in encoders.split(","))
+        src = EncoderHeading(bot.hw, bot.motors, left, right)
+    if src is not None:
+        src.start()
+    return Turner(bot, src, TurnModel.load(turn_180_s), **kw)
@@ -0,0 +1,114 @@
+# hal/watchdog.py
+# Deadman for the motors. The control loop feeds the watchdog every pass; if
+# a pass doesn't come within timeout_s (a distance_cm() spin, an OpenCV call
+# that hangs, a stuck await), a timer thread cuts the L298 IN/EN pins and the
+# servo pulses itself, without waiting for the loop or taking its locks, and
+# keeps the L298 refusing to drive until the loop feeds again.
+#
+#   python suhide.py                          # Robot makes one (0.5 s); SweepHide feeds it
+#   VANIS_WATCHDOG=0 python suhide.py         # opt out (or Robot(..., watchdog=0))
+#   wd = Watchdog(hw, bot.l298, bot.servo, timeout_s=0.5)
+#   wd.feed()                                 # every loop pass
+#   wd.expect(0.7)                            # about to block 0.7 s on purpose (timed move)
+#                                             # (the timed moves do this, and disarm once stopped)
+#   print(wd.report())
+#
+# Cut latency is at most timeout_s + check_s after the last feed (check_s =
+# timeout_s / 5), plus up to one interpreter switch interval (5 ms) when the
+# stuck code is a Python spin. A loop pass slower than deadline_s counts as a
+# missed deadline in the stats (and as a "wd_miss" telemetry event) even when
+# it stays under the cut.
+
+import os, collections
+
+WATCHDOG = float(os.getenv("VANIS_WATCHDOG", "0.5") or 0)   # cut after this many s without a feed; 0 = off
+DEADLINE = float(os.getenv("VANIS_WATCHDOG_DEADLINE", "0.2"))  # loop pass longer than this = missed deadline
+
+class Watchdog:
+    tel = None                          # hal.telemetry.Telemetry, set by Robot
+
+    def __init__(self, hw, l298=None, servo=None, motors=None, timeout_s=WATCHDOG or 0.5, deadline_s=DEADLINE,
+                 check_s=None, log=print):
+        self.hw, self.l298, self.servo = hw, l298, servo
+        self.motors = motors            # RampedMotors over l298, halted too so its ramp doesn't resume
+        self.timeout_s, self.deadline_s = timeout_s, deadline_s
+        self.check_s = check_s or timeout_s / 5
+        self.log = log or (lambda *a: None)
+        self._last = None               # last feed; None = not armed yet
+        self._grace = 0.0               # expect(): no cut before this
+        self.tripped = False
+        self._gaps = collections.deque(maxlen=2000)
+        self._stop = hw.every(self.check_s, self._check, name="watchdog")
+
+        # stats
+        self.feeds = 0
+        self.misses = 0                 # passes longer than deadline_s
+        self.trips = 0
+        self.worst_gap = 0.0
+        self.worst_cut_s = 0.0          # longest time from the last feed (or expect() end) to a cut
+
+    def feed(self):
+        t = self.hw.now()
+        gap = 0.0
+        if self._last is not None:
+            gap = t - max(self._last, self._grace)      # an expect()ed wait isn't the loop being late
+            self._gaps.append(gap)
+            if gap > self.worst_gap:
+                self.worst_gap = gap
+            if gap > self.deadline_s:
+                self.misses += 1
+                if self.tel:
+                    self.tel.event("wd_miss", gap)
+        self._last = t
+        self.feeds += 1
+        if self.tripped:
+            self.tripped = False
+            if self.l298 is not None:
+                self.l298.enabled = True
+            self.log(f"[WATCHDOG] fed again after {gap:.2f} s, motors allowed")
+
+    def expect(self, s):
+        """Feed, and don't cut for the next s seconds (a timed move that blocks on purpose)."""
+        self.feed()
+        self._grace = self._last + s
+
+    def disarm(self):
+        self._last = None
+
+    def _check(self):
+        last = self._last
+        if last is None or self.tripped:
+            return
+        t = self.hw.now()
+        due = max(last, self._grace) + self.timeout_s
+        if t > due:
+            self._trip(t, t - last, t - due)
+
+    def _trip(self, t, gap, late):
+        self.tripped = True
+        if self.l298 is not None:
+            self.l298.enabled = False   # first: whatever the loop does next can't drive
+            self.l298.cut()
+        if self.servo is not None:
+            self.servo.off()
+        if self.motors is not None and hasattr(self.motors, "halt"):
+            self.motors.halt()
+        self.trips += 1
+        self.worst_cut_s = max(self.worst_cut_s, late + self.timeout_s)
+        if self.tel:
+            self.tel.event("wd_trip", gap)
+        self.log(f"[WATCHDOG] no feed for {gap:.2f} s -> motors and servo cut")
+
+    def gap_pct(self, p):
+        g = sorted(self._gaps)
+        return g[min(len(g) - 1, int(p / 100.0 * len(g)))] if g else 0.0
+
+    def report(self):
+        return (f"watchdog: {self.feeds} feeds, loop p50 {1000 * self.gap_pct(50):.0f} ms "
+                f"p99 {1000 * self.gap_pct(99):.0f} ms worst {1000 * self.worst_gap:.0f} ms, "
+                f"{self.misses} over {1000 * self.deadline_s:.0f} ms, {self.trips} cuts "
+                f"(worst {1000 * self.worst_cut_s:.0f} ms after the last feed)")
+
+    def close(self):
+        if self._stop:
+            self._stop(); self._stop = None
@@ -1,75 +1,55 @@
-import RPi.GPIO as GPIO
-import time
+from hal import open_backend, L298, RampedMotors, Watchdog
+from hal.watchdog import WATCHDOG
 
 # GPIO Pin Setup (BCM)
 IN1, IN2 = 17, 27  # Left motor
 IN3, IN4 = 22, 23  # Right motor
 ENA, ENB = 18, 19  # PWM pins
+ACCEL = 300        # %/s: 0 -> 80% in ~0.3 s instead of a step
+JERK = 3000        # %/s^2, S-curve (0 = trapezoid)
 
-GPIO.setmode(GPIO.BCM)
-for pin in [IN1, IN2, IN3, IN4, ENA, ENB]:
-    GPIO.setup(pin, GPIO.OUT)
+hw = open_backend("rpi")   # VANIS_GPIO overrides
+l298 = L298(hw, (IN1, IN2), (IN3, IN4), en=(ENA, ENB), pwm_hz=100)  # 100 Hz
+motors = RampedMotors(l298, accel=ACCEL, jerk=JERK)
+# cuts the pins if the loop below stalls past a hold (VANIS_WATCHDOG, 0.5 s; 0 = off)
+wd = Watchdog(hw, l298, None, motors, timeout_s=WATCHDOG) if WATCHDOG else None
 
-# Setup PWM
-pwm_a = GPIO.PWM(ENA, 100)  # 100 Hz
-pwm_b = GPIO.PWM(ENB, 100)
-pwm_a.start(0)
-pwm_b.start(0)
-
-def set_speed(speed):
-    pwm_a.ChangeDutyCycle(speed)
-    pwm_b.ChangeDutyCycle(speed)
+def hold(s):
+    if wd:
+        wd.expect(s)
+    hw.sleep(s)
 
 def forward(speed=80):
-    GPIO.output(IN1, GPIO.HIGH)
-    GPIO.output(IN2, GPIO.LOW)
-    GPIO.output(IN3, GPIO.HIGH)
-    GPIO.output(IN4, GPIO.LOW)
-    set_speed(speed)
+    motors.drive(speed, speed)
 
 def backward(speed=80):
-    GPIO.output(IN1, GPIO.LOW)
-    GPIO.output(IN2, GPIO.HIGH)
-    GPIO.output(IN3, GPIO.LOW)
-    GPIO.output(IN4, GPIO.HIGH)
-    set_speed(speed)
+    motors.drive(-speed, -speed)
 
 def left(speed=80):
-    GPIO.output(IN1, GPIO.LOW)
-    GPIO.output(IN2, GPIO.HIGH)
-    GPIO.output(IN3, GPIO.HIGH)
-    GPIO.output(IN4, GPIO.LOW)
-    set_speed(speed)
+    motors.drive(-speed, speed)
 
 def right(speed=80):
-    GPIO.output(IN1, GPIO.HIGH)
-    GPIO.output(IN2, GPIO.LOW)
-    GPIO.output(IN3, GPIO.LOW)
-    GPIO.output(IN4, GPIO.HIGH)
-    set_speed(speed)
+    motors.drive(speed, -speed)
 
 def stop():
-    GPIO.output(IN1, GPIO.LOW)
-    GPIO.output(IN2, GPIO.LOW)
-    GPIO.output(IN3, GPIO.LOW)
-    GPIO.output(IN4, GPIO.LOW)
-    set_speed(0)
+    motors.stop()
 
 try:
     while True:
         forward()
-        time.sleep(2)
+        hold(2)
         backward()
-        time.sleep(2)
+        hold(2)
         left()
-        time.sleep(2)
+        hold(2)
         right()
-        time.sleep(2)
+        hold(2)
         stop()
-        time.sleep(2)
+        hold(2)
 except KeyboardInterrupt:
     pass
 finally:
-    pwm_a.stop()
-    pwm_b.stop()
-    GPIO.cleanup()
+    if wd:
+        wd.close()
+    motors.close()      # no ramp on the way out
+    hw.close()
@@ -0,0 +1,189 @@
+# metrics.py
+# Cheap per-stage timing for the vision loops.
+#   with stage("haar"): ...             time a block (reused timer object, ~1 us)
+#   count("frames"); gauge("fps", 21.4) counters / gauges
+# Each stage keeps a cumulative latency histogram (Prometheus buckets) and
+# the last `window` samples for rolling percentiles. serve(port) exposes it
+# all as Prometheus text on http://127.0.0.1:<port>/metrics, start_log(10)
+# prints a one-line summary every 10 s.
+# The module-level REGISTRY is what the scripts use; VANIS_METRICS=0 turns
+# timing off entirely (stage() then hands out a no-op timer).
+#
+#   from metrics import stage, count, gauge, REGISTRY
+#   REGISTRY.serve(9108); REGISTRY.start_log(10)
+
+import os, time, bisect, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS_S = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+class _Stage:
+    """Histogram + ring of recent samples for one stage. Also its own
+    context-manager timer, so timing a block allocates nothing. One stage
+    is expected to be timed from one thread at a time."""
+    __slots__ = ("name", "buckets", "counts", "sum", "n", "recent", "_i", "_t0")
+
+    def __init__(self, name, buckets, window):
+        self.name, self.buckets = name, buckets
+        self.counts = [0] * (len(buckets) + 1)     # last one is +Inf
+        self.sum, self.n = 0.0, 0
+        self.recent = [0.0] * window
+        self._i = 0
+        self._t0 = 0.0
+
+    def observe(self, s):
+        self.counts[bisect.bisect_left(self.buckets, s)] += 1
+        self.sum += s
+        self.n += 1
+        self.recent[self._i] = s
+        self._i = (self._i + 1) % len(self.recent)
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.observe(time.perf_counter() - self._t0)
+
+    def quantiles(self, qs=(0.5, 0.9, 0.99)):
+        k = min(self.n, len(self.recent))
+        if not k:
+            return [None] * len(qs)
+        vals = sorted(self.recent[:k])
+        return [vals[min(k - 1, int(q * k))] for q in qs]
+
+class _NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_NO_TIMER = _NoTimer()
+
+class Metrics:
+    def __init__(self, prefix="vanis", buckets=BUCKETS_S, window=512, enabled=True):
+        self.prefix = prefix
+        self.buckets, self.window = tuple(buckets), window
+        self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()      # only for creating entries / snapshots
+        self._server = None
+        self._log_stop = None
+        self.started = time.monotonic()
+
+    # ---- recording ----
+    def stage(self, name):
+        if not self.enabled:
+            return _NO_TIMER
+        st = self.stages.get(name)
+        if st is None:
+            with self._lock:
+                st = self.stages.setdefault(name, _Stage(name, self.buckets, self.window))
+        return st
+
+    def observe(self, name, seconds):
+        if self.enabled:
+            self.stage(name).observe(seconds)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    # ---- reading ----
+    def snapshot(self):
+        with self._lock:
+            stages = list(self.stages.values())
+            counters, gauges = dict(self.counters), dict(self.gauges)
+        out = {"uptime_s": time.monotonic() - self.started, "counters": counters, "gauges": gauges,
+               "stages": {}}
+        for st in stages:
+            p50, p90, p99 = st.quantiles()
+            out["stages"][st.name] = {"n": st.n, "sum_s": st.sum, "counts": list(st.counts),
+                                      "p50_s": p50, "p90_s": p90, "p99_s": p99}
+        return out
+
+    def prometheus(self):
+        snap, p = self.snapshot(), self.prefix
+        lines = [f"# TYPE {p}_stage_seconds histogram"]
+        for name, s in snap["stages"].items():
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), s["counts"]):
+                acc += c
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="{"+Inf" if le == float("inf") else le}"}} {acc}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {s["sum_s"]:.6f}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {s["n"]}')
+        lines.append(f"# TYPE {p}_stage_recent_seconds gauge")
+        for name, s in snap["stages"].items():
+            for q, key in (("0.5", "p50_s"), ("0.9", "p90_s"), ("0.99", "p99_s")):
+                if s[key] is not None:
+                    lines.append(f'{p}_stage_recent_seconds{{stage="{name}",quantile="{q}"}} {s[key]:.6f}')
+        for name, v in snap["counters"].items():
+            lines += [f"# TYPE {p}_{name}_total counter", f"{p}_{name}_total {v}"]
+        for name, v in snap["gauges"].items():
+            lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {v}"]
+        lines += [f"# TYPE {p}_uptime_seconds gauge", f"{p}_uptime_seconds {snap['uptime_s']:.1f}"]
+        return "\n".join(lines) + "\n"
+
+    def log_line(self):
+        """'capture 2.1/5.0ms | haar 170/220ms | ... | frames 1234 dropped 12 fps 21.3' (p50/p90)."""
+        snap = self.snapshot()
+        parts = []
+        for name, s in snap["stages"].items():
+            if s["p50_s"] is not None:
+                parts.append(f"{name} {1000 * s['p50_s']:.1f}/{1000 * s['p90_s']:.1f}ms")
+        tail = [f"{k} {v}" for k, v in snap["counters"].items()]
+        tail += [f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}" for k, v in snap["gauges"].items()]
+        return " | ".join(parts + ([" ".join(tail)] if tail else []))
+
+    # ---- exporting ----
+    def serve(self, port=9108, host="127.0.0.1"):
+        """Prometheus text on http://host:port/metrics (daemon thread). Local only by default."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *a):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server.server_address[1]
+
+    def start_log(self, every_s=10.0, log=print):
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(every_s):
+                line = self.log_line()
+                if line:
+                    log(f"[metrics] {line}")
+
+        threading.Thread(target=run, name="metrics-log", daemon=True).start()
+        self._log_stop = stop.set
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown(); self._server.server_close(); self._server = None
+        if self._log_stop is not None:
+            self._log_stop(); self._log_stop = None
+
+REGISTRY = Metrics(enabled=os.getenv("VANIS_METRICS", "1") != "0")
+stage, count, gauge = REGISTRY.stage, REGISTRY.count, REGISTRY.gauge
@@ -0,0 +1,151 @@
+# motion.py
+# Motion gate for the body/face detectors.
+# A cheap motion mask (frame differencing or MOG2 background subtraction on a
+# 160 px wide grey frame) is turned into a few regions of interest; the
+# detectors then only scan those crops and their boxes are mapped back to
+# full-frame coordinates. Every `full_every` detections (or when motion
+# covers most of the frame) a normal full-frame pass runs instead, so
+# people standing still are not lost.
+#
+#   gate = MotionGate()
+#   gate.update(frame)                      # every frame, ~free
+#   rois = gate.rois(frame, hold=last_boxes)  # when about to detect
+#   boxes = run_in_rois(detect_body_haar, frame, rois)
+
+import numpy as np
+import cv2
+import preproc
+
+class MotionGate:
+    def __init__(self, width=160, method="diff", diff_thresh=25, min_blob=0.002,
+                 pad=0.3, min_size=(128, 224), full_every=15, full_frac=0.6):
+        self.width = width
+        self.method = method                # "diff" or "mog2"
+        self.diff_thresh = diff_thresh
+        self.min_blob = min_blob            # blobs smaller than this fraction of the frame are noise
+        self.pad = pad                      # grow each ROI by this fraction per side
+        self.min_size = min_size            # (w, h) px; HOG needs >= 64x128 after its 0.6 downscale
+        self.full_every = full_every        # force a full-frame pass every N rois() calls
+        self.full_frac = full_frac          # ROIs covering more than this -> just do full frame
+
+        self._prev = None
+        self._blur = [None, None]           # blurred small frames, alternating (one is _prev)
+        self._flip = 0
+        self._acc = None                    # motion OR-ed since the last rois() call
+        self._bg = None
+        if method == "mog2":
+            self._bg = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=25, detectShadows=False)
+        self._calls = 0
+
+        # stats
+        self.full_passes = 0
+        self.roi_passes = 0
+        self.idle = 0                       # detections skipped: nothing moved
+        self.coverage = 1.0                 # fraction of frame scanned on the last call
+
+    def update(self, frame):
+        small = preproc.of(frame).scaled(self.width / frame.shape[1], gray=True)
+        i = self._flip = 1 - self._flip         # the other buffer is still _prev
+        if self._blur[i] is None or self._blur[i].shape != small.shape:
+            self._blur[i] = np.empty_like(small)
+        small = cv2.GaussianBlur(small, (5, 5), 0, dst=self._blur[i])
+
+        if self._bg is not None:
+            mask = self._bg.apply(small) > 0
+        elif self._prev is None or self._prev.shape != small.shape:
+            mask = np.zeros(small.shape, dtype=bool)
+        else:
+            mask = cv2.absdiff(small, self._prev) > self.diff_thresh
+        self._prev = small
+
+        if self._acc is None or self._acc.shape != mask.shape:
+            self._acc = mask
+        else:
+            self._acc |= mask
+        return mask
+
+    def rois(self, frame, hold=()):
+        """ROIs (x, y, w, h) to scan, [] if nothing moved, or None for a full-frame pass.
+        `hold` boxes (last detections) are always kept as ROIs."""
+        h, w = frame.shape[:2]
+        self._calls += 1
+        acc, self._acc = self._acc, None
+        if acc is None or self._calls % self.full_every == 1 or self.full_every <= 1:
+            return self._full()
+
+        s = w / float(acc.shape[1])
+        mask = cv2.dilate(acc.astype(np.uint8), np.ones((3, 3), np.uint8), iterations=2)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        min_px = self.min_blob * acc.size
+        rects = [tuple(int(v * s) for v in stats[i, :4]) for i in range(1, n)
+                 if stats[i, cv2.CC_STAT_AREA] >= min_px]
+        rects += [tuple(int(v) for v in b) for b in hold]
+        if not rects:
+            self.idle += 1
+            self.coverage = 0.0
+            return []
+
+        rects = merge_rects([self._grow(r, w, h) for r in rects])
+        covered = sum(rw * rh for (_, _, rw, rh) in rects) / float(w * h)
+        if covered > self.full_frac:
+            return self._full()
+        self.roi_passes += 1
+        self.coverage = covered
+        return rects
+
+    def _full(self):
+        self.full_passes += 1
+        self.coverage = 1.0
+        return None
+
+    def _grow(self, r, w, h):
+        x, y, rw, rh = r
+        px, py = int(rw * self.pad), int(rh * self.pad)
+        x0, y0, x1, y1 = x - px, y - py, x + rw + px, y + rh + py
+        # make it at least min_size, centred on the blob
+        mw, mh = min(w, self.min_size[0]), min(h, self.min_size[1])
+        if x1 - x0 < mw:
+            c = (x0 + x1) // 2; x0, x1 = c - mw // 2, c + mw - mw // 2
+        if y1 - y0 < mh:
+            c = (y0 + y1) // 2; y0, y1 = c - mh // 2, c + mh - mh // 2
+        # shift back inside the frame
+        dx = max(0, -x0) - max(0, x1 - w)
+        dy = max(0, -y0) - max(0, y1 - h)
+        x0, x1, y0, y1 = x0 + dx, x1 + dx, y0 + dy, y1 + dy
+        x0, y0, x1, y1 = max(0, x0), max(0, y0), min(w, x1), min(h, y1)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+def merge_rects(rects):
+    """Union overlapping rects until none overlap (a person should not be split over two crops)."""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        while rects:
+            x, y, w, h = rects.pop()
+            i = 0
+            while i < len(rects):
+                a, b, c, d = rects[i]
+                if a < x + w and x < a + c and b < y + h and y < b + d:
+                    x1, y1 = max(x + w, a + c), max(y + h, b + d)
+                    x, y = min(x, a), min(y, b)
+                    w, h = x1 - x, y1 - y
+                    rects.pop(i)
+                    merged = True
+                else:
+                    i += 1
+            out.append((x, y, w, h))
+        rects = out
+    return rects
+
+def run_in_rois(detect, frame, rois):
+    """detect(crop) on each ROI, boxes shifted back to frame coordinates.
+    rois=None runs detect on the whole frame."""
+    if rois is None:
+        return list(detect(frame))
+    out = []
+    for (x, y, w, h) in rois:
+        for (bx, by, bw, bh) in detect(frame[y:y+h, x:x+w]):
+            out.append((int(bx) + x, int(by) + y, int(bw), int(bh)))
+    return out
@@ -0,0 +1,355 @@
+# multi_cam.py
+# Several cameras, one set of detectors.
+# Each URL gets its own stream: a reconnecting FrameGrabber plus a thread
+# doing the cheap per-frame work (motion gate, detect/track cadence, body
+# fusion history). Full detections go to a shared pool of detector processes
+# (MediaPipe + Haar/HOG, or a body_detectors.py backend, loaded once per
+# worker) through one shared-memory slot per stream. When a worker is free the
+# dispatcher picks which waiting stream it serves:
+#   rr      round-robin: the stream that has waited longest
+#   motion  most motion first, plus AGE_WEIGHT per second waited so quiet
+#           streams still get their turn
+# A stream never has more than one detection queued, so a slow stream (big
+# frames, constant motion) can't crowd the queue and a dead one (no frames)
+# queues nothing; the others keep their share of the workers. A worker that
+# dies is restarted, and the stream whose detection it held gets its slot back.
+# Per stream: FPS, detections/s, end-to-end latency (frame decoded -> boxes),
+# queue wait, drops and reconnects, as a log line every LOG_S and in the
+# metrics registry (METRICS_PORT).
+#
+#   python multi_cam.py http://phone1:8080/video http://phone2:8080/video
+#   IP_CAM_URLS=url1,url2 MULTI_POLICY=motion python multi_cam.py
+
+import os, sys, math, time, queue, signal, threading, argparse
+import multiprocessing as mproc
+from collections import deque
+import numpy as np
+import cv2
+
+import face_body_detect as fbd
+import body_detectors
+from capture import FrameGrabber, RECONNECT_DELAY
+from cadence import DetectScheduler
+from motion import MotionGate, run_in_rois
+from shm_ring import FrameRing
+from metrics import REGISTRY, count, gauge
+from display import Display
+
+# ==== CONFIG ====
+URLS = [u for u in os.getenv("IP_CAM_URLS", "").split(",") if u]
+WORKERS = int(os.getenv("MULTI_WORKERS", "0"))       # 0 = one per core but one, at most one per stream
+POLICY = os.getenv("MULTI_POLICY", "rr")             # rr | motion
+AGE_WEIGHT = 1.0            # motion policy: 1 s of waiting counts like a fully moving frame
+DETECT_TIMEOUT = 5.0        # a detection this late is given up on; the stream keeps tracking
+LOG_S = 10
+TILE_W = 480                # width of each camera in the preview mosaic
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# ==== Detector workers ====
+def detect_worker(wid, ring_name, slots, req_q, res_q, body):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)       # Ctrl+C is for the parent; it stops us via req_q
+    fbd.init_detectors(("face", "haar", "hog") if body == "haarhog" else ("face",))
+    det = None if body == "haarhog" else body_detectors.get(body)
+    ring = FrameRing.attach(ring_name, slots)
+    try:
+        while True:
+            msg = req_q.get()
+            if msg is None:
+                break
+            slot, seq, shape, rois = msg
+            frame = ring.view(slot, shape)
+            t0 = time.perf_counter()
+            faces = run_in_rois(fbd.detect_faces, frame, rois)
+            if det is None:
+                # raw Haar / HOG boxes: fusion needs the stream's history, so it runs in the stream
+                w = shape[1]
+                bodies = (run_in_rois(lambda c: fbd.detect_haar(c, full_w=w), frame, rois),
+                          run_in_rois(fbd.detect_hog, frame, rois))
+            else:
+                bodies = det.detect(frame, rois)
+            res_q.put((wid, slot, seq, faces, bodies, time.perf_counter() - t0))
+    finally:
+        ring.close()
+
+class Dispatcher:
+    """Hands waiting detections to free workers in policy order. req_qs: one
+    request queue per worker, so it knows which worker holds which slot."""
+    def __init__(self, req_qs, policy=POLICY):
+        if policy not in ("rr", "motion"):
+            raise ValueError(f"unknown policy {policy!r} (rr or motion)")
+        self.req_qs, self.policy = list(req_qs), policy
+        self.free = list(range(len(self.req_qs)))   # idle worker ids
+        self.busy = {}              # worker id -> (slot, seq) it was handed
+        self.waiting = {}           # slot -> (t_submitted, motion, msg)
+        self._lock = threading.Lock()
+
+    def submit(self, slot, msg, motion=0.0):
+        with self._lock:
+            self.waiting[slot] = (time.monotonic(), motion, msg)
+            self._pump()
+
+    def done(self, wid, slot, seq):
+        with self._lock:
+            if self.busy.get(wid) != (slot, seq):
+                return              # sent before that worker was declared dead
+            del self.busy[wid]
+            self.free.append(wid)
+            self._pump()
+
+    def lost(self, wid, req_q):
+        """Worker wid died and was replaced (new request queue req_q); returns
+        the (slot, seq) it held, or None."""
+        with self._lock:
+            held = self.busy.pop(wid, None)
+            self.req_qs[wid] = req_q
+            if wid not in self.free:
+                self.free.append(wid)
+            self._pump()
+            return held
+
+    def _pump(self):
+        now = time.monotonic()
+        while self.free and self.waiting:
+            if self.policy == "motion":
+                slot = max(self.waiting, key=lambda s: self.waiting[s][1] + AGE_WEIGHT * (now - self.waiting[s][0]))
+            else:
+                slot = min(self.waiting, key=lambda s: self.waiting[s][0])
+            wid = self.free.pop(0)
+            msg = self.waiting.pop(slot)[2]
+            self.busy[wid] = (slot, msg[1])
+            self.req_qs[wid].put(msg)
+
+# ==== Streams ====
+class Stream:
+    def __init__(self, idx, url, ring, dispatcher, name=None):
+        self.idx, self.url = idx, url
+        self.name = name or f"cam{idx}"
+        self.ring, self.dispatcher = ring, dispatcher
+        self.grab = FrameGrabber(url)
+        self.gate = MotionGate() if fbd.MOTION_GATE else None
+        self.sched = DetectScheduler(interval=fbd.DETECT_EVERY, adaptive=fbd.ADAPTIVE_CADENCE)
+        self.history = fbd.BodyHistory()    # this stream's body fusion history
+        self.boxes = ([], [])
+
+        self._seq = 0
+        self._inflight = None               # seq of the detection out with a worker
+        self._result = None
+        self._done = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.latest = None                  # newest annotated frame, for the preview
+
+        # stats
+        self.frames = 0
+        self.detections = 0
+        self.timeouts = 0
+        self.fps = 0.0
+        self.e2e = deque(maxlen=256)        # s, frame decoded -> boxes
+        self.wait = deque(maxlen=256)       # s, queued for a worker
+        self._last = (0, 0)
+
+    # ---- detection through the worker pool ----
+    def _detect(self, frame):
+        faces, bodies = self.boxes
+        rois = self.gate.rois(frame, hold=faces + bodies) if self.gate else None
+        if rois == []:
+            return [], []                   # nothing moved, nothing held
+        if self._inflight is not None:
+            return self.boxes               # a late worker still has our slot
+        self._seq += 1
+        shape = self.ring.write(self.idx, frame)
+        self._done.clear()
+        self._inflight = self._seq
+        motion = self.gate.coverage if self.gate else 1.0
+        t0 = time.monotonic()
+        self.dispatcher.submit(self.idx, (self.idx, self._seq, shape, rois), motion)
+        end = t0 + DETECT_TIMEOUT
+        while not self._done.wait(0.1):
+            if self._stop.is_set():
+                return self.boxes
+            if time.monotonic() >= end:
+                self.timeouts += 1
+                count(f"{self.name}_detect_timeouts")
+                return self.boxes
+        if self._result is None:
+            return self.boxes               # the worker died with it
+        faces, bodies, run_s = self._result
+        wait = max(0.0, time.monotonic() - t0 - run_s)
+        self.wait.append(wait)
+        REGISTRY.observe(f"{self.name}_wait", wait)
+        if isinstance(bodies, tuple):
+            bodies = fbd.fuse_bodies(frame.shape, *bodies, history=self.history)
+        return faces, bodies
+
+    def result(self, seq, faces, bodies, run_s):
+        """From the result thread."""
+        if seq != self._inflight:
+            return
+        self._result = (faces, bodies, run_s)
+        self._inflight = None
+        self._done.set()
+
+    def abandon(self, seq):
+        """The worker holding detection seq died: free the slot, try again next time."""
+        if seq != self._inflight:
+            return
+        self._result = None
+        self._inflight = None
+        self._done.set()
+
+    # ---- per-stream loop (own thread) ----
+    def run(self, stop):
+        self._stop = stop
+        self.grab.start()
+        last = time.monotonic()
+        try:
+            while not stop.is_set():
+                seq, frame = self.grab.read(timeout=RECONNECT_DELAY)
+                gauge(f"{self.name}_connected", int(self.grab.connected))
+                if frame is None:
+                    continue
+                stamp = self.grab.stamp
+                if self.gate:
+                    self.gate.update(frame)
+                self.boxes, detected = self.sched.update(frame, self._detect)
+                now = time.monotonic()
+                self.e2e.append(now - stamp)
+                REGISTRY.observe(f"{self.name}_e2e", now - stamp)
+                self.frames += 1
+                self.detections += detected
+                dt = max(1e-6, now - last); last = now
+                self.fps = 0.9 * self.fps + 0.1 / dt if self.fps else 1.0 / dt
+                gauge(f"{self.name}_fps", round(self.fps, 1)); gauge(f"{self.name}_dropped", self.grab.dropped)
+
+                fbd.draw(frame, *self.boxes, self.fps, self.grab.dropped,
+                         note=f"{self.name} {self.sched.reason}")
+                with self._lock:
+                    self.latest = frame
+        finally:
+            self.grab.stop()
+
+    def take(self):
+        with self._lock:
+            frame, self.latest = self.latest, None
+        return frame
+
+    def report(self, dt):
+        frames, dets = self.frames - self._last[0], self.detections - self._last[1]
+        self._last = (self.frames, self.detections)
+        ms = lambda xs: "-" if not xs else "/".join(f"{1000 * v:.0f}" for v in np.percentile(xs, [50, 90]))
+        state = "up" if self.grab.connected else self.grab.health().upper()
+        return (f"{self.name} {state} {frames / dt:.1f} fps {dets / dt:.1f} det/s | e2e {ms(self.e2e)} ms "
+                f"wait {ms(self.wait)} ms | dropped {self.grab.dropped} reconnects {self.grab.reconnects}"
+                + (f" timeouts {self.timeouts}" if self.timeouts else ""))
+
+def route_results(res_q, streams, dispatcher, stop):
+    while not stop.is_set():
+        try:
+            wid, slot, seq, faces, bodies, run_s = res_q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        dispatcher.done(wid, slot, seq)
+        streams[slot].result(seq, faces, bodies, run_s)
+
+def mosaic(tiles, cols):
+    h = max(t.shape[0] for t in tiles)
+    rows = []
+    for r in range(0, len(tiles), cols):
+        row = [cv2.copyMakeBorder(t, 0, h - t.shape[0], 0, 0, cv2.BORDER_CONSTANT) for t in tiles[r:r + cols]]
+        row += [np.zeros_like(row[0])] * (cols - len(row))
+        rows.append(np.hstack(row))
+    return np.vstack(rows)
+
+# ==== Main ====
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Person detection on several cameras with shared detectors")
+    ap.add_argument("urls", nargs="*", default=URLS, help="camera URLs (default: IP_CAM_URLS)")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--policy", choices=("rr", "motion"), default=POLICY)
+    ap.add_argument("--log-s", type=float, default=LOG_S)
+    args = ap.parse_args(argv)
+    if not args.urls:
+        ap.error("no camera URLs (arguments or IP_CAM_URLS=url1,url2)")
+    workers = args.workers or max(1, (os.cpu_count() or 2) - 1)
+    workers = min(workers, len(args.urls))
+    if METRICS_PORT:
+        REGISTRY.serve(METRICS_PORT)
+
+    ctx = mproc.get_context("spawn")       # MediaPipe does not survive fork
+    ring = FrameRing(slots=len(args.urls))
+    res_q = ctx.Queue()
+
+    def spawn(wid):
+        req_q = ctx.Queue()
+        p = ctx.Process(target=detect_worker, args=(wid, ring.name, len(args.urls), req_q, res_q, fbd.BODY_DETECTOR),
+                        daemon=True)
+        p.start()
+        return p, req_q
+
+    procs, req_qs = map(list, zip(*(spawn(wid) for wid in range(workers))))
+    dispatcher = Dispatcher(req_qs, args.policy)
+    streams = [Stream(i, url, ring, dispatcher) for i, url in enumerate(args.urls)]
+    stop = threading.Event()
+    threads = [threading.Thread(target=route_results, args=(res_q, streams, dispatcher, stop), daemon=True)]
+    threads += [threading.Thread(target=s.run, args=(stop,), name=s.name, daemon=True) for s in streams]
+    for t in threads:
+        t.start()
+    print(f"{len(streams)} streams, {workers} detector workers, policy {args.policy}")
+
+    disp = Display("Multi-camera (q=quit)")
+    cols = math.ceil(math.sqrt(len(streams)))
+    tiles = [None] * len(streams)
+    next_log = last_log = next_check = time.monotonic()
+    next_log += args.log_s
+    try:
+        while True:
+            fresh = False
+            for i, s in enumerate(streams):
+                f = s.take()
+                if f is not None:
+                    tiles[i] = cv2.resize(f, (TILE_W, f.shape[0] * TILE_W // f.shape[1]), interpolation=cv2.INTER_AREA)
+                    fresh = True
+            key = -1
+            if fresh and any(t is not None for t in tiles):
+                blank = np.zeros_like(next(t for t in tiles if t is not None))
+                key = disp.show(mosaic([t if t is not None else blank for t in tiles], cols))
+            else:
+                key = disp.idle()
+                time.sleep(0.01)
+            if key == ord('q'):
+                break
+            now = time.monotonic()
+            if now >= next_check:
+                for wid, p in enumerate(procs):
+                    if p.is_alive():
+                        continue
+                    print(f"[multi] detector worker {wid} died (exit code {p.exitcode}), restarting it")
+                    count("detector_restarts")
+                    procs[wid], req_qs[wid] = spawn(wid)
+                    held = dispatcher.lost(wid, req_qs[wid])
+                    if held:
+                        streams[held[0]].abandon(held[1])
+                next_check = now + 1.0
+            if args.log_s and now >= next_log:
+                for s in streams:
+                    print(f"[multi] {s.report(now - last_log)}")
+                next_log, last_log = now + args.log_s, now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for t in threads:
+            t.join(timeout=DETECT_TIMEOUT + 1.0)
+        for q in req_qs:
+            q.put(None)
+        for p in procs:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+        ring.close()
+        disp.close()
+        REGISTRY.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
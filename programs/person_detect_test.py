@@ -1,21 +1,23 @@
 import os, time, cv2, mediapipe as mp
+from capture import RECONNECT_DELAY
+from frame_bus import open_frames, drawable
+from cadence import DetectScheduler
+from motion import MotionGate, run_in_rois
+import preproc
+import body_detectors
+from metrics import REGISTRY, stage, count, gauge
+from display import Display
 
 # ---- Settings ----
 URL = os.getenv("IP_CAM_URL", "http://127.0.0.1:8080/video")
 W, H = 640, 480
-RECONNECT_DELAY = 1.0
 USE_HOG = False            # set True to also try HOG people detector (slower but can help)
-
-# ---- Camera helper ----
-def open_cap():
-    cap = cv2.VideoCapture(URL)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, W)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, H)
-    return cap
-
-cap = open_cap()
-last = time.time()
-fps = 0.0
+BODY_DETECTOR = body_detectors.BODY_DETECTOR or "haar"   # or haarhog / dnn / ort (see body_detectors.py)
+DETECT_EVERY = 5           # full detection every Nth frame, track in between (1 = every frame)
+ADAPTIVE_CADENCE = True    # let DETECT_EVERY grow/shrink with tracking quality
+MOTION_GATE = True         # only scan regions that moved (plus a periodic full-frame pass)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))   # >0: Prometheus text on 127.0.0.1:PORT/metrics
+METRICS_LOG_S = 10         # per-stage timing log line every N s (0 = off)
 
 # ---- Mediapipe Face ----
 mp_face = mp.solutions.face_detection
@@ -26,14 +28,15 @@ casc_dir = cv2.data.haarcascades
 upper_cascade = cv2.CascadeClassifier(os.path.join(casc_dir, "haarcascade_upperbody.xml"))
 full_cascade  = cv2.CascadeClassifier(os.path.join(casc_dir, "haarcascade_fullbody.xml"))
 
-# ---- Optional HOG people detector ----
-if USE_HOG:
-    hog = cv2.HOGDescriptor()
-    hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+# ---- Optional HOG people detector (only run when USE_HOG; replay_bench.py always times it) ----
+hog = cv2.HOGDescriptor()
+hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
 
 def detect_face(frame_bgr):
-    rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-    res = fd.process(rgb)
+    with stage("cvtcolor"):
+        rgb = preproc.of(frame_bgr).rgb()
+    with stage("mediapipe"):
+        res = fd.process(rgb)
     boxes = []
     if res.detections:
         h, w = frame_bgr.shape[:2]
@@ -46,10 +49,12 @@ def detect_face(frame_bgr):
 
 def detect_body_haar(frame_bgr):
     # Haar works on grayscale; scale down a bit for speed
-    gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+    with stage("cvtcolor"):
+        gray = preproc.of(frame_bgr).gray()
     # tuning: scaleFactor=1.05..1.2, minNeighbors=3..5
-    upper = upper_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=3, minSize=(60, 60))
-    full  = full_cascade.detectMultiScale(gray, scaleFactor=1.05, minNeighbors=3, minSize=(60, 120))
+    with stage("haar"):
+        upper = upper_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=3, minSize=(60, 60))
+        full  = full_cascade.detectMultiScale(gray, scaleFactor=1.05, minNeighbors=3, minSize=(60, 120))
     boxes = []
     for (x,y,w,h) in list(upper) + list(full):
         boxes.append((x,y,w,h))
@@ -58,48 +63,90 @@ def detect_body_haar(frame_bgr):
 def detect_body_hog(frame_bgr):
     # Downscale for speed
     scale = 0.75
-    small = cv2.resize(frame_bgr, (0,0), fx=scale, fy=scale)
-    rects, weights = hog.detectMultiScale(small, winStride=(8,8), padding=(8,8), scale=1.05)
+    small = preproc.of(frame_bgr).scaled(scale)
+    with stage("hog"):
+        rects, weights = hog.detectMultiScale(small, winStride=(8,8), padding=(8,8), scale=1.05)
     # Map back to original scale
     boxes = []
     for (x,y,w,h) in rects:
         boxes.append((int(x/scale), int(y/scale), int(w/scale), int(h/scale)))
     return boxes
 
-while True:
-    if not cap.isOpened():
-        cap.release(); cap = open_cap(); time.sleep(RECONNECT_DELAY)
-
-    ok, frame = cap.read()
-    if not ok or frame is None:
-        cap.release(); cap = open_cap(); time.sleep(RECONNECT_DELAY); continue
-
-    # --- Run detectors ---
-    face_boxes = detect_face(frame)
-    body_boxes = detect_body_haar(frame)
+def detect_all(frame, rois=None):
+    # rois=None scans the whole frame; otherwise only the motion crops
+    face_boxes = run_in_rois(detect_face, frame, rois)
+    if BODY_DETECTOR != "haar":
+        with stage("body_" + BODY_DETECTOR):
+            return face_boxes, body_detectors.get(BODY_DETECTOR).detect(frame, rois)
+    body_boxes = run_in_rois(detect_body_haar, frame, rois)
     if USE_HOG:
-        body_boxes += detect_body_hog(frame)
-
-    person_present = (len(face_boxes) > 0) or (len(body_boxes) > 0)
-
-    # --- Draw ---
-    for (x,y,w,h) in face_boxes:
-        cv2.rectangle(frame, (x,y), (x+w,y+h), (0,255,255), 2)
-    for (x,y,w,h) in body_boxes:
-        cv2.rectangle(frame, (x,y), (x+w,y+h), (0,200,0), 2)
-
-    # --- FPS/UI ---
-    now = time.time()
-    dt = max(1e-6, now - last); inst = 1.0/dt
-    fps = 0.9*fps + 0.1*inst if fps>0 else inst
-    last = now
-    label = "PERSON" if person_present else "NO PERSON"
-    cv2.putText(frame, f"{label} | FPS: {fps:.1f}", (10,22),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0) if person_present else (0,0,255), 2, cv2.LINE_AA)
-
-    cv2.imshow("Person detection (q=quit)", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+        body_boxes += run_in_rois(detect_body_hog, frame, rois)
+    return face_boxes, body_boxes
+
+def main():
+    last = time.time()
+    fps = 0.0
+    if METRICS_PORT:
+        REGISTRY.serve(METRICS_PORT)
+    if METRICS_LOG_S:
+        REGISTRY.start_log(METRICS_LOG_S)
+    grab = open_frames(URL, W, H).start()
+    disp = Display("Person detection (q=quit)")
+    sched = DetectScheduler(interval=DETECT_EVERY, adaptive=ADAPTIVE_CADENCE)
+    gate = MotionGate() if MOTION_GATE else None
+    face_boxes, body_boxes = [], []
+
+    def detect_gated(f):
+        rois = gate.rois(f, hold=face_boxes + body_boxes) if gate else None
+        return detect_all(f, rois)
+
+    try:
+        while True:
+            with stage("capture"):          # waiting for the grabber's next frame
+                seq, frame = grab.read(timeout=RECONNECT_DELAY)
+            gauge("dropped", grab.dropped); gauge("reconnects", grab.reconnects)
+            if frame is None:
+                count("no_frame")
+                if disp.idle() == ord('q'):
+                    break
+                continue
+
+            # --- Run detectors (or track between detections) ---
+            with stage("detect"):           # motion gate + detect or track
+                if gate:
+                    gate.update(frame)
+                (face_boxes, body_boxes), detected = sched.update(frame, detect_gated)
+            count("frames"); count("detections" if detected else "tracked")
+
+            person_present = (len(face_boxes) > 0) or (len(body_boxes) > 0)
+
+            # --- Draw ---
+            t_draw = time.perf_counter()
+            frame = drawable(frame)
+            for (x,y,w,h) in face_boxes:
+                cv2.rectangle(frame, (x,y), (x+w,y+h), (0,255,255), 2)
+            for (x,y,w,h) in body_boxes:
+                cv2.rectangle(frame, (x,y), (x+w,y+h), (0,200,0), 2)
+
+            # --- FPS/UI ---
+            now = time.time()
+            dt = max(1e-6, now - last); inst = 1.0/dt
+            fps = 0.9*fps + 0.1*inst if fps>0 else inst
+            last = now
+            gauge("fps", fps)
+            label = "PERSON" if person_present else "NO PERSON"
+            cv2.putText(frame, f"{label} | {sched.reason} 1/{sched.interval} | FPS: {fps:.1f} | dropped: {grab.dropped}", (10,22),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0) if person_present else (0,0,255), 2, cv2.LINE_AA)
+            REGISTRY.observe("draw", time.perf_counter() - t_draw)
+
+            with stage("imshow"):
+                key = disp.show(frame)
+            if key == ord('q'):
+                break
+    finally:
+        grab.stop()
+        REGISTRY.close()
+        disp.close()
+
+if __name__ == "__main__":
+    main()
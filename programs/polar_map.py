@@ -0,0 +1,102 @@
+# polar_map.py
+# Angle-binned distance map for the radar sweep (ultra_servo.py).
+# One slot per bin in a few preallocated NumPy arrays: last distance, when it
+# was measured, a confidence that decays with age (half_life_s), and the
+# approach speed seen between the last two readings. Decay is computed from
+# the stamps when asked, so an update is O(1) and nothing ticks in between.
+#
+# next_angle() replaces blind STEP_DEG stepping: it picks the bin that most
+# needs a look (stale, never seen, close, approaching, or just changed),
+# discounted by how far the servo has to travel to get there.
+#
+#   pmap = PolarMap(20, 160, bin_deg=5)
+#   pmap.update(angle, cm, t)
+#   angle = pmap.next_angle(t, angle)
+#   free_deg, free_cm = pmap.free_angle(t)
+
+import numpy as np
+
+class PolarMap:
+    def __init__(self, min_deg=20, max_deg=160, bin_deg=5, max_cm=400.0, half_life_s=2.0,
+                 revisit_s=1.5, near_cm=150.0, travel_deg=120.0):
+        self.min_deg, self.bin_deg = min_deg, bin_deg
+        self.n = int((max_deg - min_deg) // bin_deg) + 1
+        self.max_cm = max_cm
+        self.half_life_s = half_life_s
+        self.revisit_s = revisit_s      # a bin this old is "due" (about one full sweep)
+        self.near_cm = near_cm          # closer than this gets looked at more often
+        self.travel_deg = travel_deg    # servo travel that halves a bin's priority
+
+        self.angles = min_deg + bin_deg * np.arange(self.n, dtype=np.float32)
+        self.dist = np.full(self.n, max_cm, dtype=np.float32)        # cm; no echo = max_cm
+        self.stamp = np.full(self.n, -np.inf)                         # robot clock, s
+        self.conf = np.zeros(self.n, dtype=np.float32)                # at `stamp`, 0..1
+        self.speed = np.zeros(self.n, dtype=np.float32)               # cm/s, + = approaching
+
+    def bin(self, deg):
+        return int(np.clip(round((deg - self.min_deg) / self.bin_deg), 0, self.n - 1))
+
+    def update(self, deg, cm, t):
+        """One reading at servo angle deg; cm None = no echo (free out to max_cm)."""
+        i = self.bin(deg)
+        d = self.max_cm if cm is None else min(float(cm), self.max_cm)
+        c = self.confidence(t)[i]
+        if np.isfinite(self.stamp[i]):
+            dt = t - self.stamp[i]
+            if dt > 0:
+                self.speed[i] = (self.dist[i] - d) / dt
+            # agrees with what we had -> more sure; a jump -> start over, unsure
+            same = abs(d - self.dist[i]) <= max(5.0, 0.1 * d)
+            c = min(1.0, c + 0.5) if same else 0.3
+        else:
+            c = 0.5
+        self.dist[i], self.stamp[i], self.conf[i] = d, t, c
+
+    def confidence(self, t):
+        age = t - self.stamp
+        return np.where(np.isfinite(age), self.conf * 0.5 ** (np.maximum(age, 0.0) / self.half_life_s), 0.0)
+
+    def priority(self, t):
+        """Per-bin need for a look: staleness, boosted for close / approaching /
+        unsure bins. Unseen bins come first."""
+        age = np.minimum(t - self.stamp, 10.0 * self.revisit_s)     # unseen = very stale
+        near = np.clip((self.near_cm - self.dist) / self.near_cm, 0.0, 1.0)
+        approach = np.clip(self.speed / 50.0, 0.0, 2.0)
+        unsure = 1.0 - self.confidence(t)
+        return age / self.revisit_s * (1.0 + 2.0 * near + approach + unsure)
+
+    def next_angle(self, t, current):
+        p = self.priority(t) / (1.0 + np.abs(self.angles - current) / self.travel_deg)
+        i = self.bin(current)
+        p[i] *= 0.5                     # don't sit on one bin unless it really needs it
+        return int(self.angles[int(np.argmax(p))])
+
+    def nearest(self, t, min_conf=0.2):
+        """(deg, cm) of the closest bin we're still reasonably sure about, or None."""
+        ok = self.confidence(t) >= min_conf
+        if not ok.any():
+            return None
+        d = np.where(ok, self.dist, np.inf)
+        i = int(np.argmin(d))
+        return int(self.angles[i]), float(d[i])
+
+    def free_angle(self, t, span_bins=3):
+        """Centre of the widest-open stretch: (deg, cm) maximising the smallest
+        distance over span_bins neighbouring bins; unsure bins count as half."""
+        d = self.dist * (0.5 + 0.5 * self.confidence(t))
+        k = max(1, min(span_bins, self.n))
+        windows = np.lib.stride_tricks.sliding_window_view(d, k).min(axis=1)
+        j = int(np.argmax(windows))
+        return int(self.angles[j + k // 2]), float(windows[j])
+
+    def row(self, width_cm=150):
+        """One text line, a char per bin: '#' close .. ' ' far, '?' never seen."""
+        shades = " .:-=+*#"
+        out = []
+        for i in range(self.n):
+            if not np.isfinite(self.stamp[i]):
+                out.append("?")
+                continue
+            x = 1.0 - min(self.dist[i], width_cm) / width_cm
+            out.append(shades[min(len(shades) - 1, int(x * len(shades)))])
+        return "".join(out)
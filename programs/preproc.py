@@ -0,0 +1,138 @@
+# preproc.py
+# Derived images of the current frame, each computed once and only if asked.
+# The motion gate, the detect/track scheduler and the detectors all want some
+# mix of grey, RGB and downscaled copies of the same frame; before this each
+# of them made its own. Now they ask preproc.of(frame):
+#
+#   v = preproc.of(frame)
+#   v.gray()                    # cvtColor once per frame
+#   v.rgb()                     # for MediaPipe
+#   v.scaled(0.25, gray=True)   # a level of the resolution pyramid (INTER_AREA)
+#
+# A new frame object starts a new set; passing a crop of the current frame
+# (run_in_rois hands detectors frame[y:y+h, x:x+w]) returns the same region
+# cut out of the full-frame images, so motion ROIs cost no extra conversions.
+# Output buffers are allocated once per frame size and reused: two per image
+# kind, alternating, so the previous frame's images (the tracker and motion
+# check keep them) stay valid for one more frame. Don't keep them longer, and
+# don't draw on them. Each thread has its own cache (multi_cam.py runs one
+# loop per camera thread).
+
+import threading
+import numpy as np
+import cv2
+
+class FrameViews:
+    def __init__(self):
+        self.frame = None
+        self.frames = 0
+        self._bufs = {}             # key -> [buf, buf], alternated per frame
+        self._done = {}             # key -> this frame's image
+
+        # stats
+        self.computed = 0
+        self.reused = 0
+
+    def reset(self, frame):
+        self.frame = frame
+        self.frames += 1
+        self._done.clear()
+        return self
+
+    def _buf(self, key, shape):
+        pair = self._bufs.get(key)
+        if pair is None or pair[0].shape != shape:
+            pair = self._bufs[key] = [np.empty(shape, np.uint8), np.empty(shape, np.uint8)]
+        return pair[self.frames & 1]
+
+    def _get(self, key, make):
+        img = self._done.get(key)
+        if img is None:
+            img = self._done[key] = make()
+            self.computed += 1
+        else:
+            self.reused += 1
+        return img
+
+    # ---- images ----
+    def gray(self):
+        f = self.frame
+        if f.ndim == 2:
+            return f
+        return self._get("gray", lambda: cv2.cvtColor(f, cv2.COLOR_BGR2GRAY, dst=self._buf("gray", f.shape[:2])))
+
+    def rgb(self):
+        f = self.frame
+        return self._get("rgb", lambda: cv2.cvtColor(f, cv2.COLOR_BGR2RGB, dst=self._buf("rgb", f.shape)))
+
+    def scaled(self, scale, gray=False):
+        """Frame (or its grey version) resized by scale; scale 1 is the frame itself."""
+        src = self.gray() if gray else self.frame
+        if scale == 1:
+            return src
+        h, w = src.shape[:2]
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        key = ("gray" if gray else "bgr", size)
+        return self._get(key, lambda: cv2.resize(src, size, dst=self._buf(key, (size[1], size[0]) + src.shape[2:]),
+                                                 interpolation=cv2.INTER_AREA))
+
+    def crop(self, x, y, w, h):
+        return CropViews(self, x, y, w, h)
+
+class CropViews:
+    """The same images for a region of the current frame, cut from the full ones."""
+    def __init__(self, parent, x, y, w, h):
+        self.parent, self.roi = parent, (x, y, w, h)
+        self.frame = parent.frame[y:y+h, x:x+w]
+
+    def _cut(self, img, s=1.0):
+        x, y, w, h = self.roi
+        return img[int(y * s):max(int(y * s) + 1, int((y + h) * s)), int(x * s):max(int(x * s) + 1, int((x + w) * s))]
+
+    def gray(self):
+        return self._cut(self.parent.gray())
+
+    def rgb(self):
+        return self._cut(self.parent.rgb())
+
+    def scaled(self, scale, gray=False):
+        return self._cut(self.parent.scaled(scale, gray), scale)
+
+def _region(a, frame):
+    """(x, y, w, h) if array a is a crop of frame (shares its rows/pixels), else None."""
+    if a.ndim != frame.ndim or a.strides != frame.strides or a.shape[2:] != frame.shape[2:]:
+        return None
+    off = a.__array_interface__["data"][0] - frame.__array_interface__["data"][0]
+    if off < 0:
+        return None
+    y, rest = divmod(off, frame.strides[0])
+    x, r = divmod(rest, frame.strides[1])
+    h, w = a.shape[:2]
+    if r or y + h > frame.shape[0] or x + w > frame.shape[1]:
+        return None
+    return x, y, w, h
+
+_local = threading.local()
+
+def views():
+    """This thread's cache."""
+    v = getattr(_local, "views", None)
+    if v is None:
+        v = _local.views = FrameViews()
+    return v
+
+def of(frame):
+    """Views for frame: the cached set if frame is the current frame or a crop
+    of it, otherwise a fresh set for this new frame."""
+    v = views()
+    cur = v.frame
+    if frame is cur:
+        return v
+    roi = None if cur is None else _region(frame, cur)
+    if roi is not None:
+        if frame.shape[:2] != cur.shape[:2]:
+            return v.crop(*roi)
+        if frame.base is cur:       # frame[:, :] (a ROI covering everything)
+            return v
+    # a new frame (or a recycled buffer such as a shm ring slot with new content)
+    return v.reset(frame)
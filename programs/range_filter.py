@@ -0,0 +1,177 @@
+# range_filter.py
+# Filtering between the sonar and the sweep/hide trigger. The plain trigger
+# wants near_hits raw readings <= near_cm in a row and lets a timeout reset
+# the count, so one ghost echo can hide the robot and one missed echo costs
+# a whole extra cycle. Here every reading goes to a track for the servo angle
+# it was taken at (bins of bin_deg, since the sweep looks at different
+# things):
+#   - a rolling median of the last readings holds back a single outlier
+#     (a step is believed once a second reading agrees with it)
+#   - a 1-D Kalman filter (range + closing speed) smooths what gets through
+#   - a timeout (None) is a missing measurement, not a far one: the track
+#     coasts on its prediction and is only dropped after lost_after timeouts
+#     in a row or hold_s without an echo
+# The hide fires when a track's range is <= near_cm, or earlier when it is
+# closing fast enough to get there within ttc_s (time to contact). A track
+# also notes when the current approach began (t_approach: first within
+# clear_cm, or closing faster than min_closing), for trigger latency.
+#
+#   rf = RangeFilter(ttc_s=0.5)
+#   sh = SweepHide(bot, rfilter=rf, ...)          # instead of near_hits
+#   hide, why = rf.update(deg, t, cm, near_cm=35, clear_cm=45)
+#
+# sim_bench.py compares it with the raw trigger (SIM_GHOST=0.02 adds ghost echoes).
+
+import math
+
+class RangeKalman:
+    """One bearing's track. r (cm) and v (cm/s, negative = closing)."""
+    def __init__(self, window=3, spike_cm=15.0, sigma_cm=1.5, accel_cm_s2=150.0, gate=4.0, lost_after=3,
+                 hold_s=1.5, max_speed=150.0):
+        self.window = window
+        self.spike_cm = spike_cm            # this far off the median: held back
+        self.r_var = sigma_cm ** 2          # measurement noise
+        self.q = accel_cm_s2 ** 2           # process noise (white acceleration)
+        self.gate = gate                    # innovation beyond gate sigmas: restart the track there
+        self.lost_after, self.hold_s = lost_after, hold_s
+        self.max_speed = max_speed          # cm/s; faster than anyone walks up = a geometry artefact
+        self.reset()
+
+        # stats
+        self.rejected = 0                   # readings the median held back
+        self.restarts = 0
+
+    def reset(self):
+        self.recent = []                    # last `window` echoes (no timeouts)
+        self.r = self.v = None
+        self.p00 = self.p01 = self.p11 = 0.0
+        self.t = self.t0 = None             # time of the state / of the track's first reading
+        self.t_approach = None              # first reading of the current approach (RangeFilter sets it)
+        self.t_echo = None
+        self.updates = 0                    # Kalman updates since the track started
+        self.timeouts = 0                   # in a row
+
+    @property
+    def valid(self):
+        return self.r is not None
+
+    def _start(self, t, z):
+        self.r, self.v = z, 0.0
+        self.p00, self.p01, self.p11 = self.r_var, 0.0, (self.max_speed / 3) ** 2
+        self.t = self.t0 = t
+        self.t_approach = None
+        self.updates = 1
+
+    def _predict(self, t):
+        dt = t - self.t
+        if dt <= 0:
+            return
+        q = self.q
+        self.r += self.v * dt
+        p00 = self.p00 + 2 * dt * self.p01 + dt * dt * self.p11 + q * dt ** 4 / 4
+        p01 = self.p01 + dt * self.p11 + q * dt ** 3 / 2
+        self.p00, self.p01, self.p11 = p00, p01, self.p11 + q * dt * dt
+        self.t = t
+
+    def update(self, t, cm):
+        """One reading (cm None = timeout). True if it moved the track."""
+        if cm is None:
+            self.timeouts += 1
+            if self.timeouts >= self.lost_after:
+                self.reset()
+            return False
+        self.timeouts = 0
+        if self.t_echo is not None and t - self.t_echo > self.hold_s:
+            self.reset()                    # too old to say anything about now
+        self.t_echo = t
+        self.recent.append(cm)
+        if len(self.recent) > self.window:
+            self.recent.pop(0)
+        med = sorted(self.recent)[len(self.recent) // 2]
+        if len(self.recent) >= 2 and abs(cm - med) > self.spike_cm:
+            self.rejected += 1              # nothing else around here reads like that (yet)
+            return False
+        if not self.valid:
+            self._start(t, cm)
+            return True
+        self._predict(t)
+        s = self.p00 + self.r_var
+        y = cm - self.r
+        if y * y > self.gate ** 2 * s:
+            self.restarts += 1              # the median agrees it's real: a new thing, start over
+            self._start(t, cm)
+            return True
+        k0, k1 = self.p00 / s, self.p01 / s
+        self.r += k0 * y
+        self.v = max(-self.max_speed, min(self.max_speed, self.v + k1 * y))
+        self.p00, self.p01, self.p11 = (1 - k0) * self.p00, (1 - k0) * self.p01, self.p11 - k1 * self.p01
+        self.updates += 1
+        return True
+
+    def ttc(self, near_cm, min_closing=10.0):
+        """Seconds until the range reaches near_cm at the current closing speed (inf if not closing)."""
+        if not self.valid or self.v > -min_closing:
+            return math.inf
+        return max(0.0, (self.r - near_cm) / -self.v)
+
+class RangeFilter:
+    """Tracks per servo angle bin, and the hide decision on top."""
+    def __init__(self, ttc_s=0.5, bin_deg=10, min_updates=5, min_age_s=0.2, min_closing=10.0, **kw):
+        self.ttc_s = ttc_s                  # 0: only the filtered range triggers
+        self.bin_deg = bin_deg
+        self.min_updates = min_updates      # track this many readings ...
+        self.min_age_s = min_age_s          # ... and this old before its speed counts
+        self.min_closing = min_closing      # cm/s
+        self.kw = kw                        # RangeKalman settings
+        self.tracks = {}
+
+        # stats
+        self.readings = 0
+        self.timeouts = 0
+        self.near_triggers = 0
+        self.ttc_triggers = 0
+
+    def track(self, deg):
+        b = int(deg // self.bin_deg)
+        tr = self.tracks.get(b)
+        if tr is None:
+            tr = self.tracks[b] = RangeKalman(**self.kw)
+        return tr
+
+    def reset(self):
+        """The robot moved (hide turn / reverse): what each angle saw is stale."""
+        for tr in self.tracks.values():
+            tr.reset()
+
+    def update(self, deg, t, cm, near_cm, clear_cm=None):
+        """One reading at servo angle deg. (hide, why): why is "near 33.1 cm"
+        or "ttc 0.42 s" when hide is True. clear_cm (default near_cm) bounds
+        what counts as approaching for tr.t_approach."""
+        self.readings += 1
+        if cm is None:
+            self.timeouts += 1
+        tr = self.track(deg)
+        if not tr.update(t, cm):
+            return False, ""
+        if tr.r < (near_cm if clear_cm is None else clear_cm) or tr.v < -self.min_closing:
+            if tr.t_approach is None:
+                tr.t_approach = t
+        else:
+            tr.t_approach = None            # backed off or stopped: the next approach starts over
+        if tr.updates < 2:
+            return False, ""                # a new track's first reading is unconfirmed
+        if tr.r <= near_cm:
+            self.near_triggers += 1
+            return True, f"near {tr.r:.1f} cm"
+        if self.ttc_s > 0 and tr.updates >= self.min_updates and t - tr.t0 >= self.min_age_s:
+            ttc = tr.ttc(near_cm, self.min_closing)
+            if ttc <= self.ttc_s:
+                self.ttc_triggers += 1
+                return True, f"ttc {ttc:.2f} s ({tr.r:.0f} cm, {-tr.v:.0f} cm/s)"
+        return False, ""
+
+    def stats(self):
+        return {"readings": self.readings, "timeouts": self.timeouts,
+                "rejected": sum(t.rejected for t in self.tracks.values()),
+                "restarts": sum(t.restarts for t in self.tracks.values()),
+                "near": self.near_triggers, "ttc": self.ttc_triggers}
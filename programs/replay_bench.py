@@ -0,0 +1,302 @@
+# replay_bench.py
+# Headless, repeatable detector benchmark: replays video files (the bundled
+# assets/*.mp4 by default) through the detectors of person_detect_test.py
+# and face_body_detect.py, one frame at a time, no camera and no window.
+# Reports per-stage latency percentiles, end-to-end FPS, CPU and peak memory,
+# and writes it all as JSON; --compare flags stages that got slower than a
+# previous run (exit code 1), for catching regressions between versions.
+#
+#   python replay_bench.py                               # all assets, all stages
+#   python replay_bench.py --stages face bodies --max-frames 100
+#   python replay_bench.py --json new.json --compare old.json
+#   python replay_bench.py --stages bodies body --body dnn --model models/yolov8n.onnx --input-size 320
+#
+# Stages:
+#   face       person_detect_test.detect_face       (MediaPipe)
+#   body_haar  person_detect_test.detect_body_haar  (upper + full body cascades)
+#   body_hog   person_detect_test.detect_body_hog
+#   bodies     face_body_detect.detect_bodies       (Haar + HOG + fusion)
+#   loop       one step of face_body_detect's live loop (motion gate + detect/track cadence)
+#   body       any body_detectors.py backend (--body, not in the default set)
+# End-to-end FPS is frames / wall time with decode and the chosen stages
+# run back to back on each frame; with --stride the frames skipped are still
+# decoded, and that time counts in "decode" and the FPS. "found" is the share
+# of frames where a stage returned at least one box. With --labels (default assets/replay_labels.json:
+# frame ranges where a person is in view) each stage also gets a frame-level
+# recall and false-positive rate, to compare the Haar/HOG baseline with a DNN.
+# Results go to runs/replay_bench.json (git-ignored) unless --json says otherwise.
+
+import os, sys, glob, json, time, argparse, platform, subprocess
+import numpy as np
+import cv2
+
+try:
+    import resource                     # POSIX only; no CPU/RSS figures on Windows
+except ImportError:
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ASSETS = os.path.join(HERE, "..", "assets", "*.mp4")
+LABELS = os.path.join(HERE, "..", "assets", "replay_labels.json")
+STAGE_NAMES = ("face", "body_haar", "body_hog", "bodies", "loop", "body")
+DEFAULT_STAGES = STAGE_NAMES[:-1]
+
+# ==== Stages ====
+def make_stages(names, body=None):
+    """name -> (fn(frame), reset()) ; reset() runs at the start of each video.
+    body: the BodyDetector for the "body" stage."""
+    import person_detect_test as pdt
+    import face_body_detect as fbd
+    from cadence import DetectScheduler
+    from motion import MotionGate, run_in_rois
+    fbd.init_detectors()
+
+    def reset_fusion():
+        fbd.body_history.clear()
+
+    loop = {}
+    def reset_loop():
+        loop["history"] = fbd.BodyHistory()     # its own: "bodies" uses the global one
+        loop["sched"] = DetectScheduler(interval=fbd.DETECT_EVERY, adaptive=fbd.ADAPTIVE_CADENCE)
+        loop["gate"] = MotionGate() if fbd.MOTION_GATE else None
+        loop["boxes"] = ([], [])
+
+    def loop_step(frame):
+        gate, faces, bodies = loop["gate"], *loop["boxes"]
+        def detect_all(f):
+            rois = gate.rois(f, hold=faces + bodies) if gate else None
+            return run_in_rois(fbd.detect_faces, f, rois), fbd.detect_bodies(f, rois, history=loop["history"])
+        if gate:
+            gate.update(frame)
+        loop["boxes"], _ = loop["sched"].update(frame, detect_all)
+        return loop["boxes"]
+
+    nothing = lambda: None
+    all_stages = {
+        "face":      (pdt.detect_face, nothing),
+        "body_haar": (pdt.detect_body_haar, nothing),
+        "body_hog":  (pdt.detect_body_hog, nothing),
+        "bodies":    (fbd.detect_bodies, reset_fusion),
+        "loop":      (loop_step, reset_loop),
+    }
+    if body is not None:
+        all_stages["body"] = (body.detect, body.reset)
+    return {n: all_stages[n] for n in names}
+
+# ==== Measuring ====
+def summary(times_s, hits=None):
+    if not times_s:
+        return {"n": 0}
+    ms = np.asarray(times_s) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    out = {"n": int(ms.size), "mean_ms": float(ms.mean()), "p50_ms": float(p50), "p90_ms": float(p90),
+           "p99_ms": float(p99), "max_ms": float(ms.max()), "fps": float(1000.0 / ms.mean())}
+    if hits is not None:
+        out["found_pct"] = 100.0 * hits["found"] / ms.size
+        if hits["tp"] + hits["fn"]:
+            out["recall_pct"] = 100.0 * hits["tp"] / (hits["tp"] + hits["fn"])
+        if hits["fp"] + hits["tn"]:
+            out["fp_pct"] = 100.0 * hits["fp"] / (hits["fp"] + hits["tn"])
+    return out
+
+def new_hits():
+    return {"found": 0, "tp": 0, "fn": 0, "fp": 0, "tn": 0}
+
+def add_hits(acc, hits):
+    for k, v in hits.items():
+        acc[k] += v
+
+def found_any(result):
+    """A stage's return value holds at least one box (loop returns (faces, bodies))."""
+    if isinstance(result, tuple):
+        return any(len(r) for r in result)
+    return len(result) > 0
+
+def cpu_s():
+    if resource is None:
+        return None
+    r = resource.getrusage(resource.RUSAGE_SELF)
+    return r.ru_utime + r.ru_stime
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024.0 / (1024.0 if sys.platform == "darwin" else 1.0)   # macOS reports bytes
+
+def replay(path, stages, max_frames=0, stride=1, width=0, warmup=5, labels=None):
+    """labels: [first, last] frame ranges with a person in view, or None (unlabelled)."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"cannot open {path}")
+    for _, reset in stages.values():
+        reset()
+    times = {n: [] for n in ("decode",) + tuple(stages)}
+    hits = {n: new_hits() for n in stages}
+    frames = idx = 0
+    wall = 0.0
+    skipped = 0.0                       # decode time of the frames --stride skips
+    try:
+        while not max_frames or frames < max_frames + warmup:
+            t0 = time.perf_counter()
+            ok, frame = cap.read()
+            if not ok:
+                break
+            idx += 1
+            if (idx - 1) % stride:
+                skipped += time.perf_counter() - t0
+                continue
+            t0 -= skipped                   # charged to the next frame used, like a live camera's
+            skipped = 0.0
+            if width and frame.shape[1] != width:
+                frame = cv2.resize(frame, (width, frame.shape[0] * width // frame.shape[1]),
+                                   interpolation=cv2.INTER_AREA)
+            t1 = time.perf_counter()
+            lap, hit = {"decode": t1 - t0}, {}
+            for name, (fn, _) in stages.items():
+                ts = time.perf_counter()
+                res = fn(frame)
+                lap[name] = time.perf_counter() - ts
+                hit[name] = found_any(res)
+            frames += 1
+            if frames <= warmup:            # model loading / first-call costs
+                continue
+            for name, dt in lap.items():
+                times[name].append(dt)
+            person = None if labels is None else any(a <= idx - 1 <= b for a, b in labels)
+            for name, h in hit.items():
+                c = hits[name]
+                c["found"] += h
+                if person is not None:
+                    c[("tp" if h else "fn") if person else ("fp" if h else "tn")] += 1
+            wall += time.perf_counter() - t0
+    finally:
+        cap.release()
+    n = max(0, frames - warmup)
+    return {"file": os.path.relpath(path, HERE), "frames": n, "wall_s": wall,
+            "fps": n / wall if wall > 0 else 0.0,
+            "stages": {name: summary(ts, hits.get(name)) for name, ts in times.items()}}, (times, hits)
+
+# ==== Report ====
+def environment():
+    def version(mod):
+        try:
+            return __import__(mod).__version__
+        except Exception:
+            return None
+    try:
+        git = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                             text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        git = None
+    return {"git": git, "python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "cpus": os.cpu_count(), "opencv": cv2.__version__,
+            "cv2_threads": cv2.getNumThreads(), "numpy": np.__version__, "mediapipe": version("mediapipe")}
+
+def print_table(stages):
+    pct = lambda s, k: f"{s[k]:>5.0f}%" if k in s else ""
+    print(f"{'stage':<10} {'n':>6} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'fps':>7} "
+          f"{'found':>6} {'recall':>6} {'fp':>6}")
+    for name, s in stages.items():
+        if not s.get("n"):
+            continue
+        print(f"{name:<10} {s['n']:>6d} {s['mean_ms']:>6.1f}ms {s['p50_ms']:>6.1f}ms {s['p90_ms']:>6.1f}ms "
+              f"{s['p99_ms']:>6.1f}ms {s['max_ms']:>6.1f}ms {s['fps']:>7.1f} "
+              f"{pct(s, 'found_pct'):>6} {pct(s, 'recall_pct'):>6} {pct(s, 'fp_pct'):>6}")
+
+def compare(new, old_path, tol):
+    """Stages whose p50 or p90 got more than tol slower than in old_path."""
+    with open(old_path) as f:
+        old = json.load(f)["total"]["stages"]
+    worse = []
+    for name, s in new["total"]["stages"].items():
+        o = old.get(name)
+        if not s.get("n") or not o or not o.get("n"):
+            continue
+        for k in ("p50_ms", "p90_ms"):
+            if s[k] > o[k] * (1.0 + tol):
+                worse.append((name, k, o[k], s[k]))
+    return worse
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless detector replay benchmark")
+    ap.add_argument("videos", nargs="*", help="video files (default: assets/*.mp4)")
+    ap.add_argument("--stages", nargs="+", choices=STAGE_NAMES, default=list(DEFAULT_STAGES))
+    ap.add_argument("--body", default="dnn", help="body_detectors backend for the body stage")
+    ap.add_argument("--model", help="model file for --body dnn/ort (default: BODY_MODEL)")
+    ap.add_argument("--input-size", type=int, help="DNN input size (default: BODY_INPUT)")
+    ap.add_argument("--threads", type=int, help="DNN threads (default: BODY_THREADS)")
+    ap.add_argument("--precision", choices=("fp32", "fp16", "int8"), help="default: BODY_PRECISION")
+    ap.add_argument("--max-frames", type=int, default=0, help="per video, 0 = all")
+    ap.add_argument("--stride", type=int, default=1, help="use every Nth frame")
+    ap.add_argument("--width", type=int, default=0, help="resize frames to this width first (0 = as decoded)")
+    ap.add_argument("--warmup", type=int, default=5, help="frames per video left out of the stats")
+    ap.add_argument("--json", default=os.path.join("runs", "replay_bench.json"), help="where to write the results")
+    ap.add_argument("--labels", default=LABELS, help="person frame ranges per video file name ('' = none)")
+    ap.add_argument("--compare", help="previous results JSON to check for regressions")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown for --compare")
+    args = ap.parse_args(argv)
+
+    videos = args.videos or sorted(glob.glob(ASSETS))
+    if not videos:
+        ap.error("no videos given and none found in assets/")
+    body = None
+    if "body" in args.stages:
+        import body_detectors
+        kw = {k: v for k, v in (("model", args.model), ("input_size", args.input_size),
+                                ("threads", args.threads), ("precision", args.precision)) if v is not None}
+        body = body_detectors.make(args.body, **(kw if args.body in ("dnn", "ort") else {}))
+    stages = make_stages(args.stages, body)
+
+    all_times = {n: [] for n in ("decode",) + tuple(stages)}
+    all_hits = {n: new_hits() for n in stages}
+    labels = {}
+    if args.labels and os.path.exists(args.labels):
+        with open(args.labels) as f:
+            labels = json.load(f)
+    results = []
+    cpu0, t0 = cpu_s(), time.perf_counter()
+    for path in videos:
+        r, (times, hits) = replay(path, stages, args.max_frames, args.stride, args.width, args.warmup,
+                                  labels.get(os.path.basename(path)))
+        results.append(r)
+        for n, ts in times.items():
+            all_times[n].extend(ts)
+        for n, h in hits.items():
+            add_hits(all_hits[n], h)
+        print(f"{r['file']}: {r['frames']} frames, {r['fps']:.1f} fps end-to-end")
+    wall = time.perf_counter() - t0
+    cpu = None if cpu0 is None else cpu_s() - cpu0
+
+    frames = sum(r["frames"] for r in results)
+    busy = sum(r["wall_s"] for r in results)
+    total = {"frames": frames, "wall_s": wall, "fps": frames / busy if busy > 0 else 0.0,
+             "cpu_s": cpu, "cpu_pct": None if cpu is None else 100.0 * cpu / wall,
+             "max_rss_mb": max_rss_mb(),
+             "stages": {n: summary(ts, all_hits.get(n)) for n, ts in all_times.items()}}
+    out = {"version": 1, "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "env": environment(),
+           "args": vars(args), "videos": results, "total": total}
+
+    print()
+    print_table(total["stages"])
+    line = f"\n{frames} frames, {total['fps']:.1f} fps end-to-end"
+    if cpu is not None:
+        line += f", CPU {total['cpu_pct']:.0f}% ({os.cpu_count()} cores), peak RSS {total['max_rss_mb']:.0f} MB"
+    print(line)
+
+    os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+    with open(args.json, "w") as f:
+        json.dump(out, f, indent=2)
+    print(f"wrote {args.json}")
+
+    if args.compare:
+        worse = compare(out, args.compare, args.tolerance)
+        for name, k, a, b in worse:
+            print(f"REGRESSION {name} {k}: {a:.1f} -> {b:.1f} ms (+{100 * (b / a - 1):.0f}%)")
+        if worse:
+            return 1
+        print(f"no stage slower than {args.compare} by more than {100 * args.tolerance:.0f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-import pigpio, time
+from hal import open_backend, Servo
 
 PIN = 17          # BCM pin for servo signal (physical pin 11)
 LOW, HIGH = 40, 80  # sweep limits in degrees
@@ -9,18 +9,12 @@ DELAY = 0.02      # seconds between steps
 MIN_PW = 500      # µs at 0°
 MAX_PW = 2500     # µs at 180°
 
-def angle_to_us(angle):
-    angle = max(0, min(180, angle))
-    return int(MIN_PW + (angle / 180.0) * (MAX_PW - MIN_PW))
-
-pi = pigpio.pi()
-if not pi.connected:
-    raise SystemExit("pigpio daemon not running. Start it with: sudo pigpiod")
+hw = open_backend("pigpio")   # VANIS_GPIO overrides
+servo = Servo(hw, PIN, MIN_PW, MAX_PW)
 
 try:
     # go to start
-    pi.set_servo_pulsewidth(PIN, angle_to_us(LOW))
-    time.sleep(0.3)
+    servo.set_deg(LOW, settle=0.3)
 
     current = LOW
     up = True
@@ -33,11 +27,10 @@ try:
             current = LOW
             up = True
 
-        pi.set_servo_pulsewidth(PIN, angle_to_us(current))
-        time.sleep(DELAY)
+        servo.set_deg(current, settle=DELAY)
 
 except KeyboardInterrupt:
     pass
 finally:
-    pi.set_servo_pulsewidth(PIN, 0)  # turn off pulses
-    pi.stop()
+    servo.off()  # turn off pulses
+    hw.close()
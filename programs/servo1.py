@@ -1,18 +1,13 @@
-from gpiozero import AngularServo
-from time import sleep
+from hal import open_backend, Servo
 
 PIN = 17  # BCM 17 (physical pin 11)
 
 # Calibrate pulse widths for your servo (tweak if motion is off)
-MIN_PW = 0.0005  # 0.5 ms
-MAX_PW = 0.0025  # 2.5 ms
+MIN_PW = 500   # 0.5 ms
+MAX_PW = 2500  # 2.5 ms
 
-servo = AngularServo(
-    PIN,
-    min_angle=0, max_angle=180,
-    min_pulse_width=MIN_PW,
-    max_pulse_width=MAX_PW
-)
+hw = open_backend("gpiozero")   # VANIS_GPIO overrides
+servo = Servo(hw, PIN, MIN_PW, MAX_PW)
 
 LOW, HIGH = 40, 80
 STEP = 1
@@ -21,11 +16,11 @@ DELAY = 0.02
 def go(angle):
     # Clamp and move
     angle = max(0, min(180, angle))
-    servo.angle = angle
+    servo.set_deg(angle)
 
 try:
     # move to start
-    go(LOW); sleep(0.3)
+    go(LOW); hw.sleep(0.3)
 
     current = LOW
     going_up = True
@@ -43,7 +38,10 @@ try:
                 going_up = True
 
         go(current)
-        sleep(DELAY)
+        hw.sleep(DELAY)
 
 except KeyboardInterrupt:
     pass
+finally:
+    servo.off()
+    hw.close()
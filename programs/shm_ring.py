@@ -0,0 +1,42 @@
+# shm_ring.py
+# Fixed-size ring of frame slots in POSIX shared memory.
+# Worker processes attach by name and get numpy views onto the slots, so frames
+# move between processes without pickling; only (seq, slot, shape) goes
+# through the queues.
+
+import numpy as np
+from multiprocessing import shared_memory
+
+MAX_FRAME_BYTES = 1920 * 1080 * 3   # biggest frame a slot can hold (1080p BGR)
+
+class FrameRing:
+    def __init__(self, name=None, slots=4, slot_bytes=MAX_FRAME_BYTES, create=True):
+        self.slots, self.slot_bytes = slots, slot_bytes
+        self.owner = create
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=slots * slot_bytes)
+        else:
+            # workers started by multiprocessing share the creator's resource
+            # tracker, so attaching here does not unlink anything on exit
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+    @classmethod
+    def attach(cls, name, slots=4, slot_bytes=MAX_FRAME_BYTES):
+        return cls(name, slots, slot_bytes, create=False)
+
+    def view(self, slot, shape, dtype=np.uint8):
+        """numpy view onto a slot; valid until the slot is reused."""
+        n = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if n > self.slot_bytes:
+            raise ValueError(f"frame of {n} bytes does not fit a {self.slot_bytes} byte slot")
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot, frame):
+        np.copyto(self.view(slot, frame.shape, frame.dtype), frame)
+        return frame.shape
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,81 @@
+# sim_bench.py
+# Runs the sweep/hide state machines on the simulated robot (hal.sim) with a
+# virtual clock: minutes of robot time in a few wall seconds, same result every
+# run. Reports how fast the simulation ran, the ranging rate, and how long it
+# took from someone coming inside NEAR_CM to the hide starting (negative: the
+# hide started before they got there), for the fixed sweep and the adaptive
+# one (sweep_planner.py), each with the raw near_hits trigger and the filtered
+# one (range_filter.py). "false" counts hides with nobody walking up.
+#
+#   python sim_bench.py              # all hide modes, 600 s of robot time
+#   python sim_bench.py 120 backup
+#   SIM_GHOST=0.02 python sim_bench.py 300 until_clear    # 2% ghost echoes
+
+import os, sys, time
+from hal import Robot, SimBackend, SimWorld
+from sweep_hide import SweepHide, HIDE_MODES
+from sweep_planner import FixedSweep, AdaptiveSweep
+from range_filter import RangeFilter
+
+PLANNERS = {"fixed": FixedSweep, "adaptive": AdaptiveSweep}
+TRIGGERS = {"raw": lambda: None, "filter": RangeFilter}
+
+NEAR_CM = 35
+GHOST = float(os.getenv("SIM_GHOST", "0"))     # chance of a spurious short echo per ping
+
+def latencies(world, hide_times, near_cm=NEAR_CM):
+    """Per scripted object: hide time minus the moment it came within near_cm."""
+    out, missed = [], 0
+    for o in world.objects:
+        if not o.speed_cm_s:
+            continue
+        t_near = o.t0 + max(0.0, (o.dist_cm - near_cm) / o.speed_cm_s)
+        if t_near >= o.t1:
+            continue
+        hits = [t for t in hide_times if o.t0 <= t < o.t1]
+        if hits:
+            out.append(hits[0] - t_near)
+        else:
+            missed += 1
+    return out, missed
+
+def false_hides(world, hide_times):
+    """Hides while nobody was walking up."""
+    walks = [(o.t0, o.t1) for o in world.objects if o.speed_cm_s]
+    return sum(not any(t0 <= t < t1 for t0, t1 in walks) for t in hide_times)
+
+def bench(hide, duration, seed=0, planner="fixed", trigger="raw", ghost=GHOST):
+    world = SimWorld.demo(seed, ghost=ghost)
+    world.objects = [o for o in world.objects if o.t0 < duration]
+    bot = Robot(SimBackend(world=world))
+    sh = SweepHide(bot, hide=hide, near_cm=NEAR_CM, back_s=0.5 if hide in ("backup", "until_clear") else 0.0,
+                   planner=PLANNERS[planner](), log=None, rfilter=TRIGGERS[trigger]())
+    t0 = time.perf_counter()
+    sh.run(duration)
+    wall = time.perf_counter() - t0
+    lat, missed = latencies(world, sh.hide_times)
+    bot.close()
+    deg_s, pings_s = sh.planner.rates()
+    return {
+        "mode": hide, "planner": planner, "trigger": trigger, "deg_per_s": deg_s, "pings_per_s": pings_s, "robot_s": duration, "wall_s": wall, "speedup": duration / wall,
+        "readings_per_s": sh.readings / duration, "hides": len(sh.hide_times),
+        "lat_mean_ms": 1000 * sum(lat) / len(lat) if lat else float("nan"),
+        "lat_max_ms": 1000 * max(lat) if lat else float("nan"), "missed": missed,
+        "false": false_hides(world, sh.hide_times),
+    }
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 600.0
+    modes = sys.argv[2:] or HIDE_MODES
+    print(f"{'mode':<12} {'sweep':<9} {'trigger':<7} {'x realtime':>10} {'reads/s':>8} {'deg/s':>6} {'pings/s':>8} "
+          f"{'hides':>6} {'lat mean':>9} {'lat max':>8} {'missed':>7} {'false':>6}")
+    for m in modes:
+        for p in PLANNERS:
+            for tr in TRIGGERS:
+                r = bench(m, duration, planner=p, trigger=tr)
+                print(f"{r['mode']:<12} {p:<9} {tr:<7} {r['speedup']:>10.0f} {r['readings_per_s']:>8.1f} {r['deg_per_s']:>6.0f} "
+                      f"{r['pings_per_s']:>8.1f} {r['hides']:>6d} {r['lat_mean_ms']:>7.0f}ms {r['lat_max_ms']:>6.0f}ms "
+                      f"{r['missed']:>7d} {r['false']:>6d}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# sweep_hide.py
+# The sweep-and-hide state machine shared by back.py, 180.py, 182.py,
+# orgin.py, suhide.py, hide_decrease.py, ...
+# Servo sweeps sweep[0]..sweep[1]; near_hits consecutive readings <= near_cm
+# trigger a hide. What "hide" means is the script's choice:
+#   "turn"        (optional reverse) + tank-turn CCW for turn_s, hide fixed_hide_s   (180.py, orgin.py)
+#   "turn_back"   like "turn", then CW for turn_s to face the original way         (back.py)
+#   "backup"      reverse for back_s, hide fixed_hide_s                             (182.py, hide_decrease.py)
+#   "until_clear" reverse for back_s, hide until clear_hits readings >= clear_cm   (suhide.py)
+# Where the servo looks next is up to a planner (sweep_planner.py): FixedSweep
+# (step_deg every step_delay, the default) or AdaptiveSweep. Given an rfilter
+# (range_filter.RangeFilter) the hide fires on its median/Kalman track, near
+# or about to be (time to contact), instead of on near_hits raw readings.
+# Turns run for turn_s, or, given a turner (hal/turn.py), by angle: turn_deg
+# CCW, and "turn_back" returns to the heading it started from.
+# All timing goes through the robot's clock, so on the simulator
+# (VANIS_GPIO=sim-fast) it runs faster than real time. State changes go to
+# the robot's telemetry recorder when it has one (VANIS_TELEMETRY), and every
+# step feeds the robot's watchdog (VANIS_WATCHDOG).
+
+from sweep_planner import FixedSweep
+
+HIDE_MODES = ("turn", "turn_back", "backup", "until_clear")
+
+class SweepHide:
+    def __init__(self, bot, hide="turn", sweep=(40, 80), step_deg=2, step_delay=0.03, settle_s=0.10,
+                 near_cm=35, near_hits=2, clear_cm=45, clear_hits=3, fixed_hide_s=5.0,
+                 turn_s=0.7, back_s=0.0, home_deg=60, away_deg=180, planner=None, log=print,
+                 turner=None, turn_deg=180, rfilter=None):
+        if hide not in HIDE_MODES:
+            raise ValueError(f"hide must be one of {HIDE_MODES}, not {hide!r}")
+        self.bot, self.hide = bot, hide
+        self.sweep_min, self.sweep_max = sweep
+        self.step_deg, self.step_delay, self.settle_s = step_deg, step_delay, settle_s
+        self.near_cm, self.near_hits = near_cm, near_hits
+        self.clear_cm, self.clear_hits = clear_cm, clear_hits
+        self.fixed_hide_s = fixed_hide_s
+        self.turn_s, self.back_s = turn_s, back_s
+        self.turner, self.turn_deg = turner, turn_deg
+        self.heading0 = None            # heading before the hide turn (turner only)
+        self.home_deg, self.away_deg = home_deg, away_deg
+        self.planner = planner or FixedSweep(sweep, step_deg, step_delay)
+        self.rfilter = rfilter
+        self.log = log or (lambda *a: None)
+        self.tel = getattr(bot, "tel", None)
+        self.wd = getattr(bot, "wd", None)
+
+        self._state = None
+        self.state = "SWEEP"    # or "MOVING" (hide move) / "HIDING"
+        self.servo_at = home_deg    # where the servo was pointed for the next reading
+        self.aimed_at = 0.0         # robot time it got there (set_deg + settle): older pings don't count
+        self.near_ct = 0
+        self.clear_ct = 0
+        self.hide_start = None
+
+        # stats
+        self.readings = 0
+        self.stale = 0          # async: readings pinged before the servo got there (Ranger skips them itself)
+        self.hide_times = []    # robot clock at each hide trigger
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, st):
+        if st != self._state and self.tel:
+            self.tel.state(st)
+        self._state = st
+
+    def start(self):
+        self.bot.servo.set_deg(self.home_deg)   # mid-ish
+        self.servo_at = self.home_deg
+        self.bot.sleep(0.3)
+        self.aimed_at = self.bot.now()
+
+    def run(self, duration=None):
+        """Loop forever (or for `duration` seconds of robot time)."""
+        self.start()
+        t_end = None if duration is None else self.bot.now() + duration
+        try:
+            while t_end is None or self.bot.now() < t_end:
+                self.step()
+        finally:
+            if self.wd:
+                self.wd.disarm()        # not feeding any more, on purpose
+
+    def step(self):
+        if self.wd:
+            self.wd.feed()
+        d = self.bot.sonar.distance_cm(since=self.aimed_at)
+        self.readings += 1
+        if self.state == "SWEEP":
+            self._sweep(d)
+        else:
+            self._hiding(d)
+
+    # ---- states ----
+    def _sweep(self, d):
+        self.planner.observe(self.servo_at, d, self.bot.now())
+        if d is not None and d <= self.near_cm:
+            self.near_ct += 1
+        else:
+            self.near_ct = 0
+
+        hide, why = self._triggered(self.bot.now(), d)
+        if hide:
+            self.log(f"[DETECTED] {why} -> HIDE ({self.hide})")
+            self.hide_times.append(self.bot.now())
+            self._do_hide()
+            return
+
+        # normal sweep
+        deg, dwell = self.planner.next(self.bot.now())
+        self.bot.servo.set_deg(deg)
+        self.servo_at = deg
+        self.aimed_at = self.bot.now() + dwell
+        self.bot.sleep(dwell)
+
+    def _triggered(self, stamp, d):
+        """(hide, why) for a reading taken at robot time stamp, after near_ct is counted."""
+        if self.rfilter is not None:
+            return self.rfilter.update(self.servo_at, stamp, d, self.near_cm, self.clear_cm)
+        if self.near_ct >= self.near_hits:
+            return True, f"{d:.1f} cm"
+        return False, ""
+
+    def _do_hide(self):
+        motors = self.bot.motors
+        self.state = "MOVING"
+        # face "away" with the servo, then move
+        self.bot.servo.set_deg(self.away_deg, settle=self.settle_s)
+        if self.back_s > 0:
+            motors.backward(self.back_s)
+        if self.hide in ("turn", "turn_back"):
+            if self.turner:
+                self.heading0 = self.turner.heading()
+                self.turner.turn(self.turn_deg)
+            else:
+                motors.tank_ccw(self.turn_s)
+        motors.stop()
+        self.state = "HIDING"
+        self.hide_start = self.bot.now()
+        self.clear_ct = 0
+
+    def _hiding(self, d):
+        if self.hide == "until_clear":
+            # hold, wait till clear to resume
+            if d is not None and d >= self.clear_cm:
+                self.clear_ct += 1
+            else:
+                self.clear_ct = 0
+            if self.clear_ct >= self.clear_hits:
+                self.log(f"[CLEAR] {d:.1f} cm -> FREE (resume sweep)")
+                self._resume()
+            self.bot.sleep(0.05)
+            return
+
+        if self.bot.now() - self.hide_start >= self.fixed_hide_s:
+            if self.hide == "turn_back":
+                self.log("[DONE HIDING] Turning back CW, then resume sweep")
+                if self.turner:
+                    self.turner.turn_to(self.heading0)
+                else:
+                    self.bot.motors.tank_cw(self.turn_s)     # reverse the first spin
+            else:
+                self.log("[DONE HIDING] Returning to sweep")
+            self._resume()
+        else:
+            self.bot.sleep(0.05)
+
+    def _resume(self):
+        self.bot.servo.set_deg(self.home_deg, settle=self.settle_s)   # face forward-ish
+        self.servo_at = self.home_deg
+        self.aimed_at = self.bot.now()
+        self.state = "SWEEP"
+        self.near_ct = 0
+        # restart sweep heading outward
+        self.planner.reset()
+        if self.rfilter is not None:
+            self.rfilter.reset()        # the robot moved: old tracks point elsewhere
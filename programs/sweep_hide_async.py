@@ -0,0 +1,230 @@
+# sweep_hide_async.py
+# SweepHide on asyncio: ranging, servo stepping, motor moves and the state
+# machine are separate tasks, so the robot keeps listening to the sonar while
+# it turns, backs up or hides. Timed moves are tasks too: a new obstacle
+# (near_hits near readings) during a turn/reverse cancels it and the motors
+# stop where they are.
+# Same settings and hide modes as sweep_hide.py. Runs in real time (use
+# VANIS_GPIO=sim, not sim-fast, to try it off the robot).
+#
+#   sh = AsyncSweepHide(bot, hide="turn_back", turn_s=0.7)
+#   asyncio.run(sh.run())
+
+import asyncio
+from hal import Ranger
+from sweep_hide import SweepHide
+
+class AsyncSweepHide(SweepHide):
+    """States: SWEEP -> MOVING (hide move) -> HIDING -> [MOVING (turn back)] -> SWEEP."""
+    def __init__(self, bot, hide="turn", abort=True, **kw):
+        super().__init__(bot, hide=hide, **kw)
+        self.abort = abort              # cancel a hide move on a new obstacle
+        self._readings = None
+        self._sweeping = None
+        self._clear = None
+        self._pinged = None
+        self._move = None               # running timed motor move
+        self._seq = None                # running hide sequence
+        self._failed = None             # set to the first task error: ends run()
+
+        # stats
+        self.aborts = 0
+
+    async def run(self, duration=None):
+        """Run until cancelled (or for `duration` seconds)."""
+        self._readings = asyncio.Queue()
+        self._sweeping, self._clear, self._pinged = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        self.bot.servo.set_deg(self.home_deg)   # mid-ish
+        self.servo_at = self.home_deg
+        await asyncio.sleep(0.3)
+        self.aimed_at = self.bot.now()
+        self._sweeping.set()
+
+        self._failed = asyncio.get_running_loop().create_future()
+        tasks = [asyncio.create_task(c) for c in self._tasks()]
+        for t in tasks:
+            t.add_done_callback(self._task_done)
+        main = asyncio.ensure_future(asyncio.gather(*tasks) if duration is None else asyncio.sleep(duration))
+        try:
+            # a task or the hide sequence dying ends the run with its error,
+            # instead of leaving the robot stuck in MOVING without a word
+            await asyncio.wait({main, self._failed}, return_when=asyncio.FIRST_COMPLETED)
+            if self._failed.done():
+                self._failed.result()
+            main.result()
+        finally:
+            main.cancel()
+            for t in tasks + [self._seq]:
+                if t is not None:
+                    t.cancel()
+            await asyncio.gather(main, *(t for t in tasks + [self._seq] if t is not None),
+                                 return_exceptions=True)   # main too: its cancel is retrieved
+            self.bot.motors.stop()
+            if self.wd:
+                self.wd.disarm()
+
+    # ---- tasks ----
+    def _tasks(self):
+        tasks = self._ranging(), self._sweeper(), self._brain()
+        return tasks + (self._feeder(),) if self.wd else tasks
+
+    async def _feeder(self):
+        # the event loop is the control loop here: if it stops getting round
+        # to this task, something is blocking it
+        while True:
+            self.wd.feed()
+            await asyncio.sleep(self.wd.deadline_s / 2)
+
+    async def _ranging(self):
+        sonar = self.bot.sonar
+        loop = asyncio.get_running_loop()
+        if isinstance(sonar, Ranger):
+            # readings arrive from the ranger's thread
+            sonar.on_reading = lambda seq, stamp, cm, pinged: loop.call_soon_threadsafe(
+                self._readings.put_nowait, (stamp, cm, pinged))
+            try:
+                await asyncio.Event().wait()
+            finally:
+                sonar.on_reading = None
+        else:
+            # polled HCSR04: keep its busy-wait off the event loop
+            while True:
+                pinged = self.bot.now()
+                cm = await loop.run_in_executor(None, sonar.distance_cm)
+                self._readings.put_nowait((self.bot.now(), cm, pinged))
+                await asyncio.sleep(self.step_delay)
+
+    async def _sweeper(self):
+        while True:
+            await self._sweeping.wait()
+            deg, dwell = self.planner.next(self.bot.now())
+            self.bot.servo.set_deg(deg)
+            self.servo_at = deg
+            self.aimed_at = self.bot.now() + dwell
+            await asyncio.sleep(dwell)
+            # one ping per planned step, as in the blocking SweepHide
+            self._pinged.clear()
+            try:
+                await asyncio.wait_for(self._pinged.wait(), 0.5)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _brain(self):
+        while True:
+            self._reading(*await self._readings.get())
+
+    def _reading(self, stamp, d, pinged=None):
+        """One sonar reading (measured at robot time `stamp`, pinged at `pinged`)
+        through the state machine. While sweeping, a ping sent before the servo
+        reached servo_at (set_deg + dwell) is dropped: it looked somewhere else."""
+        if self.state == "SWEEP" and pinged is not None and pinged < self.aimed_at:
+            self.stale += 1
+            return
+        self.readings += 1
+        self._pinged.set()
+        near = d is not None and d <= self.near_cm
+        self.near_ct = self.near_ct + 1 if near else 0
+
+        if self.state == "SWEEP":
+            self.planner.observe(self.servo_at, d, self.bot.now())
+            hide, why = self._triggered(stamp, d)
+            if hide:
+                self.log(f"[DETECTED] {why} -> HIDE ({self.hide})")
+                self._start_hide()
+        elif self.state == "MOVING":
+            if self.abort and self.near_ct >= self.near_hits and self._move and not self._move.done():
+                self.log(f"[ABORT] obstacle at {d:.1f} cm -> stop moving")
+                self.aborts += 1
+                self._move.cancel()
+        elif self.hide == "until_clear":
+            # hold, wait till clear to resume
+            self.clear_ct = self.clear_ct + 1 if d is not None and d >= self.clear_cm else 0
+            if self.clear_ct >= self.clear_hits and not self._clear.is_set() and self._may_resume():
+                self.log(f"[CLEAR] {d:.1f} cm -> FREE (resume sweep)")
+                self._clear.set()
+
+    def _start_hide(self):
+        self.hide_times.append(self.bot.now())
+        self._sweeping.clear()
+        self.state = "MOVING"
+        self._seq = asyncio.create_task(self._hide_sequence())
+        self._seq.add_done_callback(self._task_done)
+
+    def _task_done(self, task):
+        if task.cancelled() or task.exception() is None or self._failed.done():
+            return
+        self.log(f"[ERROR] {task.get_coro().__name__} failed: {task.exception()!r}")
+        self._failed.set_exception(task.exception())
+
+    def _may_resume(self):
+        """until_clear: anything besides the sonar that must agree it's clear."""
+        return True
+
+    # ---- the hide, as one cancellable sequence ----
+    async def _hide_sequence(self):
+        motors = self.bot.motors
+        # face "away" with the servo, then move
+        self.bot.servo.set_deg(self.away_deg)
+        await asyncio.sleep(self.settle_s)
+        self.near_ct = 0
+        if self.back_s > 0:
+            await self._timed(motors.backward, self.back_s)
+        if self.hide in ("turn", "turn_back"):
+            if self.turner:
+                self.heading0 = self.turner.heading()
+                await self._moving(self.turner.aturn(self.turn_deg))
+            else:
+                await self._timed(motors.tank_ccw, self.turn_s)
+
+        self.state = "HIDING"
+        self.hide_start = self.bot.now()
+        self.clear_ct = 0
+        if self.hide == "until_clear":
+            self._clear.clear()
+            await self._clear.wait()
+        else:
+            await asyncio.sleep(self.fixed_hide_s)
+            if self.hide == "turn_back":
+                self.log("[DONE HIDING] Turning back CW, then resume sweep")
+                self.state = "MOVING"
+                self.near_ct = 0
+                if self.turner:
+                    await self._moving(self.turner.aturn_to(self.heading0))
+                else:
+                    await self._timed(motors.tank_cw, self.turn_s)     # reverse the first spin
+            else:
+                self.log("[DONE HIDING] Returning to sweep")
+
+        self.bot.servo.set_deg(self.home_deg)   # face forward-ish
+        self.servo_at = self.home_deg
+        await asyncio.sleep(self.settle_s)
+        self.aimed_at = self.bot.now()
+        self.near_ct = 0
+        # restart sweep heading outward
+        self.planner.reset()
+        if self.rfilter is not None:
+            self.rfilter.reset()
+        self.state = "SWEEP"
+        self._sweeping.set()
+
+    async def _timed(self, move, t):
+        """Start `move` (e.g. motors.tank_ccw), stop after t s or when aborted.
+        An abort only ends this move; the hide sequence carries on."""
+        async def go():
+            try:
+                move()
+                await asyncio.sleep(t)
+            finally:
+                self.bot.motors.stop()
+        await self._moving(go())
+
+    async def _moving(self, coro):
+        """Run a motor move as the abortable self._move."""
+        self._move = asyncio.create_task(coro)
+        try:
+            await asyncio.wait({self._move})
+        except asyncio.CancelledError:
+            self._move.cancel()
+            raise
+        finally:
+            self._move = None
@@ -0,0 +1,107 @@
+# sweep_planner.py
+# Where the sweep servo goes next, and how long it stays there.
+#   FixedSweep     the old behaviour: STEP_DEG every STEP_DELAY, bounce at the ends
+#   AdaptiveSweep  coarse fast steps across empty arc, fine steps and repeated
+#                  pings around recent near readings, never faster than the
+#                  servo can slew
+# Both count what they achieved (deg/s of servo travel, pings/s) so the two
+# can be compared on the robot or in sim_bench.py.
+#
+#   planner = AdaptiveSweep((40, 80))
+#   deg, dwell = planner.next(t); servo.set_deg(deg); sleep(dwell)
+#   planner.observe(deg, sonar.distance_cm(), t)
+
+SLEW_DPS = 600.0        # SG90: ~0.1 s / 60 deg
+
+class FixedSweep:
+    def __init__(self, sweep=(40, 80), step_deg=2, step_delay=0.03):
+        self.sweep_min, self.sweep_max = sweep
+        self.step_deg, self.step_delay = step_deg, step_delay
+        self.reset()
+
+        # stats (only while sweeping: reset() starts a new stretch)
+        self.travel_deg = 0.0
+        self.pings = 0
+        self.sweep_s = 0.0
+        self._last = None                   # (t, deg) of the previous next()
+
+    def reset(self):
+        """Start again from sweep_min heading outward (after a hide)."""
+        self.angle = self.sweep_min
+        self.direction = +1
+        self._last = None
+
+    def next(self, t):
+        """(deg, dwell_s): point the servo at deg, wait dwell_s, then ping."""
+        deg, dwell = self._plan(t)
+        self._count(t, deg)
+        return deg, dwell
+
+    def _plan(self, t):
+        deg = self.angle
+        self.angle += self.direction * self.step_deg
+        self._bounce()
+        return deg, self.step_delay
+
+    def _bounce(self):
+        if self.angle >= self.sweep_max:
+            self.angle = self.sweep_max; self.direction = -1
+        elif self.angle <= self.sweep_min:
+            self.angle = self.sweep_min; self.direction = +1
+
+    def observe(self, deg, cm, t):
+        self.pings += 1
+
+    def _count(self, t, deg):
+        if self._last is not None:
+            self.sweep_s += t - self._last[0]
+            self.travel_deg += abs(deg - self._last[1])
+        self._last = (t, deg)
+
+    def rates(self):
+        """(deg/s, pings/s) achieved while sweeping."""
+        if self.sweep_s <= 0:
+            return 0.0, 0.0
+        return self.travel_deg / self.sweep_s, self.pings / self.sweep_s
+
+class AdaptiveSweep(FixedSweep):
+    """hot_cm: a reading this close marks its angle "hot" for hot_s seconds;
+    within hot_width deg of a hot angle the sweep uses fine_deg steps and
+    pings `repeat` times per angle, elsewhere coarse_deg steps."""
+    def __init__(self, sweep=(40, 80), fine_deg=2, coarse_deg=8, min_dwell=0.01,
+                 hot_cm=100, hot_s=2.0, hot_width=4, repeat=3, slew_dps=SLEW_DPS):
+        self.fine_deg, self.coarse_deg = fine_deg, coarse_deg
+        self.min_dwell = min_dwell
+        self.hot_cm, self.hot_s, self.hot_width = hot_cm, hot_s, hot_width
+        self.repeat = repeat
+        self.slew_dps = slew_dps
+        self.hot = {}                       # deg -> last time something was within hot_cm
+        self._again = 0                     # repeat pings left at the current angle
+        super().__init__(sweep, coarse_deg, min_dwell)
+
+    def reset(self):
+        super().reset()
+        self._again = 0
+
+    def is_hot(self, deg, t):
+        return any(abs(deg - a) <= self.hot_width and t - th <= self.hot_s for a, th in self.hot.items())
+
+    def _plan(self, t):
+        if self._again > 0:
+            self._again -= 1
+            return self.angle, self.min_dwell
+        step = self.fine_deg if self.is_hot(self.angle, t) else self.coarse_deg
+        prev = self.angle
+        self.angle += self.direction * step
+        self._bounce()
+        if self.is_hot(self.angle, t):
+            self._again = self.repeat - 1
+        # don't ping before the servo can have got there
+        return self.angle, max(self.min_dwell, abs(self.angle - prev) / self.slew_dps)
+
+    def observe(self, deg, cm, t):
+        super().observe(deg, cm, t)
+        if cm is not None and cm <= self.hot_cm:
+            self.hot[int(round(deg))] = t
+        elif self.hot:
+            self.hot = {a: th for a, th in self.hot.items() if t - th <= self.hot_s}
@@ -0,0 +1,125 @@
+# telemetry_replay.py
+# Look at and re-run recorded robot telemetry (hal/telemetry.py).
+#
+#   VANIS_TELEMETRY=runs/ python suhide.py                # record a run
+#   python telemetry_replay.py info runs/suhide-*.tlm     # counts, states, hides
+#   python telemetry_replay.py dump runs/x.tlm --kind range state
+#   python telemetry_replay.py sim runs/x.tlm --hide until_clear --near-cm 40 --near-hits 3
+#
+# "sim" drives the simulated robot (virtual clock) with the recorded sonar
+# readings (ReplayWorld) and runs the sweep/hide state machine over the same
+# stretch of time, so threshold or planner changes can be tried against what
+# the real robot saw. --out records the simulated run as telemetry too.
+# In a notebook: TelemetryLog(path).ranges() / .motors() / .states() give
+# numpy columns, and .recs is the whole memory-mapped record array.
+
+import sys, argparse
+import numpy as np
+from hal import Robot, SimBackend, TelemetryLog, ReplayWorld, Telemetry
+from hal.telemetry import KINDS, RANGE, SERVO, MOTOR, STATE, DETECT, EVENT
+from sweep_hide import SweepHide, HIDE_MODES
+from sweep_planner import FixedSweep, AdaptiveSweep
+
+PLANNERS = {"fixed": FixedSweep, "adaptive": AdaptiveSweep}
+
+def hides(log):
+    """Robot-clock times the recorded run entered its hide move/state."""
+    out, prev = [], None
+    for t, st in log.states():
+        if st in ("MOVING", "HIDING") and prev not in ("MOVING", "HIDING"):
+            out.append(t)
+        prev = st
+    return out
+
+def info(log):
+    t, cm, _ = log.ranges()
+    print(f"{log.path}: {len(log)} records, {log.duration:.1f} s")
+    print("  " + "  ".join(f"{k} {n}" for k, n in log.counts().items() if n and k != "name"))
+    if len(t) > 1:
+        echo = ~np.isnan(cm)
+        print(f"  ranging {len(t) / max(1e-9, t[-1] - t[0]):.1f} Hz, {100 * (~echo).mean():.0f}% no echo, "
+              f"nearest {np.nanmin(cm) if echo.any() else float('nan'):.1f} cm")
+    states = {}
+    for _, st in log.states():
+        states[st] = states.get(st, 0) + 1
+    if states:
+        print("  states " + "  ".join(f"{k} x{v}" for k, v in states.items()))
+    h = hides(log)
+    print(f"  hides {len(h)}" + (f" at {', '.join(f'{x - log.t0:.1f}' for x in h[:10])} s" if h else ""))
+    for name in sorted({e[1] for e in log.events()}):
+        print(f"  event {name} x{len(log.events(name))}")
+
+def dump(log, kinds=None):
+    want = {KINDS.index(k) for k in kinds} if kinds else None
+    for r in log.recs:
+        k = int(r["kind"])
+        if want is not None and k not in want:
+            continue
+        t = f"{r['t'] - log.t0:9.3f}"
+        name = log.names.get(int(r["code"]), "?")
+        if k == RANGE:
+            cm = "-" if np.isnan(r["a"]) else f"{r['a']:.1f} cm"
+            print(f"{t} range  {cm}")
+        elif k == SERVO:
+            print(f"{t} servo  {r['a']:.0f} deg")
+        elif k == MOTOR:
+            print(f"{t} motor  {'LR'[int(r['code'])]} {r['a']:+.0f}")
+        elif k == STATE:
+            print(f"{t} state  {name}")
+        elif k == DETECT:
+            print(f"{t} detect {name} ({r['a']:.0f}, {r['b']:.0f}, {r['c']:.0f}, {r['d']:.0f})")
+        elif k == EVENT:
+            print(f"{t} event  {name}" + ("" if np.isnan(r["a"]) else f" {r['a']:g}"))
+
+def sim(log, args):
+    world = ReplayWorld(log, tol_deg=args.tol_deg, max_age_s=args.max_age)
+    hw = SimBackend(world=world)
+    tel = Telemetry(args.out, clock=hw.now) if args.out else None
+    bot = Robot(hw, telemetry=tel)
+    sh = SweepHide(bot, hide=args.hide, near_cm=args.near_cm, near_hits=args.near_hits,
+                   clear_cm=args.clear_cm, clear_hits=args.clear_hits,
+                   back_s=0.5 if args.hide in ("backup", "until_clear") else 0.0,
+                   planner=PLANNERS[args.planner](), log=print if args.verbose else None)
+    sh.run(world.duration)
+    bot.close()
+    rec = [t - log.t0 for t in hides(log)]
+    print(f"replayed {world.duration:.1f} s ({len(world.t)} readings): "
+          f"{len(sh.hide_times)} hides in sim, {len(rec)} in the recording")
+    print("  sim:      " + ", ".join(f"{t:.1f}" for t in sh.hide_times[:20]))
+    print("  recorded: " + ", ".join(f"{t:.1f}" for t in rec[:20]))
+    if args.out:
+        print(f"  sim run -> {args.out}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Inspect / replay robot telemetry")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("info"); p.add_argument("files", nargs="+")
+    p = sub.add_parser("dump"); p.add_argument("file")
+    p.add_argument("--kind", nargs="*", choices=KINDS[1:])
+    p = sub.add_parser("sim"); p.add_argument("file")
+    p.add_argument("--hide", default="until_clear", choices=HIDE_MODES)
+    p.add_argument("--near-cm", type=float, default=35)
+    p.add_argument("--near-hits", type=int, default=2)
+    p.add_argument("--clear-cm", type=float, default=45)
+    p.add_argument("--clear-hits", type=int, default=3)
+    p.add_argument("--planner", default="fixed", choices=PLANNERS)
+    p.add_argument("--tol-deg", type=float, default=3.0, help="servo angle match for a recorded reading")
+    p.add_argument("--max-age", type=float, default=1.0, help="older recorded readings count as no echo")
+    p.add_argument("--out", help="record the simulated run here")
+    p.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "info":
+        for f in args.files:
+            info(TelemetryLog(f))
+    elif args.cmd == "dump":
+        dump(TelemetryLog(args.file), args.kind)
+    else:
+        sim(TelemetryLog(args.file), args)
+    return 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:         # dump | head
+        pass
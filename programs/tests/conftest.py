@@ -0,0 +1,4 @@
+# The scripts import each other (and hal) from programs/, as when run from there.
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,104 @@
+# drive_cmd.py: the command language, the Sequencer's queue/preempt rules,
+# and a client that stops reading not stalling anyone else.
+
+import os, socket, tempfile, threading, time
+import pytest
+from hal import open_backend
+import drive_cmd
+from drive_cmd import parse, parse_time
+
+class Motors:
+    """Records what the Sequencer asks for."""
+    def __init__(self):
+        self.cmd = {"l": 0, "r": 0}
+        self.log = []
+
+    def drive(self, l, r):
+        self.cmd = {"l": l, "r": r}; self.log.append(("drive", l, r))
+
+    def side(self, s, d, spd):
+        self.cmd[s] = 0 if d == "s" else spd if d == "f" else -spd; self.log.append(("side", s, d, spd))
+
+    def stop(self):
+        self.cmd = {"l": 0, "r": 0}; self.log.append(("stop",))
+
+    def halt(self):
+        self.cmd = {"l": 0, "r": 0}; self.log.append(("halt",))
+
+@pytest.fixture
+def seq():
+    hw = open_backend("sim")
+    s = drive_cmd.Sequencer(Motors(), hw)
+    yield s
+    s.close(); hw.close()
+
+# ---- parsing ----
+def test_parse_times():
+    assert parse_time("0.5") == parse_time("0.5s") == parse_time("500ms") == 0.5
+    with pytest.raises(ValueError):
+        parse_time("5 min")
+
+def test_parse_sequence():
+    steps, preempt = parse("both f 70 for 0.5s; turn l 50 for 300ms")
+    assert not preempt
+    assert steps == [(("drive", 70, 70), 0.5), (("drive", -50, 50), 0.3)]
+    assert parse("l s")[0] == [(("side", "l", "s", 0), None)]
+    assert parse("wait 1s")[0] == [(("wait", 1.0), None)]
+
+@pytest.mark.parametrize("line", ["", "fly f 50", "l f 150", "l f", "both x 10", "turn u 20",
+                                  "stop now", "wait", "both f 50 for 2min", ";;"])
+def test_parse_errors(line):
+    with pytest.raises(ValueError):
+        parse(line)
+
+def test_parse_preempts():
+    assert parse("!turn r 80 for 0.4s")[1]
+    assert parse("halt")[1]                     # an emergency stop never waits in line
+    assert not parse("stop")[1]                 # a plain stop ends a script: it queues
+
+# ---- sequencing ----
+def test_jobs_queue_in_order(seq):
+    a = seq.submit(parse("both f 40 for 50ms")[0])
+    b = seq.submit(parse("turn l 30 for 50ms")[0])
+    assert b.finished.wait(2.0)
+    assert (a.status, b.status) == ("done", "done")
+    assert seq.motors.log == [("drive", 40, 40), ("stop",), ("drive", -30, 30), ("stop",)]
+
+def test_preempt_cuts_the_running_job_and_drops_the_queue(seq):
+    a = seq.submit(parse("both f 40 for 2s")[0])
+    b = seq.submit(parse("both b 40 for 2s")[0])
+    time.sleep(0.1)
+    c = seq.submit(*parse("!turn r 50 for 50ms"))
+    assert c.finished.wait(2.0) and a.finished.is_set() and b.finished.is_set()
+    assert (a.status, b.status, c.status) == ("preempted", "preempted", "done")
+    assert ("drive", -40, -40) not in seq.motors.log
+    assert seq.preempts == 2
+
+def test_steps_keep_absolute_deadlines(seq):
+    t = time.monotonic()
+    job = seq.submit(parse("; ".join(["l f 10 for 20ms"] * 10))[0])
+    assert job.finished.wait(2.0)
+    assert abs(time.monotonic() - t - 0.2) < 0.05
+    assert job.late_s < 0.02
+
+# ---- socket server ----
+def test_a_client_that_stops_reading_stalls_nobody(seq):
+    path = os.path.join(tempfile.mkdtemp(), "drive.sock")
+    srv = drive_cmd.CommandServer(seq, seq.motors, ["unix:" + path], watchdog_s=60, log=None)
+    a = drive_cmd.connect("unix:" + path)
+    try:
+        a.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        # jobs whose replies it never reads, then enough status requests to fill the socket
+        a.sendall(("l f 10 for 1ms\n" * 100 + "status\n" * 20000).encode())
+        time.sleep(0.5)
+        done = threading.Event()
+        rc = []
+        threading.Thread(target=lambda: (rc.append(drive_cmd.send("unix:" + path, ["both f 60 for 0.1s"],
+                                                                   log=lambda *a: None)), done.set()),
+                         daemon=True).start()
+        assert done.wait(3.0) and rc == [0]
+        t = time.monotonic()
+        seq.clear(halt=True)
+        assert time.monotonic() - t < 0.5
+    finally:
+        a.close(); srv.close()
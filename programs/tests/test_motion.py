@@ -0,0 +1,85 @@
+# hal/motion.py: the ramps reach their targets in the times the ramp commit
+# states (0 -> 100 % in 0.24 s trapezoid, 0.31 s S-curve at accel 400, jerk 4000).
+
+import pytest
+from hal import open_backend, L298, RampedMotors, Ramp
+
+TICK = 0.01         # RATE_HZ = 100
+
+def run(ramp, target, dt=TICK, limit=2.0):
+    """Step ramp to target; seconds taken."""
+    ramp.target, t = target, 0.0
+    while not ramp.done():
+        ramp.step(dt); t += dt
+        assert t < limit
+    return t
+
+@pytest.fixture
+def motors():
+    made = []
+    def make(**kw):
+        hw = open_backend("sim-fast")
+        m = RampedMotors(L298(hw, (17, 27), (22, 23), en=(18, 19)), **kw)
+        made.append((hw, m))
+        return hw, m
+    yield make
+    for hw, m in made:
+        m.halt(); hw.close()
+
+@pytest.mark.parametrize("jerk, stated", [(0, 0.24), (4000, 0.31)])
+def test_full_speed_within_stated_time(motors, jerk, stated):
+    hw, m = motors(accel=400, jerk=jerk)
+    t = hw.now()
+    m.drive(100, 100)
+    assert m.wait(2.0)
+    took = hw.now() - t
+    assert 100 / 400 - TICK <= took <= stated + TICK   # no faster than accel allows, no slower than claimed
+    assert m.cmd == {"l": 100, "r": 100}
+
+def test_s_curve_limits_jerk():
+    r = Ramp(accel=400, jerk=4000)
+    r.target, prev = 100.0, 0.0
+    while not r.done():
+        a = r.a
+        r.step(TICK)
+        if not r.done():
+            assert abs(r.a - a) <= 4000 * TICK + 1e-9
+        assert r.v >= prev; prev = r.v
+    assert r.v == 100.0
+
+def test_trapezoid_profile_time():
+    assert run(Ramp(accel=400), 100.0) == pytest.approx(0.25, abs=TICK)
+    assert run(Ramp(accel=400), -100.0) == pytest.approx(0.25, abs=TICK)
+
+def test_no_ramp_jumps():
+    r = Ramp(accel=0)
+    r.target = 80.0
+    assert r.step(TICK) == 80.0 and r.done()
+
+def test_reversal_mid_ramp_starts_from_current_speed():
+    r = Ramp(accel=400)
+    r.target = 100.0
+    for _ in range(10):
+        r.step(TICK)
+    v = r.v
+    assert 0 < v < 100
+    r.target = -100.0
+    assert r.step(TICK) == pytest.approx(v - 400 * TICK)   # slows down, no jump through 0
+
+def test_sides_land_together(motors):
+    hw, m = motors(accel=400, jerk=0)
+    m.drive(100, 40)
+    seen = []
+    while not m.wait(0.0):
+        hw.sleep(TICK)
+        seen.append((m.ramps["l"].done(), m.ramps["r"].done()))
+    assert all(l == r for l, r in seen)                 # neither side settles first
+    assert m.cmd == {"l": 100, "r": 40}
+
+def test_halt_is_immediate(motors):
+    hw, m = motors(accel=400, jerk=4000)
+    m.drive(100, 100)
+    hw.sleep(0.1)
+    assert m.cmd["l"] > 0
+    m.halt()
+    assert m.cmd == {"l": 0, "r": 0} and m.wait(0.0)
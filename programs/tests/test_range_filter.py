@@ -0,0 +1,79 @@
+# range_filter.py: ghosts held back, timeouts coasted, ttc ahead of near_cm.
+
+import math
+from range_filter import RangeFilter, RangeKalman
+
+DT = 0.05           # 20 Hz pings
+
+def feed(rf, readings, t=0.0, deg=90, near_cm=35, clear_cm=45):
+    """readings -> list of (t, hide, why); returns it and the next t."""
+    out = []
+    for cm in readings:
+        hide, why = rf.update(deg, t, cm, near_cm, clear_cm)
+        out.append((t, hide, why))
+        t += DT
+    return out, t
+
+def test_one_ghost_echo_rejected():
+    rf = RangeFilter(ttc_s=0.5)
+    out, _ = feed(rf, [200.0] * 10 + [12.0] + [200.0] * 10)
+    assert not any(hide for _, hide, _ in out)
+    tr = rf.track(90)
+    assert tr.rejected == 1 and tr.restarts == 0
+    assert abs(tr.r - 200.0) < 2.0
+
+def test_a_step_is_believed_once_echoes_agree():
+    rf = RangeFilter(ttc_s=0.5)
+    out, _ = feed(rf, [200.0] * 10 + [20.0] * 3)
+    assert [hide for _, hide, _ in out[-3:]] == [False, False, True]   # held back, restarted, confirmed
+    assert out[-1][2].startswith("near")
+    assert rf.track(90).restarts == 1
+
+def test_timeouts_coast_then_drop():
+    tr = RangeKalman(lost_after=3)
+    t = 0.0
+    for i in range(10):
+        tr.update(t, 100.0 - 3.0 * i); t += DT        # closing at 60 cm/s
+    r, v = tr.r, tr.v
+    assert tr.update(t, None) is False
+    assert tr.valid and (tr.r, tr.v) == (r, v)       # a miss is no news, not "far away"
+    tr.update(t + DT, None)
+    assert tr.valid
+    tr.update(t + 2 * DT, None)
+    assert not tr.valid                              # lost_after misses in a row: dropped
+
+def test_timeout_does_not_reset_the_track_count():
+    rf = RangeFilter(ttc_s=0)
+    readings = [50.0, 45.0, None, 40.0, None, 34.0]
+    out, _ = feed(rf, readings)
+    assert rf.timeouts == 2
+    assert out[-1][1]                                # the first reading under near_cm fires
+
+def test_ttc_fires_before_near_cm():
+    rf = RangeFilter(ttc_s=0.5)
+    r, readings = 150.0, []
+    while r > 0:
+        readings.append(r); r -= 80.0 * DT           # walking up at 80 cm/s
+    out, _ = feed(rf, readings)
+    fired = [(t, why) for t, hide, why in out if hide]
+    assert fired and fired[0][1].startswith("ttc")
+    t = fired[0][0]
+    assert 150.0 - 80.0 * t > 35.0                   # still outside near_cm when it fired
+
+def test_ttc_ignores_a_parked_target():
+    rf = RangeFilter(ttc_s=0.5)
+    out, _ = feed(rf, [40.0] * 40)
+    assert not any(hide for _, hide, _ in out)
+    assert rf.track(90).ttc(35) == math.inf
+
+def test_approach_marks_when_the_walk_starts():
+    rf = RangeFilter(ttc_s=0.5)
+    _, t = feed(rf, [150.0] * 100)                   # parked in view for 5 s
+    tr = rf.track(90)
+    assert tr.t0 == 0.0 and tr.t_approach is None
+    start = t
+    readings = [150.0 - 60.0 * DT * i for i in range(60)]
+    out, _ = feed(rf, readings, t=start)
+    fired = next(t for t, hide, _ in out if hide)
+    assert start <= tr.t_approach < start + 0.5
+    assert fired - tr.t_approach < 2.0
@@ -1,8 +1,14 @@
 # radar_watch_18_20_24.py
 # Sweep servo + ultrasonic. If an object is near at some angle,
 # hold that angle until it's clear, then resume sweeping.
+# Readings go into a polar map (polar_map.py); the sweep looks next wherever
+# the map is stalest / most suspicious instead of stepping blindly.
+# Each step goes to the telemetry recorder (VANIS_TELEMETRY=runs/, see
+# hal/telemetry.py) instead of a print line; PRINT_STEPS=True brings the
+# old per-step radar printout back.
 
-import pigpio, time
+from hal import Robot
+from polar_map import PolarMap
 
 # --- PIN MAP (BCM) ---
 SERVO = 18       # GPIO 18 (phys 12) - PWM capable
@@ -14,6 +20,9 @@ MIN_ANGLE   = 20      # deg
 MAX_ANGLE   = 160     # deg
 STEP_DEG    = 5       # deg per step
 SETTLE_S    = 0.10    # wait after moving servo before measuring
+SERVO_DPS   = 600     # servo slew (SG90 ~0.1 s / 60 deg): extra settle for big jumps
+MAP_HALF_LIFE_S = 2.0 # map confidence halves this often without a fresh reading
+MAP_WATCH_CM = 150    # map revisits bins closer than this more often
 
 # --- DISTANCE / NEAR LOGIC ---
 TIMEOUT_S   = 0.025   # ~4m timeout
@@ -21,54 +30,30 @@ NEAR_CM     = 35      # threshold to start tracking
 CLEAR_CM    = 45      # threshold to stop tracking (hysteresis)
 NEAR_COUNT  = 2       # consecutive near hits to lock
 CLEAR_COUNT = 4       # consecutive clear hits to release
-
-def angle_to_us(deg: float) -> int:
-    # map 0..180 deg -> 500..2500 µs
-    return int(500 + (deg/180.0)*2000)
+PRINT_STEPS = False   # print every reading (slows the sweep; use telemetry instead)
 
 class Radar:
     def __init__(self):
-        self.pi = pigpio.pi()
-        if not self.pi.connected:
-            raise RuntimeError("pigpio daemon not running (sudo systemctl start pigpiod)")
-
-        self.pi.set_mode(SERVO, pigpio.OUTPUT)
-        self.pi.set_servo_pulsewidth(SERVO, 0)
-
-        self.pi.set_mode(TRIG, pigpio.OUTPUT)
-        self.pi.set_mode(ECHO, pigpio.INPUT)
-        self.pi.write(TRIG, 0)
-        time.sleep(0.05)
+        # pigpio by default (hardware-timed servo pulses); VANIS_GPIO overrides
+        self.bot = Robot("pigpio", servo=SERVO, trig=TRIG, echo=ECHO, left=None, right=None,
+                         timeout_s=TIMEOUT_S)
+        self.bot.servo.off()
+        self.bot.sleep(0.05)
+        self.angle = None
+        self.aimed_at = None
 
     def set_servo_deg(self, deg: int):
-        if   deg < 0:   deg = 0
-        elif deg > 180: deg = 180
-        self.pi.set_servo_pulsewidth(SERVO, angle_to_us(deg))
-        time.sleep(SETTLE_S)
+        jump = 0 if self.angle is None else abs(deg - self.angle)
+        self.bot.servo.set_deg(deg, settle=SETTLE_S + max(0, jump - STEP_DEG) / SERVO_DPS)
+        self.angle = deg
+        self.aimed_at = self.bot.now()
 
     def distance_cm(self):
-        # trigger 10us pulse
-        self.pi.gpio_trigger(TRIG, 10, 1)
-
-        t0 = time.time()
-        # wait rise
-        while self.pi.read(ECHO) == 0:
-            if time.time() - t0 > TIMEOUT_S:
-                return None
-
-        start = time.time()
-        # wait fall
-        while self.pi.read(ECHO) == 1:
-            if time.time() - start > TIMEOUT_S:
-                return None
-        end = time.time()
-
-        dur = end - start
-        return (dur * 34300.0) / 2.0  # cm
+        # a ping sent while the servo was still on its way belongs to another angle
+        return self.bot.sonar.distance_cm(since=self.aimed_at)
 
     def cleanup(self):
-        self.pi.set_servo_pulsewidth(SERVO, 0)
-        self.pi.stop()
+        self.bot.close()
 
 def bar(cm, max_cm=150):
     if cm is None: return ""
@@ -77,55 +62,61 @@ def bar(cm, max_cm=150):
 
 def main():
     r = Radar()
+    tel = r.bot.tel
+    if tel:
+        print(f"Telemetry -> {tel.path}")
+    pmap = PolarMap(MIN_ANGLE, MAX_ANGLE, STEP_DEG, half_life_s=MAP_HALF_LIFE_S, near_cm=MAP_WATCH_CM)
     try:
         angle = MIN_ANGLE
-        direction = +1
         tracking = False
         track_angle = None
         near_hits = 0
         clear_hits = 0
 
         print("Radar running. Ctrl+C to stop.")
+        if tel:
+            tel.state("SWEEP")
         while True:
             if not tracking:
-                # sweeping
+                # sweeping: look where the map most needs it
+                angle = pmap.next_angle(r.bot.now(), angle)
                 r.set_servo_deg(angle)
                 dist = r.distance_cm()
-                print(f"[SWEEP] angle={angle:3d}°  dist={dist if dist else -1:6.1f} cm  {bar(dist)}")
+                pmap.update(angle, dist, r.bot.now())
+                if PRINT_STEPS:
+                    print(f"[SWEEP] angle={angle:3d}°  dist={dist if dist else -1:6.1f} cm  {bar(dist)}")
 
                 near_hits = near_hits + 1 if (dist is not None and dist <= NEAR_CM) else 0
                 if near_hits >= NEAR_COUNT:
                     tracking = True
                     track_angle = angle
                     clear_hits = 0
-                    print(f"--> Near object @ ~{track_angle}°. Holding...")
-
-                angle += direction * STEP_DEG
-                if angle >= MAX_ANGLE:
-                    angle, direction = MAX_ANGLE, -1
-                elif angle <= MIN_ANGLE:
-                    angle, direction = MIN_ANGLE, +1
+                    free_deg, free_cm = pmap.free_angle(r.bot.now())
+                    if tel:
+                        tel.state("TRACK")
+                    print(f"--> Near object @ ~{track_angle}°. Holding... (most room @ {free_deg}°, "
+                          f"{free_cm:.0f} cm)  [{pmap.row()}]")
 
             else:
                 # tracking (stay pointed)
                 r.set_servo_deg(track_angle)
                 dist = r.distance_cm()
-                print(f"[TRACK] angle={track_angle:3d}°  dist={dist if dist else -1:6.1f} cm  {bar(dist)}")
+                pmap.update(track_angle, dist, r.bot.now())
+                if PRINT_STEPS:
+                    print(f"[TRACK] angle={track_angle:3d}°  dist={dist if dist else -1:6.1f} cm  {bar(dist)}")
 
                 clear_hits = clear_hits + 1 if (dist is not None and dist >= CLEAR_CM) else 0
                 if clear_hits >= CLEAR_COUNT:
                     print(f"<-- Cleared @ {track_angle}°. Resuming sweep.")
+                    if tel:
+                        tel.state("SWEEP")
                     tracking = False
                     near_hits = 0
-                    # resume outward from where we left
-                    midpoint = (MIN_ANGLE + MAX_ANGLE)//2
-                    if track_angle <= midpoint:
-                        angle, direction = track_angle + STEP_DEG, +1
-                    else:
-                        angle, direction = track_angle - STEP_DEG, -1
+                    # the map has gone stale everywhere else: it picks where to look next
+                    angle = track_angle
                     track_angle = None
 
-            time.sleep(0.02)
+            r.bot.sleep(0.02)
     except KeyboardInterrupt:
         print("\nStopping radar.")
     finally:
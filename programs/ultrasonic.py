@@ -2,16 +2,22 @@
 # Pi 5 + HC-SR04 + Active buzzer
 # TRIG=GPIO20, ECHO=GPIO24 (via divider), BUZZER=GPIO21
 
-from gpiozero import DistanceSensor, LED
-from time import sleep, time
+from hal import open_backend, Ranger
 
 TRIG_PIN = 20
 ECHO_PIN = 24
 BUZZER_PIN = 21
 
-# max_distance in meters (HC-SR04 ~4m ideal; keep 2.0 for stability)
-sensor = DistanceSensor(echo=ECHO_PIN, trigger=TRIG_PIN, max_distance=2.0)
-buzzer = LED(BUZZER_PIN)  # on/off for active buzzer
+# max distance in meters (HC-SR04 ~4m ideal; keep 2.0 for stability)
+MAX_DISTANCE_M = 2.0
+PING_HZ = 16        # HC-SR04 wants ~60 ms between pings
+
+hw = open_backend("gpiozero")   # VANIS_GPIO overrides
+# echo for 2 m round trip ~ 11.7 ms; anything later counts as "out of range".
+# Pings run on the ranger's timer, the echo is timed from edge callbacks:
+# no busy-wait, and the loop below only looks at the newest reading.
+sensor = Ranger(hw, TRIG_PIN, ECHO_PIN, rate_hz=PING_HZ, timeout_s=2 * MAX_DISTANCE_M * 100 / 34300.0).start()
+hw.setup_output(BUZZER_PIN, 0)  # on/off for active buzzer
 
 def interval_from_distance_m(d_m):
     """
@@ -27,27 +33,29 @@ def interval_from_distance_m(d_m):
 try:
     next_beep = 0.0
     while True:
-        # gpiozero returns 0.0..1.0 of max_distance
-        d_m = sensor.distance * sensor.max_distance
+        _, _, d_cm = sensor.latest()
+        d_m = MAX_DISTANCE_M if d_cm is None else min(MAX_DISTANCE_M, d_cm / 100.0)
         print(f"Distance: {d_m*100:6.1f} cm", end="\r")
 
         interval = interval_from_distance_m(d_m)
         if interval is None:
-            buzzer.off()
-            sleep(0.05)
+            hw.write(BUZZER_PIN, 0)
+            hw.sleep(0.05)
             continue
 
-        now = time()
+        now = hw.now()
         if now >= next_beep:
-            buzzer.on()
-            sleep(0.03)  # short chirp
-            buzzer.off()
+            hw.write(BUZZER_PIN, 1)
+            hw.sleep(0.03)  # short chirp
+            hw.write(BUZZER_PIN, 0)
             next_beep = now + interval
         else:
-            sleep(0.01)
+            hw.sleep(0.01)
 
 except KeyboardInterrupt:
     pass
 finally:
-    buzzer.off()
+    sensor.stop()
+    hw.write(BUZZER_PIN, 0)
+    hw.close()
     print("\nExiting cleanly.")